@@ -0,0 +1,55 @@
+import os
+import sys
+import uuid
+import asyncio
+from dotenv import load_dotenv
+
+# Add the parent directory to sys.path so we can import modules correctly
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Load environment variables
+load_dotenv()
+
+from src.services.database import (
+    read_session, write_session, create_tenant, bulk_upsert, delete_tenant_data, delete_tenant, close_driver
+)
+
+async def main():
+    """Check that writes go to the leader, reads go to readers and reads see the tenant's writes.
+
+    Works against a single instance too: use NEO4J_URI=neo4j://localhost:7687 to exercise the
+    routing driver (the one server is both writer and reader), or bolt:// for a direct connection.
+    """
+    tenant_id = f"routing-check-{uuid.uuid4()}"
+    await create_tenant(tenant_id, "Routing check")
+    try:
+        for i in range(5):
+            name = f"node-{i}"
+            await bulk_upsert(tenant_id, [{"type": "RoutingCheck", "name": name}], [])
+
+            # Read immediately after the write; the tenant's bookmarks make the reader wait for it
+            async with read_session(tenant_id) as session:
+                result = await session.run(
+                    """
+                    MATCH (n:RoutingCheck {name: $name})-[:BELONGS_TO]->(:Tenant {id: $tenant_id})
+                    RETURN count(n) as count
+                    """,
+                    name=name,
+                    tenant_id=tenant_id
+                )
+                count = (await result.single())["count"]
+                read_server = (await result.consume()).server.address
+
+            async with write_session(tenant_id) as session:
+                result = await session.run("RETURN 1")
+                write_server = (await result.consume()).server.address
+
+            status = "ok" if count == 1 else "STALE READ"
+            print(f"{name}: read on {read_server}, write on {write_server}: {status}")
+    finally:
+        await delete_tenant_data(tenant_id)
+        await delete_tenant(tenant_id)
+        await close_driver()
+
+if __name__ == "__main__":
+    asyncio.run(main())
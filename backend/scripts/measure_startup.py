@@ -0,0 +1,79 @@
+import os
+import sys
+import json
+import time
+import subprocess
+import urllib.request
+import urllib.error
+from dotenv import load_dotenv
+
+# Add the parent directory to sys.path so we can import modules correctly
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# Load environment variables
+load_dotenv()
+
+PORT = int(os.getenv("MEASURE_PORT", "8765"))
+BASE_URL = f"http://127.0.0.1:{PORT}"
+RUNS = int(os.getenv("MEASURE_RUNS", "5"))
+
+def measure_import_time() -> float:
+    """Time `import src.app` in a fresh interpreter"""
+    code = "import time; t = time.perf_counter(); import src.app; print(time.perf_counter() - t)"
+    output = subprocess.check_output([sys.executable, "-c", code], cwd=BACKEND_DIR)
+    return float(output.decode().strip().splitlines()[-1])
+
+def post(path: str, payload: dict) -> dict:
+    request = urllib.request.Request(
+        f"{BASE_URL}{path}",
+        data=json.dumps(payload).encode(),
+        headers={"Content-Type": "application/json"}
+    )
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())
+
+def measure_first_request() -> dict:
+    """Start a worker and time how long until it is ready and how long its first database request takes"""
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.app:app", "--port", str(PORT), "--log-level", "warning"],
+        cwd=BACKEND_DIR
+    )
+    try:
+        # Poll the health check until the worker reports ready
+        while True:
+            try:
+                with urllib.request.urlopen(f"{BASE_URL}/") as response:
+                    response.read()
+                break
+            except (urllib.error.URLError, ConnectionError):
+                if server.poll() is not None:
+                    raise RuntimeError("Server exited during startup")
+                time.sleep(0.01)
+        ready = time.perf_counter() - started
+
+        # The first request that touches Neo4j pays for connection setup unless warm-up is enabled
+        request_started = time.perf_counter()
+        post("/api/create_tenant", {"display_name": "startup-benchmark"})
+        first_request = time.perf_counter() - request_started
+
+        return {"ready": ready, "first_request": first_request}
+    finally:
+        server.terminate()
+        server.wait()
+
+def main():
+    import_times = [measure_import_time() for _ in range(RUNS)]
+    print(f"Import time (median of {RUNS}): {sorted(import_times)[RUNS // 2] * 1000:.1f} ms")
+
+    runs = [measure_first_request() for _ in range(RUNS)]
+    ready = sorted(run["ready"] for run in runs)[RUNS // 2]
+    first_request = sorted(run["first_request"] for run in runs)[RUNS // 2]
+    print(f"Time to ready (median of {RUNS}): {ready * 1000:.1f} ms")
+    print(f"First request latency (median of {RUNS}): {first_request * 1000:.1f} ms")
+    print(f"Time to first response (median of {RUNS}): {(ready + first_request) * 1000:.1f} ms")
+    print("Note: each run creates a 'startup-benchmark' tenant")
+
+if __name__ == "__main__":
+    main()
@@ -1,34 +1,184 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+import asyncio
 import uuid
-import json
-from datetime import datetime
-from src.models.api import TenantRequest, ExtractRequest, LogEntry, QueryRequest
-from src.services.database import create_tenant
+import tempfile
+from src.models.api import TenantRequest, ExtractRequest, LogEntry, QueryRequest, QueryBatchRequest, TenantJobRequest
+from src.services.storage import get_storage, STATS_TOP_HUBS
 from src.services.extraction import extract_data
-from src.services.query import natural_language_to_cypher
+from src.services.query import natural_language_to_cypher, natural_language_batch, QUERY_BATCH_MAX_QUESTIONS
+from src.services.log_sink import get_log_sink, LogSinkFullError, LogSinkClosedError
+from src.services.jobs import Job, start_job, get_job_status
+from src.services.scheduler import get_scheduler
+from src.services.prompts import prompt_stats
+from src.services.cache import get_cache
+from src.utils.singleflight import singleflight_stats
+from src.utils.resilience import resilience_stats
+from src.services.transfer import (
+    encode_ndjson, decode_ndjson, encode_parquet, decode_parquet, import_tenant,
+    require_pyarrow, ImportFormatError, IMPORT_BATCH_SIZE
+)
 
 router = APIRouter(prefix="/api")
 
 @router.post("/create_tenant")
 async def create_tenant_endpoint(request: TenantRequest):
     tenant_id = str(uuid.uuid4())
-    await create_tenant(tenant_id, request.display_name)
+    await get_storage().create_tenant(tenant_id, request.display_name)
     return {"tenant_id": tenant_id, "display_name": request.display_name}
 
 @router.post("/extract")
 async def extract_endpoint(request: ExtractRequest):
-    result = await extract_data(request.tenant_id, request.text)
+    # Longer texts cost more prompt tokens, so they take a bigger share of the tenant's turn
+    async with get_scheduler().slot(request.tenant_id, cost=1 + len(request.text) / 4000):
+        result = await extract_data(request.tenant_id, request.text)
     return {"result": result}
 
 @router.post("/query")
 async def query_endpoint(request: QueryRequest):
     """Process a natural language query and convert it to Cypher"""
-    result = await natural_language_to_cypher(request.tenant_id, request.query)
+    async with get_scheduler().slot(request.tenant_id):
+        result = await natural_language_to_cypher(request.tenant_id, request.query)
     return result
 
+@router.post("/query_batch")
+async def query_batch_endpoint(request: QueryBatchRequest):
+    """Answer several natural language queries for a tenant, with results and errors per query"""
+    if not request.queries:
+        raise HTTPException(status_code=400, detail="No queries given")
+    if len(request.queries) > QUERY_BATCH_MAX_QUESTIONS:
+        raise HTTPException(status_code=400, detail=f"At most {QUERY_BATCH_MAX_QUESTIONS} queries per batch")
+    # A batch counts as one request per query, against the tenant's rate and its turn
+    async with get_scheduler().slot(request.tenant_id, cost=len(request.queries)):
+        return await natural_language_batch(request.tenant_id, request.queries, request.summarize)
+
+async def _start_delete_job(request: TenantJobRequest, keep_tenant: bool):
+    storage = get_storage()
+    if not await storage.tenant_exists(request.tenant_id):
+        raise HTTPException(status_code=404, detail=f"Tenant {request.tenant_id} does not exist")
+
+    async def run(job: Job):
+        totals = await storage.delete_tenant_data(
+            request.tenant_id,
+            batch_size=request.batch_size,
+            on_progress=job.advance
+        )
+        if not keep_tenant:
+            await storage.delete_tenant(request.tenant_id)
+        return totals
+
+    job = start_job("reset_tenant" if keep_tenant else "purge_tenant", request.tenant_id, run)
+    return job.to_dict()
+
+@router.post("/purge_tenant", status_code=202)
+async def purge_tenant_endpoint(request: TenantJobRequest):
+    """Delete a tenant and all of its data in a background job"""
+    return await _start_delete_job(request, keep_tenant=False)
+
+@router.post("/reset_tenant", status_code=202)
+async def reset_tenant_endpoint(request: TenantJobRequest):
+    """Delete all of a tenant's data in a background job, keeping the tenant"""
+    return await _start_delete_job(request, keep_tenant=True)
+
+@router.get("/stats/{tenant_id}")
+async def stats_endpoint(tenant_id: str, top_k: int = 10):
+    """A tenant's node and relationship counts by type and its most connected nodes"""
+    storage = get_storage()
+    if not await storage.tenant_exists(tenant_id):
+        raise HTTPException(status_code=404, detail=f"Tenant {tenant_id} does not exist")
+    return await storage.get_stats(tenant_id, top_k=max(0, min(top_k, STATS_TOP_HUBS)))
+
+@router.post("/reconcile_stats", status_code=202)
+async def reconcile_stats_endpoint(request: TenantJobRequest):
+    """Recompute a tenant's statistics from its graph in a background job, correcting any drift"""
+    storage = get_storage()
+    if not await storage.tenant_exists(request.tenant_id):
+        raise HTTPException(status_code=404, detail=f"Tenant {request.tenant_id} does not exist")
+
+    async def run(job: Job):
+        return await storage.reconcile_stats(request.tenant_id, batch_size=request.batch_size)
+
+    return start_job("reconcile_stats", request.tenant_id, run).to_dict()
+
+@router.get("/jobs/{job_id}")
+async def job_status_endpoint(job_id: str):
+    """Report progress and throughput of a background job"""
+    status = await get_job_status(job_id)
+    if status is None:
+        detail = f"Job {job_id} not found"
+        if get_cache() is None:
+            detail += "; without the shared cache a job's status is only available from the worker that started it"
+        raise HTTPException(status_code=404, detail=detail)
+    return status
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet"
+}
+
+@router.get("/export/{tenant_id}")
+async def export_endpoint(tenant_id: str, format: str = "ndjson"):
+    """Stream a tenant's nodes and relationships as NDJSON or Parquet"""
+    if format not in EXPORT_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"Unsupported format: {format}")
+    storage = get_storage()
+    if not await storage.tenant_exists(tenant_id):
+        raise HTTPException(status_code=404, detail=f"Tenant {tenant_id} does not exist")
+
+    if format == "parquet":
+        try:
+            require_pyarrow()
+        except ImportFormatError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        body = encode_parquet(storage.export_tenant(tenant_id))
+    else:
+        body = encode_ndjson(storage.export_tenant(tenant_id))
+
+    return StreamingResponse(
+        body,
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{tenant_id}.{format}"'}
+    )
+
+@router.post("/import/{tenant_id}")
+async def import_endpoint(tenant_id: str, request: Request, format: str = "ndjson", batch_size: int = IMPORT_BATCH_SIZE):
+    """Load an export into a tenant without going through the LLM, creating the tenant if needed"""
+    if format not in EXPORT_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"Unsupported format: {format}")
+
+    try:
+        if format == "ndjson":
+            return await import_tenant(tenant_id, decode_ndjson(request.stream()), batch_size)
+
+        # Parquet keeps its metadata in the footer, so spool the upload to disk first.
+        # Disk writes run in a thread so a large upload doesn't block other requests.
+        f = await asyncio.to_thread(tempfile.NamedTemporaryFile, suffix=".parquet")
+        try:
+            async for chunk in request.stream():
+                await asyncio.to_thread(f.write, chunk)
+            await asyncio.to_thread(f.flush)
+            return await import_tenant(tenant_id, decode_parquet(f.name), batch_size)
+        finally:
+            await asyncio.to_thread(f.close)
+    except ImportFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/metrics")
+async def metrics_endpoint():
+    """Per-worker counters for request coalescing, circuit breakers, hedged requests, tenant scheduling and prompt sizes"""
+    return {
+        "singleflight": singleflight_stats(),
+        **resilience_stats(),
+        "scheduler": get_scheduler().stats(),
+        "prompts": prompt_stats(),
+        "cache": get_cache().stats() if get_cache() else None
+    }
+
 @router.post("/log")
 async def log_endpoint(entry: LogEntry):
-    """Log test results to a file"""
-    with open("extraction_test_results.jsonl", "a") as f:
-        f.write(json.dumps(entry.dict()) + "\n")
+    """Queue test results to be appended to the log file"""
+    try:
+        await get_log_sink().write(entry.dict())
+    except (LogSinkFullError, LogSinkClosedError) as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     return {"status": "logged"}
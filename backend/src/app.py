@@ -1,12 +1,62 @@
-from fastapi import FastAPI
+import math
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from src.api.routes import router
+from src.services.storage import init_storage, close_storage, GRAPH_BACKEND
+from src.services.llm import init_openai_client, close_openai_client
+from src.services.log_sink import start_log_sink, close_log_sink
+from src.services.jobs import cancel_jobs
+from src.services.cache import init_cache, close_cache
+from src.services.scheduler import TenantOverloadedError
+from src.utils.resilience import CircuitOpenError, DeadlineExceeded
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Create the shared clients once per worker instead of at import time
+    await init_storage().start()
+    init_openai_client()
+    start_log_sink()
+    # The in-memory graph lives and dies with this worker, so its reads can't be shared or kept
+    if GRAPH_BACKEND != "memory":
+        init_cache()
+
+    yield
+
+    # Stop background jobs and flush queued log entries before the clients go away
+    await cancel_jobs()
+    await close_log_sink()
+    await close_openai_client()
+    await close_storage()
+    close_cache()
 
 # Create FastAPI app
-app = FastAPI(title="Graph Extraction API")
+app = FastAPI(title="Graph Extraction API", lifespan=lifespan)
 
 # Include API routes
 app.include_router(router)
 
+# A dependency that is down or too slow is reported as such instead of as a generic failure
+@app.exception_handler(CircuitOpenError)
+async def circuit_open_handler(request: Request, exc: CircuitOpenError):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(max(1, math.ceil(exc.retry_after)))}
+    )
+
+@app.exception_handler(TenantOverloadedError)
+async def tenant_overloaded_handler(request: Request, exc: TenantOverloadedError):
+    return JSONResponse(
+        status_code=429,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(max(1, math.ceil(exc.retry_after)))}
+    )
+
+@app.exception_handler(DeadlineExceeded)
+async def deadline_exceeded_handler(request: Request, exc: DeadlineExceeded):
+    return JSONResponse(status_code=504, content={"detail": str(exc)})
+
 # Health check endpoint
 @app.get("/")
 async def root():
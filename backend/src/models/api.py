@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Dict, Any
+from pydantic import BaseModel, Field
+from typing import Dict, Any, List, Optional
 
 class TenantRequest(BaseModel):
     display_name: str
@@ -12,6 +12,15 @@ class QueryRequest(BaseModel):
     tenant_id: str
     query: str
 
+class QueryBatchRequest(BaseModel):
+    tenant_id: str
+    queries: List[str]
+    summarize: bool = False
+
+class TenantJobRequest(BaseModel):
+    tenant_id: str
+    batch_size: Optional[int] = Field(default=None, gt=0)
+
 class LogEntry(BaseModel):
     company: str
     tenant_id: str
@@ -1,5 +1,5 @@
-from typing_extensions import TypedDict
-from typing import List
+from typing_extensions import NotRequired, TypedDict
+from typing import Dict, List
 
 class Node(TypedDict):
     type: str
@@ -9,7 +9,14 @@ class Relationship(TypedDict):
     from_id: str
     to_id: str
     type: str
+    # Labels of the endpoints, when known, so they can be matched by label
+    from_type: NotRequired[str]
+    to_type: NotRequired[str]
 
 class ExtractedData(TypedDict):
     nodes: List[Node]
     relationships: List[Relationship]
+
+class NormalizedData(ExtractedData):
+    # What normalization dropped, by reason
+    removed: Dict[str, int]
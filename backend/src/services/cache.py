@@ -0,0 +1,242 @@
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+# Cache shared by the workers on a host. When disabled, every worker computes everything itself.
+CACHE_ENABLED = os.getenv("CACHE_ENABLED", "true").lower() == "true"
+CACHE_PATH = os.getenv("CACHE_PATH", "shared_cache.sqlite3")
+# Evict least recently used entries once the cached values exceed this many bytes
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+CACHE_DEFAULT_TTL = float(os.getenv("CACHE_DEFAULT_TTL", "3600"))
+# Schemas and query results are invalidated by writes to the tenant; the TTL bounds staleness
+# from writes that bypass the API. Cypher and formatted answers are keyed by their inputs.
+CACHE_SCHEMA_TTL = float(os.getenv("CACHE_SCHEMA_TTL", "3600"))
+CACHE_CYPHER_TTL = float(os.getenv("CACHE_CYPHER_TTL", "86400"))
+CACHE_RESULTS_TTL = float(os.getenv("CACHE_RESULTS_TTL", "600"))
+# Writes between checks of the total size
+CACHE_EVICT_EVERY = int(os.getenv("CACHE_EVICT_EVERY", "200"))
+# A hit only refreshes an entry's last-access time if it is older than this, to keep reads cheap
+CACHE_TOUCH_INTERVAL = 60.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    scope TEXT,
+    version INTEGER NOT NULL,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    expires_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at);
+CREATE TABLE IF NOT EXISTS versions (
+    scope TEXT PRIMARY KEY,
+    version INTEGER NOT NULL
+);
+"""
+
+class SharedCache:
+    """A key-value cache in a SQLite file in WAL mode, shared by every worker on the host.
+
+    Entries have a TTL, and the least recently used ones are evicted when the
+    values exceed `max_bytes`. An entry can belong to a scope (e.g. a tenant):
+    `invalidate(scope)` bumps the scope's version counter in the file, and
+    entries stored under an older version become misses in every process.
+    Values are stored as JSON. Because the file outlives the process, caches
+    stay warm across restarts and deploys.
+    """
+
+    def __init__(
+        self,
+        path: str = CACHE_PATH,
+        max_bytes: int = CACHE_MAX_BYTES,
+        default_ttl: float = CACHE_DEFAULT_TTL,
+        evict_every: int = CACHE_EVICT_EVERY,
+        clock: Callable[[], float] = time.time
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.evict_every = evict_every
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._db = sqlite3.connect(path, timeout=10, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        # Serve reads from a shared memory map of the file instead of copying pages per process
+        self._db.execute(f"PRAGMA mmap_size={int(max_bytes * 1.25)}")
+        self._db.executescript(_SCHEMA)
+
+    def _version(self, scope: Optional[str]) -> int:
+        if scope is None:
+            return 0
+        row = self._db.execute("SELECT version FROM versions WHERE scope = ?", (scope,)).fetchone()
+        return row[0] if row else 0
+
+    def lookup(self, key: str, scope: Optional[str] = None) -> Tuple[bool, Any, int]:
+        """Return (found, value, scope version). Store a computed value under that version."""
+        now = self.clock()
+        with self._lock:
+            version = self._version(scope)
+            row = self._db.execute(
+                "SELECT value, accessed_at FROM entries WHERE key = ? AND version = ? AND expires_at > ?",
+                (key, version, now)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return False, None, version
+            if row[1] < now - CACHE_TOUCH_INTERVAL:
+                self._db.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        return True, json.loads(row[0]), version
+
+    def store(self, key: str, value: Any, version: int = 0, scope: Optional[str] = None, ttl: Optional[float] = None):
+        """Store a value computed while the scope was at `version`.
+
+        If the scope was invalidated in the meantime, the entry is already stale
+        and will never be returned.
+        """
+        encoded = json.dumps(value, default=str)
+        now = self.clock()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries (key, scope, version, value, size, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, scope, version, encoded, len(encoded), now + (ttl or self.default_ttl), now)
+            )
+            self._writes += 1
+            if self._writes % self.evict_every == 0:
+                self._evict(now)
+
+    def _evict(self, now: float):
+        self._db.execute("DELETE FROM entries WHERE expires_at <= ?", (now,))
+        self._db.execute(
+            "DELETE FROM entries WHERE scope IS NOT NULL AND version < "
+            "(SELECT version FROM versions WHERE versions.scope = entries.scope)"
+        )
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Evict down to 90% so the next few writes don't each trigger an eviction
+        excess = total - int(self.max_bytes * 0.9)
+        removed = 0
+        for key, size in self._db.execute("SELECT key, size FROM entries ORDER BY accessed_at").fetchall():
+            if removed >= excess:
+                break
+            self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            removed += size
+            self.evictions += 1
+
+    def invalidate(self, scope: str):
+        """Make every entry in `scope` stale, in all processes sharing the file"""
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO versions (scope, version) VALUES (?, 1) "
+                "ON CONFLICT(scope) DO UPDATE SET version = version + 1",
+                (scope,)
+            )
+
+    def evict(self):
+        with self._lock:
+            self._evict(self.clock())
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
+
+_cache: Optional[SharedCache] = None
+
+def init_cache(path: str = CACHE_PATH) -> Optional[SharedCache]:
+    """Open the shared cache. Called once from the app lifespan; scripts and tests run without it."""
+    global _cache
+    if _cache is None and CACHE_ENABLED:
+        _cache = SharedCache(path)
+    return _cache
+
+def get_cache() -> Optional[SharedCache]:
+    return _cache
+
+def close_cache():
+    global _cache
+    if _cache is not None:
+        _cache.close()
+        _cache = None
+
+async def cached(
+    namespace: str,
+    key: str,
+    fn: Callable[[], Awaitable[T]],
+    scope: Optional[str] = None,
+    ttl: Optional[float] = None
+) -> T:
+    """Return the cached value for `namespace:key`, or compute it with `fn()` and cache it.
+
+    Without an open cache this just calls `fn()`.
+    """
+    found, value, version = await cache_lookup(namespace, key, scope)
+    if found:
+        return value
+    value = await fn()
+    await cache_store(namespace, key, value, version, scope, ttl)
+    return value
+
+async def cache_lookup(namespace: str, key: str, scope: Optional[str] = None) -> Tuple[bool, Any, int]:
+    """Look up `namespace:key`; a miss if the cache isn't open or fails"""
+    if _cache is None:
+        return False, None, 0
+    try:
+        return await asyncio.to_thread(_cache.lookup, f"{namespace}:{key}", scope)
+    except sqlite3.Error as e:
+        # A cache problem shouldn't fail the request
+        print(f"Cache lookup failed for {namespace}: {e}")
+        return False, None, 0
+
+async def cache_store(
+    namespace: str,
+    key: str,
+    value: Any,
+    version: int = 0,
+    scope: Optional[str] = None,
+    ttl: Optional[float] = None
+):
+    """Store a value computed after `cache_lookup` returned `version`"""
+    if _cache is None:
+        return
+    try:
+        await asyncio.to_thread(_cache.store, f"{namespace}:{key}", value, version, scope, ttl)
+    except sqlite3.Error as e:
+        print(f"Cache store failed for {namespace}: {e}")
+
+async def invalidate(scope: str):
+    """Bump a scope's version if the cache is open"""
+    if _cache is not None:
+        try:
+            await asyncio.to_thread(_cache.invalidate, scope)
+        except sqlite3.Error as e:
+            print(f"Cache invalidation failed for {scope}: {e}")
+
+def tenant_scope(tenant_id: str) -> str:
+    return f"tenant:{tenant_id}"
+
+def cache_key(*parts: Any) -> str:
+    """A fixed-length key for values of any size, such as query text or result hashes"""
+    return hashlib.sha256(json.dumps(parts, default=str).encode()).hexdigest()
@@ -1,136 +1,628 @@
-from neo4j import GraphDatabase
+import asyncio
+import datetime
 import os
-from typing import Dict, Any, Optional
-import json
-from src.models.graph import Node, Relationship, ExtractedData
+from typing import Dict, Any, Optional, Callable, List, AsyncIterator, Tuple
+from collections import defaultdict, OrderedDict
+from src.services.storage import GraphStorage, STATS_TOP_HUBS
 
-driver = GraphDatabase.driver(
-    os.getenv("NEO4J_URI"),
-    auth=(os.getenv("NEO4J_USER"), os.getenv("NEO4J_PASSWORD"))
-)
+# Connection pool settings for the shared driver
+NEO4J_MAX_CONNECTION_POOL_SIZE = int(os.getenv("NEO4J_MAX_CONNECTION_POOL_SIZE", "100"))
+NEO4J_CONNECTION_ACQUISITION_TIMEOUT = float(os.getenv("NEO4J_CONNECTION_ACQUISITION_TIMEOUT", "60"))
+# Number of Bolt connections to open before the worker reports ready (0 disables warm-up)
+NEO4J_WARMUP_CONNECTIONS = int(os.getenv("NEO4J_WARMUP_CONNECTIONS", "0"))
+# Tenants whose bookmark manager is kept; older ones are dropped least recently used first
+NEO4J_BOOKMARK_MANAGERS = int(os.getenv("NEO4J_BOOKMARK_MANAGERS", "10000"))
+# Rows deleted per inner transaction, and rows deleted per progress step
+NEO4J_DELETE_BATCH_SIZE = int(os.getenv("NEO4J_DELETE_BATCH_SIZE", "1000"))
+NEO4J_DELETE_STEP_SIZE = int(os.getenv("NEO4J_DELETE_STEP_SIZE", "20000"))
+# Server-side timeout for generated read queries, so a runaway query doesn't keep running after we give up
+NEO4J_QUERY_TIMEOUT_SECONDS = float(os.getenv("NEO4J_QUERY_TIMEOUT_SECONDS", "30"))
+# Records pulled from the server per round trip when streaming an export
+NEO4J_EXPORT_FETCH_SIZE = int(os.getenv("NEO4J_EXPORT_FETCH_SIZE", "1000"))
+
+_driver = None
+_bookmark_managers: "OrderedDict[str, Any]" = OrderedDict()
+
+def init_driver():
+    """Create the shared Neo4j driver. Called once from the app lifespan."""
+    global _driver
+    if _driver is None:
+        # Imported lazily so importing the app (or a test) doesn't pay for the driver
+        from neo4j import AsyncGraphDatabase
+
+        _driver = AsyncGraphDatabase.driver(
+            os.getenv("NEO4J_URI"),
+            auth=(os.getenv("NEO4J_USER"), os.getenv("NEO4J_PASSWORD")),
+            max_connection_pool_size=NEO4J_MAX_CONNECTION_POOL_SIZE,
+            connection_acquisition_timeout=NEO4J_CONNECTION_ACQUISITION_TIMEOUT
+        )
+    return _driver
+
+def get_driver():
+    """Return the shared driver, creating it on first use outside the app (scripts, tests)"""
+    return _driver or init_driver()
+
+async def close_driver():
+    global _driver
+    if _driver is not None:
+        await _driver.close()
+        _driver = None
+    _bookmark_managers.clear()
+
+def _bookmark_manager(tenant_id: str):
+    """Return the tenant's bookmark manager, so reads wait for the tenant's earlier writes"""
+    manager = _bookmark_managers.get(tenant_id)
+    if manager is None:
+        from neo4j import AsyncGraphDatabase
+
+        manager = AsyncGraphDatabase.bookmark_manager()
+        _bookmark_managers[tenant_id] = manager
+        if len(_bookmark_managers) > NEO4J_BOOKMARK_MANAGERS:
+            _bookmark_managers.popitem(last=False)
+    else:
+        _bookmark_managers.move_to_end(tenant_id)
+    return manager
+
+def read_session(tenant_id: Optional[str] = None, **kwargs):
+    """Open a session routed to a reader (a read replica or follower in a cluster).
+
+    With a tenant id, the session is causally chained after that tenant's writes
+    from this worker, so a query right after an extract sees the new data.
+    """
+    from neo4j import READ_ACCESS
+
+    return get_driver().session(
+        default_access_mode=READ_ACCESS,
+        bookmark_manager=_bookmark_manager(tenant_id) if tenant_id else None,
+        **kwargs
+    )
+
+def write_session(tenant_id: Optional[str] = None, **kwargs):
+    """Open a session routed to the leader, recording its bookmarks for the tenant's later reads"""
+    from neo4j import WRITE_ACCESS
+
+    return get_driver().session(
+        default_access_mode=WRITE_ACCESS,
+        bookmark_manager=_bookmark_manager(tenant_id) if tenant_id else None,
+        **kwargs
+    )
+
+async def warm_up_driver(connections: int = NEO4J_WARMUP_CONNECTIONS):
+    """Verify connectivity and pre-open Bolt connections so the first requests don't pay for them"""
+    driver = get_driver()
+    await driver.verify_connectivity()
+
+    async def ping():
+        async with read_session() as session:
+            result = await session.run("RETURN 1")
+            await result.consume()
+
+    # Run the pings concurrently so each one holds its own pooled connection
+    await asyncio.gather(*(ping() for _ in range(connections)))
+    print(f"Neo4j warm-up complete ({connections} connections)")
 
 async def create_tenant(tenant_id: str, display_name: str):
     print(f"\n=== Creating Tenant ===")
     print(f"ID: {tenant_id}")
     print(f"Name: {display_name}")
 
-    with driver.session() as session:
-        # Create tenant node
-        session.run(
+    async with write_session(tenant_id) as session:
+        # Create tenant node, and its statistics, which are complete since it has no data yet
+        await session.run(
             """
             CREATE (t:Tenant {id: $tenant_id, name: $display_name, created_at: datetime()})
+            MERGE (s:TenantStats {tenant_id: $tenant_id})
+            SET s += $stats, s.complete = true, s.updated_at = datetime()
             """,
             tenant_id=tenant_id,
-            display_name=display_name
+            display_name=display_name,
+            stats=_EMPTY_STATS
         )
 
         # Create constraints if they don't exist (this is idempotent)
         constraints = [
             "CREATE CONSTRAINT tenant_id IF NOT EXISTS FOR (t:Tenant) REQUIRE t.id IS UNIQUE",
+            "CREATE CONSTRAINT tenant_stats_id IF NOT EXISTS FOR (s:TenantStats) REQUIRE s.tenant_id IS UNIQUE",
         ]
 
         for constraint in constraints:
             try:
-                session.run(constraint)
+                await session.run(constraint)
             except Exception as e:
                 print(f"Warning: Couldn't create constraint. This is normal if it already exists: {e}")
 
+async def tenant_exists(tenant_id: str) -> bool:
+    async with read_session(tenant_id) as session:
+        result = await session.run(
+            "MATCH (t:Tenant {id: $tenant_id}) RETURN count(t) as count",
+            tenant_id=tenant_id
+        )
+        return (await result.single())["count"] > 0
+
+# Per-type counts of a tenant's nodes, and of the relationships between them, most common first
+_TENANT_NODE_COUNTS = """
+MATCH (n)-[:BELONGS_TO]->(:Tenant {id: $tenant_id})
+RETURN labels(n)[0] as type, count(*) as count
+ORDER BY count DESC, type
+"""
+
+_TENANT_RELATIONSHIP_COUNTS = """
+MATCH (t:Tenant {id: $tenant_id})
+MATCH (a)-[:BELONGS_TO]->(t)
+MATCH (a)-[r]->(b)-[:BELONGS_TO]->(t)
+WHERE type(r) <> 'BELONGS_TO'
+RETURN type(r) as type, count(*) as count
+ORDER BY count DESC, type
+"""
+
 async def get_schema(tenant_id: str) -> Dict[str, Any]:
-    with driver.session() as session:
-        # Get node types
-        result = session.run(
+    async with read_session(tenant_id) as session:
+        result = await session.run(_TENANT_NODE_COUNTS, tenant_id=tenant_id)
+        node_counts = {record["type"]: record["count"] async for record in result}
+
+        result = await session.run(_TENANT_RELATIONSHIP_COUNTS, tenant_id=tenant_id)
+        rel_counts = {record["type"]: record["count"] async for record in result}
+
+        return {
+            "node_types": list(node_counts),
+            "relationship_types": list(rel_counts),
+            "node_type_counts": node_counts,
+            "relationship_type_counts": rel_counts
+        }
+
+async def run_read_query(query: str, parameters: Optional[Dict[str, Any]] = None, tenant_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    from neo4j import Query
+
+    async with read_session(tenant_id) as session:
+        result = await session.run(Query(query, timeout=NEO4J_QUERY_TIMEOUT_SECONDS), parameters or {})
+        return [_plain_value(dict(record)) async for record in result]
+
+def _plain_value(value: Any) -> Any:
+    """Convert a value from a Neo4j record to JSON types, so cached and fresh results look the same.
+
+    Nodes and relationships become their properties, paths their nodes and
+    relationships, and temporal values ISO 8601 strings.
+    """
+    if isinstance(value, dict):
+        return {key: _plain_value(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain_value(item) for item in value]
+    # neo4j.graph.Node and Relationship
+    if hasattr(value, "element_id") and hasattr(value, "items"):
+        return {key: _plain_value(item) for key, item in value.items()}
+    # neo4j.graph.Path
+    if hasattr(value, "nodes") and hasattr(value, "relationships"):
+        return {"nodes": _plain_value(list(value.nodes)), "relationships": _plain_value(list(value.relationships))}
+    # neo4j.time types, including Duration
+    if hasattr(value, "iso_format"):
+        return value.iso_format()
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    return value
+
+def quote_identifier(name: str) -> str:
+    """Quote a label or relationship type for interpolation into Cypher"""
+    return "`" + name.replace("`", "``") + "`"
+
+# A tenant's statistics live on one (:TenantStats {tenant_id}) node as parallel lists,
+# since Neo4j properties can't hold maps. `complete` is set when the node is created with
+# the tenant or recomputed; tenants created before statistics were kept don't have it, and
+# writes to them only add deltas to counts that were never initialized.
+_EMPTY_STATS = {
+    "node_types": [],
+    "node_counts": [],
+    "relationship_types": [],
+    "relationship_counts": [],
+    "hub_types": [],
+    "hub_names": [],
+    "hub_degrees": []
+}
+
+def _counts_from_lists(keys: List[str], counts: List[int]) -> Dict[str, int]:
+    return {key: count for key, count in zip(keys, counts) if count > 0}
+
+def _ranked(counts: Dict[str, int]) -> Dict[str, int]:
+    return dict(sorted(((key, count) for key, count in counts.items() if count > 0), key=lambda item: (-item[1], item[0])))
+
+def _add_counts(counts: Dict[str, int], deltas: Dict[str, int]) -> Dict[str, int]:
+    merged = dict(counts)
+    for key, delta in deltas.items():
+        merged[key] = merged.get(key, 0) + delta
+    return _ranked(merged)
+
+def _merge_hubs(hubs: Dict[tuple, int], degrees: Dict[tuple, int]) -> List[tuple]:
+    """The STATS_TOP_HUBS highest (type, name, degree) entries after applying the current `degrees`"""
+    merged = {**hubs, **degrees}
+    ranked = sorted(merged.items(), key=lambda item: (-item[1], item[0]))
+    return [(node_type, name, degree) for (node_type, name), degree in ranked[:STATS_TOP_HUBS] if degree > 0]
+
+def _stats_properties(node_counts: Dict[str, int], rel_counts: Dict[str, int], hubs: List[tuple]) -> Dict[str, Any]:
+    return {
+        "node_types": list(node_counts),
+        "node_counts": list(node_counts.values()),
+        "relationship_types": list(rel_counts),
+        "relationship_counts": list(rel_counts.values()),
+        "hub_types": [hub[0] for hub in hubs],
+        "hub_names": [hub[1] for hub in hubs],
+        "hub_degrees": [hub[2] for hub in hubs]
+    }
+
+def _unpack_stats(properties: Dict[str, Any]) -> Tuple[Dict[str, int], Dict[str, int], Dict[tuple, int]]:
+    properties = {**_EMPTY_STATS, **properties}
+    hubs = {
+        (node_type, name): degree
+        for node_type, name, degree in zip(properties["hub_types"], properties["hub_names"], properties["hub_degrees"])
+    }
+    return (
+        _counts_from_lists(properties["node_types"], properties["node_counts"]),
+        _counts_from_lists(properties["relationship_types"], properties["relationship_counts"]),
+        hubs
+    )
+
+async def _lock_stats(tx, tenant_id: str) -> Dict[str, Any]:
+    """Write-lock the tenant's stats node, creating it if needed, so concurrent writers update it in turn"""
+    result = await tx.run(
+        """
+        MERGE (s:TenantStats {tenant_id: $tenant_id})
+        SET s.version = coalesce(s.version, 0) + 1
+        RETURN properties(s) as stats
+        """,
+        tenant_id=tenant_id
+    )
+    return (await result.single())["stats"]
+
+async def bulk_upsert(tenant_id: str, nodes: List[Dict[str, Any]], relationships: List[Dict[str, Any]]) -> Dict[str, int]:
+    """Merge nodes and relationships for a tenant in one transaction using UNWIND.
+
+    Nodes need `type` and `name`. Relationships need `from_id`, `to_id` and `type`,
+    and may carry `from_type` and `to_type` to match their endpoints by label.
+    The tenant's statistics are updated in the same transaction: node and
+    relationship counts from the write counters, each node's `degree` property
+    when a relationship is created, and the top hubs from the endpoints' new degrees.
+    """
+    nodes_by_type = defaultdict(list)
+    for node in nodes:
+        nodes_by_type[node["type"]].append(node["name"])
+
+    rels_by_type = defaultdict(list)
+    for rel in relationships:
+        key = (rel["type"], rel.get("from_type"), rel.get("to_type"))
+        rels_by_type[key].append({"from_id": rel["from_id"], "to_id": rel["to_id"]})
+
+    async def work(tx) -> Dict[str, int]:
+        counts = {"nodes_created": 0, "relationships_created": 0}
+        node_counts, rel_counts, hubs = _unpack_stats(await _lock_stats(tx, tenant_id))
+        node_deltas: Dict[str, int] = {}
+        rel_deltas: Dict[str, int] = {}
+        degrees: Dict[tuple, int] = {}
+
+        # Labels and types can't be parameters, so there is one statement per label or type
+        for node_type, names in nodes_by_type.items():
+            result = await tx.run(
+                f"""
+                MATCH (t:Tenant {{id: $tenant_id}})
+                UNWIND $names AS name
+                MERGE (n:{quote_identifier(node_type)} {{name: name}})
+                MERGE (n)-[:BELONGS_TO]->(t)
+                """,
+                tenant_id=tenant_id,
+                names=names
+            )
+            counters = (await result.consume()).counters
+            counts["nodes_created"] += counters.nodes_created
+            # A node is new to the tenant when its BELONGS_TO link is, even if another tenant created it
+            node_deltas[node_type] = counters.relationships_created
+
+        for (rel_type, from_type, to_type), rows in rels_by_type.items():
+            from_label = f":{quote_identifier(from_type)}" if from_type else ""
+            to_label = f":{quote_identifier(to_type)}" if to_type else ""
+            result = await tx.run(
+                f"""
+                MATCH (t:Tenant {{id: $tenant_id}})
+                UNWIND $rows AS row
+                MATCH (from{from_label} {{name: row.from_id}})-[:BELONGS_TO]->(t)
+                MATCH (to{to_label} {{name: row.to_id}})-[:BELONGS_TO]->(t)
+                MERGE (from)-[:{quote_identifier(rel_type)}]->(to)
+                ON CREATE SET from.degree = coalesce(from.degree, 0) + 1, to.degree = coalesce(to.degree, 0) + 1
+                RETURN labels(from)[0] as from_type, from.name as from_name, from.degree as from_degree,
+                       labels(to)[0] as to_type, to.name as to_name, to.degree as to_degree
+                """,
+                tenant_id=tenant_id,
+                rows=rows
+            )
+            async for record in result:
+                degrees[(record["from_type"], record["from_name"])] = record["from_degree"] or 0
+                degrees[(record["to_type"], record["to_name"])] = record["to_degree"] or 0
+            created = (await result.consume()).counters.relationships_created
+            counts["relationships_created"] += created
+            rel_deltas[rel_type] = rel_deltas.get(rel_type, 0) + created
+
+        await tx.run(
+            "MATCH (s:TenantStats {tenant_id: $tenant_id}) SET s += $stats, s.updated_at = datetime()",
+            tenant_id=tenant_id,
+            stats=_stats_properties(
+                _add_counts(node_counts, node_deltas),
+                _add_counts(rel_counts, rel_deltas),
+                _merge_hubs(hubs, degrees)
+            )
+        )
+        return counts
+
+    async with write_session(tenant_id) as session:
+        return await session.execute_write(work)
+
+async def export_tenant(tenant_id: str) -> AsyncIterator[Dict[str, Any]]:
+    """Stream a tenant as records: one tenant record, then its nodes, then its relationships.
+
+    Results are read through the driver's cursor, `NEO4J_EXPORT_FETCH_SIZE` records at a time,
+    so memory use doesn't grow with the size of the tenant.
+    """
+    async with read_session(tenant_id, fetch_size=NEO4J_EXPORT_FETCH_SIZE) as session:
+        result = await session.run(
+            "MATCH (t:Tenant {id: $tenant_id}) RETURN t.name as name",
+            tenant_id=tenant_id
+        )
+        tenant = await result.single()
+        if tenant is None:
+            return
+        yield {"kind": "tenant", "id": tenant_id, "name": tenant["name"]}
+
+        result = await session.run(
             """
-            MATCH (n)
-            WHERE n:Tenant AND n.id = $tenant_id OR
-                  EXISTS((n)<-[:BELONGS_TO]-(:Tenant {id: $tenant_id}))
-            RETURN DISTINCT labels(n) as node_types
+            MATCH (n)-[:BELONGS_TO]->(:Tenant {id: $tenant_id})
+            RETURN labels(n)[0] as type, n.name as name
             """,
             tenant_id=tenant_id
         )
-        node_types = [record["node_types"][0] for record in result if record["node_types"][0] != "Tenant"]
+        async for record in result:
+            yield {"kind": "node", "type": record["type"], "name": record["name"]}
 
-        # Get relationship types
-        result = session.run(
+        result = await session.run(
             """
-            MATCH (a)-[r]->(b)
-            WHERE
-                (a:Tenant AND a.id = $tenant_id) OR
-                (b:Tenant AND b.id = $tenant_id) OR
-                EXISTS((a)<-[:BELONGS_TO]-(:Tenant {id: $tenant_id})) OR
-                EXISTS((b)<-[:BELONGS_TO]-(:Tenant {id: $tenant_id}))
-            RETURN DISTINCT type(r) as rel_type
+            MATCH (t:Tenant {id: $tenant_id})
+            MATCH (a)-[:BELONGS_TO]->(t)
+            MATCH (a)-[r]->(b)-[:BELONGS_TO]->(t)
+            WHERE type(r) <> 'BELONGS_TO'
+            RETURN labels(a)[0] as from_type, a.name as from_id,
+                   type(r) as type,
+                   labels(b)[0] as to_type, b.name as to_id
             """,
             tenant_id=tenant_id
         )
-        rel_types = [record["rel_type"] for record in result if record["rel_type"] != "BELONGS_TO"]
+        async for record in result:
+            yield {"kind": "relationship", **dict(record)}
+
+# Each step deletes up to $step_size rows, committing every $batch_size rows.
+# CALL { ... } IN TRANSACTIONS only works in auto-commit transactions (session.run).
+_DELETE_STEPS = [
+    # Nodes shared with another tenant only lose their link to this one
+    ("links_removed", """
+        MATCH (n)-[b:BELONGS_TO]->(:Tenant {id: $tenant_id})
+        WHERE EXISTS { (n)-[:BELONGS_TO]->(other:Tenant) WHERE other.id <> $tenant_id }
+        WITH b LIMIT $step_size
+        CALL { WITH b DELETE b } IN TRANSACTIONS OF $batch_size ROWS
+        RETURN count(*) as deleted
+    """),
+    # Delete relationships separately so a high-degree node can't make one huge transaction.
+    # Endpoints that survive, shared with other tenants, keep an accurate degree.
+    ("relationships_deleted", """
+        MATCH (n)-[:BELONGS_TO]->(:Tenant {id: $tenant_id})
+        MATCH (n)-[r]-()
+        WHERE type(r) <> 'BELONGS_TO'
+        WITH DISTINCT r LIMIT $step_size
+        CALL {
+            WITH r
+            WITH r, startNode(r) as a, endNode(r) as b
+            SET a.degree = coalesce(a.degree, 1) - 1, b.degree = coalesce(b.degree, 1) - 1
+            DELETE r
+        } IN TRANSACTIONS OF $batch_size ROWS
+        RETURN count(*) as deleted
+    """),
+    ("nodes_deleted", """
+        MATCH (n)-[:BELONGS_TO]->(:Tenant {id: $tenant_id})
+        WITH n LIMIT $step_size
+        CALL { WITH n DETACH DELETE n } IN TRANSACTIONS OF $batch_size ROWS
+        RETURN count(*) as deleted
+    """),
+]
+
+async def delete_tenant_data(
+    tenant_id: str,
+    batch_size: int = NEO4J_DELETE_BATCH_SIZE,
+    step_size: int = NEO4J_DELETE_STEP_SIZE,
+    on_progress: Optional[Callable[[str, int], None]] = None
+) -> Dict[str, int]:
+    """Delete a tenant's graph in bounded transactions, keeping the Tenant node.
+
+    Relationships between two nodes that are both shared with other tenants are left in place.
+    `on_progress` is called with the counter name and the number of rows deleted after each step.
+    """
+    totals = {name: 0 for name, _ in _DELETE_STEPS}
+    async with write_session(tenant_id) as session:
+        for name, query in _DELETE_STEPS:
+            while True:
+                result = await session.run(query, tenant_id=tenant_id, batch_size=batch_size, step_size=step_size)
+                deleted = (await result.single())["deleted"]
+                if deleted == 0:
+                    break
+                totals[name] += deleted
+                if on_progress:
+                    on_progress(name, deleted)
+        # The tenant is now empty, so its statistics are known even if they weren't before
+        await session.run(
+            "MERGE (s:TenantStats {tenant_id: $tenant_id}) SET s += $stats, s.complete = true, s.updated_at = datetime()",
+            tenant_id=tenant_id,
+            stats=_EMPTY_STATS
+        )
+    return totals
+
+async def delete_tenant(tenant_id: str):
+    """Delete the Tenant node itself. Call delete_tenant_data first."""
+    async with write_session(tenant_id) as session:
+        await session.run("MATCH (t:Tenant {id: $tenant_id}) DETACH DELETE t", tenant_id=tenant_id)
+        await session.run("MATCH (s:TenantStats {tenant_id: $tenant_id}) DELETE s", tenant_id=tenant_id)
 
+async def get_stats(tenant_id: str, top_k: int = 10) -> Dict[str, Any]:
+    """Read the tenant's statistics node; a single index lookup however large the tenant is"""
+    async with read_session(tenant_id) as session:
+        result = await session.run(
+            "MATCH (s:TenantStats {tenant_id: $tenant_id}) RETURN properties(s) as stats",
+            tenant_id=tenant_id
+        )
+        record = await result.single()
+    properties = record["stats"] if record else {}
+    if not properties.get("complete"):
         return {
-            "node_types": node_types,
-            "relationship_types": rel_types
+            "tenant_id": tenant_id,
+            "node_count": None,
+            "relationship_count": None,
+            "node_type_counts": None,
+            "relationship_type_counts": None,
+            "top_hubs": None,
+            "reconciled_at": None
         }
+    node_counts, rel_counts, hubs = _unpack_stats(properties)
+    node_counts = _ranked(node_counts)
+    rel_counts = _ranked(rel_counts)
+    reconciled_at = properties.get("reconciled_at")
+    return {
+        "tenant_id": tenant_id,
+        "node_count": sum(node_counts.values()),
+        "relationship_count": sum(rel_counts.values()),
+        "node_type_counts": node_counts,
+        "relationship_type_counts": rel_counts,
+        "top_hubs": [
+            {"type": node_type, "name": name, "degree": degree}
+            for node_type, name, degree in _merge_hubs(hubs, {})[:top_k]
+        ],
+        "reconciled_at": reconciled_at.iso_format() if reconciled_at is not None else None
+    }
+
+# Sets `degree` on the tenant's nodes where it is missing or wrong, committing every $batch_size rows
+_RECONCILE_DEGREES = """
+    MATCH (n)-[:BELONGS_TO]->(:Tenant {id: $tenant_id})
+    WITH n, size([(n)-[r]-() WHERE type(r) <> 'BELONGS_TO' | r]) as degree
+    WHERE n.degree IS NULL OR n.degree <> degree
+    CALL { WITH n, degree SET n.degree = degree } IN TRANSACTIONS OF $batch_size ROWS
+    RETURN count(*) as corrected
+"""
+
+async def reconcile_stats(tenant_id: str, batch_size: int = NEO4J_DELETE_BATCH_SIZE) -> Dict[str, Any]:
+    """Recompute a tenant's statistics and node degrees from its graph.
+
+    Corrects drift from writes that bypass bulk_upsert and from other tenants'
+    purges, which change the degree of shared nodes. Degrees are fixed in
+    bounded transactions; the counts and hubs are then replaced in one.
+    """
+    async with write_session(tenant_id) as session:
+        result = await session.run(_RECONCILE_DEGREES, tenant_id=tenant_id, batch_size=batch_size)
+        degrees_corrected = (await result.single())["corrected"]
+
+        async def work(tx) -> Dict[str, int]:
+            node_counts, rel_counts, _ = _unpack_stats(await _lock_stats(tx, tenant_id))
+
+            result = await tx.run(_TENANT_NODE_COUNTS, tenant_id=tenant_id)
+            actual_nodes = {record["type"]: record["count"] async for record in result}
+
+            result = await tx.run(_TENANT_RELATIONSHIP_COUNTS, tenant_id=tenant_id)
+            actual_rels = {record["type"]: record["count"] async for record in result}
+
+            result = await tx.run(
+                """
+                MATCH (n)-[:BELONGS_TO]->(:Tenant {id: $tenant_id})
+                WHERE n.degree > 0
+                RETURN labels(n)[0] as type, n.name as name, n.degree as degree
+                ORDER BY degree DESC, type, name
+                LIMIT $limit
+                """,
+                tenant_id=tenant_id,
+                limit=STATS_TOP_HUBS
+            )
+            hubs = [(record["type"], record["name"], record["degree"]) async for record in result]
 
-async def insert_graph_data(tenant_id: str, data: ExtractedData) -> bool:
-    try:
-        print(f"\n=== Inserting Graph Data ===")
-        print(f"Tenant ID: {tenant_id}")
-        print(f"Nodes: {len(data['nodes'])}")
-        print(f"Relationships: {len(data['relationships'])}")
-
-        # First, ensure tenant exists
-        with driver.session() as session:
-            tenant_check = session.run(
-                "MATCH (t:Tenant {id: $tenant_id}) RETURN count(t) as count",
-                tenant_id=tenant_id
+            await tx.run(
+                """
+                MATCH (s:TenantStats {tenant_id: $tenant_id})
+                SET s += $stats, s.complete = true, s.updated_at = datetime(), s.reconciled_at = datetime()
+                """,
+                tenant_id=tenant_id,
+                stats=_stats_properties(_ranked(actual_nodes), _ranked(actual_rels), hubs)
             )
-            tenant_exists = tenant_check.single()["count"] > 0
-
-            if not tenant_exists:
-                print(f"Error: Tenant {tenant_id} does not exist")
-                return False
-
-        # Create nodes and link them to tenant
-        for node in data["nodes"]:
-            with driver.session() as session:
-                # Create node with Tenant relationship
-                session.run(
-                    f"""
-                    MATCH (t:Tenant {{id: $tenant_id}})
-                    MERGE (n:{node['type']} {{name: $name}})
-                    MERGE (n)-[:BELONGS_TO]->(t)
-                    """,
-                    tenant_id=tenant_id,
-                    name=node["name"]
-                )
-                print(f"Created/Updated node: {node['type']} - {node['name']}")
-
-        # Create relationships
-        for rel in data["relationships"]:
-            with driver.session() as session:
-                # Find the from and to nodes within this tenant's context
-                result = session.run(
-                    f"""
-                    MATCH (from)-[:BELONGS_TO]->(t:Tenant {{id: $tenant_id}}),
-                          (to)-[:BELONGS_TO]->(t:Tenant {{id: $tenant_id}})
-                    WHERE from.name = $from_name AND to.name = $to_name
-                    MERGE (from)-[r:{rel['type']}]->(to)
-                    RETURN count(r) as created
-                    """,
-                    tenant_id=tenant_id,
-                    from_name=rel["from_id"],
-                    to_name=rel["to_id"]
-                )
-                created = result.single()["created"]
-                print(f"Relationship: {rel['from_id']} -[{rel['type']}]-> {rel['to_id']} (created: {created})")
-
-        return True
-    except Exception as e:
-        print(f"Error inserting graph data: {e}")
-        import traceback
-        traceback.print_exc()
-        return False
-
-async def cleanup_database():
+            return {
+                "node_counts_corrected": _count_drift(node_counts, actual_nodes),
+                "relationship_counts_corrected": _count_drift(rel_counts, actual_rels)
+            }
+
+        drift = await session.execute_write(work)
+    return {**drift, "degrees_corrected": degrees_corrected}
+
+def _count_drift(stored: Dict[str, int], actual: Dict[str, int]) -> int:
+    """How many types had a stored count that differed from the recomputed one"""
+    return sum(1 for key in stored.keys() | actual.keys() if stored.get(key, 0) != actual.get(key, 0))
+
+async def cleanup_database(batch_size: int = NEO4J_DELETE_BATCH_SIZE):
     """Delete all nodes and relationships in the database - use for testing only"""
-    with driver.session() as session:
-        session.run("MATCH (n) DETACH DELETE n")
+    async with write_session() as session:
+        result = await session.run(
+            """
+            MATCH (n)
+            CALL { WITH n DETACH DELETE n } IN TRANSACTIONS OF $batch_size ROWS
+            """,
+            batch_size=batch_size
+        )
+        await result.consume()
         print("Database cleaned up")
+
+
+class Neo4jStorage(GraphStorage):
+    """GraphStorage backed by the shared Neo4j driver"""
+
+    async def start(self):
+        init_driver()
+        # Optionally open Bolt connections before the worker starts accepting requests
+        if NEO4J_WARMUP_CONNECTIONS > 0:
+            await warm_up_driver(NEO4J_WARMUP_CONNECTIONS)
+
+    async def close(self):
+        await close_driver()
+
+    def is_outage(self, error: BaseException) -> bool:
+        # Client errors (bad Cypher, constraint violations, query timeouts) are the request's fault
+        from neo4j.exceptions import ClientError
+
+        return not isinstance(error, (ClientError, ValueError))
+
+    async def create_tenant(self, tenant_id: str, display_name: str):
+        await create_tenant(tenant_id, display_name)
+
+    async def tenant_exists(self, tenant_id: str) -> bool:
+        return await tenant_exists(tenant_id)
+
+    async def get_schema(self, tenant_id: str) -> Dict[str, Any]:
+        return await get_schema(tenant_id)
+
+    async def bulk_upsert(self, tenant_id: str, nodes: List[Dict[str, Any]], relationships: List[Dict[str, Any]]) -> Dict[str, int]:
+        return await bulk_upsert(tenant_id, nodes, relationships)
+
+    async def run_read_query(self, query: str, parameters: Optional[Dict[str, Any]] = None, tenant_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        return await run_read_query(query, parameters, tenant_id)
+
+    def export_tenant(self, tenant_id: str) -> AsyncIterator[Dict[str, Any]]:
+        return export_tenant(tenant_id)
+
+    async def delete_tenant_data(
+        self,
+        tenant_id: str,
+        batch_size: Optional[int] = None,
+        on_progress: Optional[Callable[[str, int], None]] = None
+    ) -> Dict[str, int]:
+        return await delete_tenant_data(tenant_id, batch_size=batch_size or NEO4J_DELETE_BATCH_SIZE, on_progress=on_progress)
+
+    async def delete_tenant(self, tenant_id: str):
+        await delete_tenant(tenant_id)
+
+    async def get_stats(self, tenant_id: str, top_k: int = 10) -> Dict[str, Any]:
+        return await get_stats(tenant_id, top_k)
+
+    async def reconcile_stats(self, tenant_id: str, batch_size: Optional[int] = None) -> Dict[str, Any]:
+        return await reconcile_stats(tenant_id, batch_size=batch_size or NEO4J_DELETE_BATCH_SIZE)
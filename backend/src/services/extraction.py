@@ -1,51 +1,11 @@
-from openai import OpenAI
-from typing import Optional, Dict, Any
-import os
+from typing import Dict, Any
 import json
 import traceback
-from src.models.graph import ExtractedData
-from src.services.database import get_schema, insert_graph_data
-
-openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
-def validate_extracted_data(data: dict) -> Optional[ExtractedData]:
-    """Validate that extracted data follows the expected format"""
-    try:
-        if not isinstance(data, dict):
-            return None
-
-        # Check for required keys
-        if "nodes" not in data or "relationships" not in data:
-            return None
-
-        # Check nodes format
-        if not isinstance(data["nodes"], list):
-            return None
-
-        for node in data["nodes"]:
-            if not isinstance(node, dict):
-                return None
-            if "type" not in node or "name" not in node:
-                return None
-
-        # Check relationships format
-        if not isinstance(data["relationships"], list):
-            return None
-
-        for rel in data["relationships"]:
-            if not isinstance(rel, dict):
-                return None
-            if "from_id" not in rel or "to_id" not in rel or "type" not in rel:
-                return None
-
-        # If we got here, basic validation passed
-        return ExtractedData(
-            nodes=data["nodes"],
-            relationships=data["relationships"]
-        )
-    except Exception as e:
-        print(f"Validation error: {e}")
-        return None
+from src.services.storage import get_storage, get_schema
+from src.services.normalization import parse_extracted_data, normalize_extracted_data
+from src.services.llm import chat_completion
+from src.services.prompts import build_prompt
+from src.utils.resilience import CircuitOpenError, DeadlineExceeded
 
 def strip_markdown_codeblock(text: str) -> str:
     """Remove markdown code block syntax if present"""
@@ -57,39 +17,43 @@ def strip_markdown_codeblock(text: str) -> str:
 
     return text
 
-async def extract_data(tenant_id: str, text: str) -> Dict[str, Any]:
-    try:
-        # Get existing schema for the tenant
-        schema = await get_schema(tenant_id)
+EXTRACTION_INSTRUCTIONS = """
+Extract entities and relationships from the following text. Focus on identifying:
 
-        prompt = f"""
-        Extract entities and relationships from the following text. Focus on identifying:
+1. Entities (nodes) with their types and names
+2. Relationships between entities
 
-        1. Entities (nodes) with their types and names
-        2. Relationships between entities
+Return the extracted information as a JSON object with the following structure:
+{
+    "nodes": [
+        { "type": "EntityType", "name": "EntityName" },
+        ...
+    ],
+    "relationships": [
+        { "from_id": "EntityName1", "to_id": "EntityName2", "type": "RELATIONSHIP_TYPE" },
+        ...
+    ]
+}
 
-        Current schema (if any):
-        Node types: {schema['node_types']}
-        Relationship types: {schema['relationship_types']}
+Current schema (if any). Reuse these types where they fit:"""
 
-        Return the extracted information as a JSON object with the following structure:
-        {{
-            "nodes": [
-                {{ "type": "EntityType", "name": "EntityName" }},
-                ...
-            ],
-            "relationships": [
-                {{ "from_id": "EntityName1", "to_id": "EntityName2", "type": "RELATIONSHIP_TYPE" }},
-                ...
-            ]
-        }}
+async def extract_data(tenant_id: str, text: str) -> Dict[str, Any]:
+    try:
+        # Get existing schema for the tenant
+        schema = await get_schema(tenant_id)
 
-        TEXT TO ANALYZE:
-        {text}
-        """
+        # Fixed instructions first and the text last, so consecutive calls share a cacheable prefix
+        prompt = build_prompt(
+            "extract",
+            instructions=EXTRACTION_INSTRUCTIONS,
+            schema=schema,
+            text=text,
+            tail=f"TEXT TO ANALYZE:\n{text}\n"
+        )["prompt"]
 
         print("Calling OpenAI to extract data...")
-        response = openai_client.chat.completions.create(
+        response = await chat_completion(
+            operation="extract",
             model="gpt-4o-2024-05-13",
             messages=[
                 {"role": "system", "content": "You are a skilled information extraction system that identifies entities and relationships from text and returns them in a structured format."},
@@ -109,28 +73,36 @@ async def extract_data(tenant_id: str, text: str) -> Dict[str, Any]:
         extraction_result = json.loads(cleaned_text)
 
         # Validate the structure
-        validated_data = validate_extracted_data(extraction_result)
+        payload = parse_extracted_data(extraction_result)
 
-        if not validated_data:
+        if payload is None:
             return {"error": "Invalid extraction format", "raw_result": extraction_result}
 
+        # Canonicalize type names and drop duplicates and dangling relationships before writing
+        validated_data = normalize_extracted_data(payload)
+
         # Insert the data into the graph database
-        insert_success = await insert_graph_data(tenant_id, validated_data)
+        insert_success = await get_storage().insert_graph_data(tenant_id, validated_data)
 
         if not insert_success:
             return {
                 "error": "Failed to insert data",
                 "nodes": validated_data["nodes"],
-                "relationships": validated_data["relationships"]
+                "relationships": validated_data["relationships"],
+                "removed": validated_data["removed"]
             }
 
         # Return the extracted data
         return {
             "success": True,
             "nodes": validated_data["nodes"],
-            "relationships": validated_data["relationships"]
+            "relationships": validated_data["relationships"],
+            "removed": validated_data["removed"]
         }
 
+    except (CircuitOpenError, DeadlineExceeded):
+        # Surfaced as 503/504 by the app's exception handlers
+        raise
     except Exception as e:
         traceback_str = traceback.format_exc()
         print(f"Error in extraction: {e}")
@@ -0,0 +1,120 @@
+import asyncio
+import os
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+from src.services.cache import cache_lookup, cache_store
+
+# Finished jobs kept around for status queries
+MAX_FINISHED_JOBS = 100
+# How often a running job's status is copied to the shared cache, and how long it is kept there
+JOB_PUBLISH_INTERVAL = float(os.getenv("JOB_PUBLISH_INTERVAL", "1"))
+JOB_STATUS_TTL = float(os.getenv("JOB_STATUS_TTL", "86400"))
+
+class Job:
+    """A background operation with progress counters and throughput metrics.
+
+    Jobs run in the worker that started them. Their status is copied to the
+    shared cache as they progress, so any worker on the host can report it;
+    without the cache only the starting worker can.
+    """
+
+    def __init__(self, kind: str, tenant_id: Optional[str] = None):
+        self.id = str(uuid.uuid4())
+        self.kind = kind
+        self.tenant_id = tenant_id
+        self.status = "pending"
+        self.progress: Dict[str, int] = {}
+        self.result: Optional[Any] = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+
+    def advance(self, counter: str, amount: int):
+        self.progress[counter] = self.progress.get(counter, 0) + amount
+
+    def to_dict(self) -> Dict[str, Any]:
+        elapsed = None
+        throughput = None
+        if self.started_at is not None:
+            elapsed = (self.finished_at or time.time()) - self.started_at
+            if elapsed > 0:
+                throughput = sum(self.progress.values()) / elapsed
+
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "tenant_id": self.tenant_id,
+            "status": self.status,
+            "progress": self.progress,
+            "result": self.result,
+            "error": self.error,
+            "elapsed_seconds": elapsed,
+            "rows_per_second": throughput
+        }
+
+    async def publish(self):
+        await cache_store("job", self.id, self.to_dict(), ttl=JOB_STATUS_TTL)
+
+_jobs: "OrderedDict[str, Job]" = OrderedDict()
+
+def start_job(kind: str, tenant_id: Optional[str], fn: Callable[[Job], Awaitable[Any]]) -> Job:
+    """Run `fn(job)` as a background task and return the job immediately"""
+    job = Job(kind, tenant_id)
+
+    async def publish_progress():
+        while True:
+            await job.publish()
+            await asyncio.sleep(JOB_PUBLISH_INTERVAL)
+
+    async def run():
+        job.status = "running"
+        job.started_at = time.time()
+        publisher = asyncio.create_task(publish_progress())
+        try:
+            job.result = await fn(job)
+            job.status = "completed"
+        except asyncio.CancelledError:
+            job.status = "cancelled"
+            raise
+        except Exception as e:
+            print(f"Error in {kind} job {job.id}: {e}")
+            traceback.print_exc()
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.finished_at = time.time()
+            publisher.cancel()
+            await job.publish()
+            _prune_finished()
+
+    _jobs[job.id] = job
+    job.task = asyncio.create_task(run())
+    return job
+
+def get_job(job_id: str) -> Optional[Job]:
+    return _jobs.get(job_id)
+
+async def get_job_status(job_id: str) -> Optional[Dict[str, Any]]:
+    """Status of a job started by this worker, or by another one through the shared cache"""
+    job = get_job(job_id)
+    if job is not None:
+        return job.to_dict()
+    found, status, _ = await cache_lookup("job", job_id)
+    return status if found else None
+
+def _prune_finished():
+    finished = [job_id for job_id, job in _jobs.items() if job.finished_at is not None]
+    for job_id in finished[:-MAX_FINISHED_JOBS]:
+        del _jobs[job_id]
+
+async def cancel_jobs():
+    """Cancel running jobs on shutdown. Deletes commit in batches, so a cancelled purge can simply be restarted."""
+    tasks = [job.task for job in _jobs.values() if job.task is not None and not job.task.done()]
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
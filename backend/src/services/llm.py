@@ -0,0 +1,108 @@
+import os
+from typing import Any, Dict, Optional
+from src.utils.resilience import CircuitBreaker, HedgePolicy, with_deadline
+from src.services.scheduler import record_llm_usage
+from src.services.prompts import record_api_usage
+
+# Connection pool limits for the shared OpenAI HTTP client
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "100"))
+OPENAI_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("OPENAI_MAX_KEEPALIVE_CONNECTIONS", "20"))
+
+# Default deadline for one chat completion, including hedged attempts
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "45"))
+# Send a duplicate request once a call is slower than this percentile of recent calls
+LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "true").lower() == "true"
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "0.95"))
+LLM_HEDGE_MIN_DELAY = float(os.getenv("LLM_HEDGE_MIN_DELAY", "2.0"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+# Consecutive failures that open the breaker, and how long it stays open
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_RESET_SECONDS = float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
+
+_client = None
+
+def init_openai_client(client: Optional[Any] = None):
+    """Create the shared OpenAI client. Called once from the app lifespan.
+
+    Tests can pass a stand-in with the same `chat.completions.create` interface.
+    """
+    global _client
+    if client is not None:
+        _client = client
+    if _client is None:
+        # Imported lazily so importing the app (or a test) doesn't pay for the SDK
+        import httpx
+        from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+        _client = AsyncOpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            http_client=DefaultAsyncHttpxClient(
+                limits=httpx.Limits(
+                    max_connections=OPENAI_MAX_CONNECTIONS,
+                    max_keepalive_connections=OPENAI_MAX_KEEPALIVE_CONNECTIONS
+                )
+            )
+        )
+    return _client
+
+def get_openai_client():
+    """Return the shared client, creating it on first use outside the app (scripts, tests)"""
+    return _client or init_openai_client()
+
+async def close_openai_client():
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
+
+def _is_outage(error: BaseException) -> bool:
+    """Only errors that say the API is unhealthy count against the breaker, not bad requests"""
+    status_code = getattr(error, "status_code", None)
+    if status_code is not None:
+        return status_code >= 500 or status_code == 429
+    return True
+
+llm_breaker = CircuitBreaker(
+    "openai",
+    failure_threshold=LLM_BREAKER_FAILURES,
+    reset_timeout=LLM_BREAKER_RESET_SECONDS,
+    is_failure=_is_outage
+)
+
+# Latency differs a lot between prompts, so each operation has its own hedge threshold
+_hedge_policies: Dict[str, HedgePolicy] = {}
+
+def _hedge_policy(operation: str) -> HedgePolicy:
+    policy = _hedge_policies.get(operation)
+    if policy is None:
+        policy = HedgePolicy(
+            f"openai.{operation}",
+            percentile=LLM_HEDGE_PERCENTILE,
+            min_delay=LLM_HEDGE_MIN_DELAY,
+            min_samples=LLM_HEDGE_MIN_SAMPLES,
+            enabled=LLM_HEDGE_ENABLED
+        )
+        _hedge_policies[operation] = policy
+    return policy
+
+async def chat_completion(operation: str = "default", deadline: Optional[float] = None, **kwargs) -> Any:
+    """Run a chat completion on the shared client.
+
+    The call fails fast with CircuitOpenError while the API is down, is hedged
+    with a duplicate request when it runs slower than usual for `operation`, and
+    raises DeadlineExceeded after `deadline` seconds (LLM_TIMEOUT_SECONDS by default).
+    Token usage is charged to the tenant the scheduler is running the request for.
+    """
+    async def attempt():
+        return await get_openai_client().chat.completions.create(**kwargs)
+
+    async def hedged():
+        return await _hedge_policy(operation).run(attempt)
+
+    seconds = deadline if deadline is not None else LLM_TIMEOUT_SECONDS
+    response = await llm_breaker.call(lambda: with_deadline(hedged(), seconds, f"OpenAI {operation}"))
+    # Charge the tokens to the requesting tenant's budget (a cancelled hedge's tokens aren't reported)
+    usage = getattr(response, "usage", None)
+    record_llm_usage(getattr(usage, "total_tokens", 0) or 0)
+    record_api_usage(operation, usage)
+    return response
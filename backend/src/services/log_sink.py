@@ -0,0 +1,253 @@
+import asyncio
+import gzip
+import json
+import os
+import shutil
+import sys
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking, single worker only
+    fcntl = None
+
+LOG_SINK_PATH = os.getenv("LOG_SINK_PATH", "extraction_test_results.jsonl")
+# Rotate when the file would grow past this many bytes (0 disables size-based rotation)
+LOG_SINK_MAX_BYTES = int(os.getenv("LOG_SINK_MAX_BYTES", str(50 * 1024 * 1024)))
+# Rotate when the last write to the file was in an earlier interval (0 disables time-based rotation)
+LOG_SINK_ROTATE_SECONDS = int(os.getenv("LOG_SINK_ROTATE_SECONDS", "0"))
+LOG_SINK_COMPRESS = os.getenv("LOG_SINK_COMPRESS", "false").lower() == "true"
+LOG_SINK_QUEUE_SIZE = int(os.getenv("LOG_SINK_QUEUE_SIZE", "10000"))
+LOG_SINK_BATCH_SIZE = int(os.getenv("LOG_SINK_BATCH_SIZE", "500"))
+LOG_SINK_FLUSH_INTERVAL = float(os.getenv("LOG_SINK_FLUSH_INTERVAL", "1.0"))
+# How long a request waits for queue space before it is rejected
+LOG_SINK_PUT_TIMEOUT = float(os.getenv("LOG_SINK_PUT_TIMEOUT", "5.0"))
+# Attempts to write a batch before it is written to stderr instead
+LOG_SINK_MAX_RETRIES = int(os.getenv("LOG_SINK_MAX_RETRIES", "5"))
+# How long shutdown waits for queued entries to be written
+LOG_SINK_CLOSE_TIMEOUT = float(os.getenv("LOG_SINK_CLOSE_TIMEOUT", "10.0"))
+
+class LogSinkFullError(Exception):
+    """Raised when the queue stays full for longer than the put timeout"""
+
+class LogSinkClosedError(Exception):
+    """Raised for entries written once the sink has started closing"""
+
+class JsonlLogSink:
+    """Appends JSON lines to a file in batches from a background task.
+
+    Entries are queued in memory and written by a single task per process.
+    Each batch is written with one `write` call while holding an exclusive
+    lock on the file, so lines from different workers never interleave.
+    """
+
+    def __init__(
+        self,
+        path: str = LOG_SINK_PATH,
+        max_bytes: int = LOG_SINK_MAX_BYTES,
+        rotate_seconds: int = LOG_SINK_ROTATE_SECONDS,
+        compress: bool = LOG_SINK_COMPRESS,
+        queue_size: int = LOG_SINK_QUEUE_SIZE,
+        batch_size: int = LOG_SINK_BATCH_SIZE,
+        flush_interval: float = LOG_SINK_FLUSH_INTERVAL,
+        put_timeout: float = LOG_SINK_PUT_TIMEOUT,
+        max_retries: int = LOG_SINK_MAX_RETRIES,
+        close_timeout: float = LOG_SINK_CLOSE_TIMEOUT
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.rotate_seconds = rotate_seconds
+        self.compress = compress
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self.max_retries = max_retries
+        self.close_timeout = close_timeout
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._task: Optional[asyncio.Task] = None
+        self._closed = False
+        self.written = 0
+        self.rotations = 0
+        self.write_errors = 0
+        self.dropped_to_stderr = 0
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def write(self, entry: Dict[str, Any]):
+        """Queue an entry, waiting for space if the writer is behind"""
+        if self._closed:
+            raise LogSinkClosedError("Log sink is closed")
+        line = json.dumps(entry) + "\n"
+        try:
+            await asyncio.wait_for(self._queue.put(line), timeout=self.put_timeout)
+        except asyncio.TimeoutError:
+            raise LogSinkFullError(f"Log queue full for {self.put_timeout}s")
+        # A writer that waited for space may get in after the final drain; nobody would write its entry
+        if self._closed and (self._task is None or self._task.done()):
+            raise LogSinkClosedError("Log sink closed before the entry was written")
+
+    async def close(self, timeout: Optional[float] = None):
+        """Stop accepting entries and wait until everything queued is on disk.
+
+        Gives up after `timeout` seconds (LOG_SINK_CLOSE_TIMEOUT by default),
+        cancelling the writer, so a failing disk can't hang shutdown.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        if self._task is None:
+            return
+        timeout = self.close_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        try:
+            await asyncio.wait_for(self._queue.put(None), timeout=timeout)
+            await asyncio.wait_for(self._task, timeout=max(0.0, deadline - time.monotonic()))
+        except asyncio.TimeoutError:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            print(f"Log sink not flushed within {timeout}s, {self._queue.qsize()} queued entries were not written")
+        self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "rotations": self.rotations,
+            "write_errors": self.write_errors,
+            "dropped_to_stderr": self.dropped_to_stderr
+        }
+
+    async def _run(self):
+        stopping = False
+        while not stopping:
+            line = await self._queue.get()
+            if line is None:
+                break
+            batch = [line]
+
+            # Collect more lines until the batch is full or the flush interval passes
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    line = await asyncio.wait_for(self._queue.get(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    break
+                if line is None:
+                    stopping = True
+                    break
+                batch.append(line)
+
+            if stopping or self._closed:
+                # Take what writers that were waiting for space put in after the sentinel
+                while not self._queue.empty():
+                    line = self._queue.get_nowait()
+                    if line is not None:
+                        batch.append(line)
+                stopping = True
+
+            await self._write_with_retry(batch)
+
+    async def _write_with_retry(self, batch: List[str]):
+        # Retry a failed batch for a while; the queue fills up meanwhile, which pushes back on callers
+        delay = 0.1
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                rotated = await asyncio.to_thread(self._write_batch, "".join(batch))
+                self.written += len(batch)
+                if rotated:
+                    self.rotations += 1
+                    if self.compress:
+                        await asyncio.to_thread(self._compress, rotated)
+                return
+            except OSError as e:
+                self.write_errors += 1
+                if attempt == self.max_retries:
+                    print(f"Error writing log batch ({len(batch)} entries), giving up after {attempt} attempts: {e}")
+                    break
+                print(f"Error writing log batch ({len(batch)} entries), retrying in {delay}s: {e}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 5.0)
+
+        # Keep the entries somewhere the process supervisor collects rather than lose them
+        sys.stderr.write("".join(batch))
+        sys.stderr.flush()
+        self.dropped_to_stderr += len(batch)
+
+    def _write_batch(self, data: str) -> Optional[str]:
+        """Append data to the log file, rotating first if needed. Returns the rotated path, if any."""
+        rotated = None
+        while True:
+            f = open(self.path, "a")
+            try:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+                # Another worker may have rotated the file while we waited for the lock
+                if not self._is_current(f):
+                    continue
+
+                if self._should_rotate(f, len(data)):
+                    rotated = self._rotated_path()
+                    os.rename(self.path, rotated)
+                    continue
+
+                f.write(data)
+                f.flush()
+                return rotated
+            finally:
+                # Closing the file releases the lock
+                f.close()
+
+    def _is_current(self, f) -> bool:
+        try:
+            return os.fstat(f.fileno()).st_ino == os.stat(self.path).st_ino
+        except FileNotFoundError:
+            return False
+
+    def _should_rotate(self, f, incoming: int) -> bool:
+        stat = os.fstat(f.fileno())
+        if stat.st_size == 0:
+            return False
+        if self.max_bytes and stat.st_size + incoming > self.max_bytes:
+            return True
+        if self.rotate_seconds:
+            return int(stat.st_mtime // self.rotate_seconds) < int(time.time() // self.rotate_seconds)
+        return False
+
+    def _rotated_path(self) -> str:
+        base, ext = os.path.splitext(self.path)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        return f"{base}.{stamp}-{os.getpid()}{ext}"
+
+    def _compress(self, path: str):
+        with open(path, "rb") as src, gzip.open(path + ".gz", "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(path)
+
+_sink: Optional[JsonlLogSink] = None
+
+def start_log_sink() -> JsonlLogSink:
+    """Create and start the shared sink. Called once from the app lifespan."""
+    global _sink
+    if _sink is None:
+        _sink = JsonlLogSink()
+        _sink.start()
+    return _sink
+
+def get_log_sink() -> JsonlLogSink:
+    return _sink or start_log_sink()
+
+async def close_log_sink():
+    global _sink
+    if _sink is not None:
+        await _sink.close()
+        _sink = None
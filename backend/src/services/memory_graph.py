@@ -0,0 +1,1301 @@
+import asyncio
+import heapq
+import re
+from array import array
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+from src.services.storage import GraphStorage, STATS_TOP_HUBS
+
+class UnsupportedQueryError(ValueError):
+    """Raised for Cypher outside the subset the in-memory engine understands"""
+
+class StringPool:
+    """Interns strings so labels, types and names are stored once and compared as ints"""
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self._strings: List[str] = []
+
+    def intern(self, value: str) -> int:
+        string_id = self._ids.get(value)
+        if string_id is None:
+            string_id = len(self._strings)
+            self._ids[value] = string_id
+            self._strings.append(value)
+        return string_id
+
+    def lookup(self, value: str) -> Optional[int]:
+        """Return the id of an already interned string without adding it"""
+        return self._ids.get(value)
+
+    def get(self, string_id: int) -> str:
+        return self._strings[string_id]
+
+class _TenantIndex:
+    __slots__ = ("node_id", "by_label", "by_name", "label_counts", "rel_counts", "hubs", "hubs_valid", "reconciled_at")
+
+    def __init__(self, node_id: int):
+        self.node_id = node_id
+        # label id / name id -> ids of the tenant's nodes
+        self.by_label: Dict[int, array] = {}
+        self.by_name: Dict[int, array] = {}
+        # label id / relationship type id -> number of live nodes / relationships
+        self.label_counts: Dict[int, int] = {}
+        self.rel_counts: Dict[int, int] = {}
+        # Up to STATS_TOP_HUBS node ids by descending degree. Raising a degree keeps
+        # the list exact; lowering the degree of a listed node invalidates it.
+        self.hubs: List[int] = []
+        self.hubs_valid = True
+        self.reconciled_at: Optional[str] = None
+
+    def clear(self):
+        self.by_label.clear()
+        self.by_name.clear()
+        self.label_counts.clear()
+        self.rel_counts.clear()
+        self.hubs = []
+        self.hubs_valid = True
+
+class MemoryGraph:
+    """A compact in-process property graph.
+
+    Nodes and relationships live in parallel arrays indexed by id, with per-node
+    adjacency arrays of relationship ids. Deleted entries are tombstoned. Each
+    node has a label and a name; Tenant nodes also carry `id` and `created_at`.
+    Regular nodes are unique per (tenant, label, name).
+    """
+
+    def __init__(self):
+        self.strings = StringPool()
+        self.node_label = array("I")
+        self.node_name = array("I")
+        self.node_tenant = array("I")  # id of the owning Tenant node
+        self.node_alive = bytearray()
+        self.node_degree = array("I")  # relationships other than BELONGS_TO, in either direction
+        self.out_edges: List[array] = []
+        self.in_edges: List[array] = []
+        self.edge_src = array("I")
+        self.edge_dst = array("I")
+        self.edge_type = array("I")
+        self.edge_alive = bytearray()
+        self.tenants: Dict[str, _TenantIndex] = {}
+        self.tenant_props: Dict[int, Dict[str, Any]] = {}
+        self.node_keys: Dict[Tuple[int, int, int], int] = {}
+        self.edge_keys: Dict[Tuple[int, int, int], int] = {}
+        self.TENANT = self.strings.intern("Tenant")
+        self.BELONGS_TO = self.strings.intern("BELONGS_TO")
+
+    # Writes
+
+    def _add_node(self, label_id: int, name_id: int, tenant_node: Optional[int]) -> int:
+        node_id = len(self.node_label)
+        self.node_label.append(label_id)
+        self.node_name.append(name_id)
+        self.node_tenant.append(node_id if tenant_node is None else tenant_node)
+        self.node_alive.append(1)
+        self.node_degree.append(0)
+        self.out_edges.append(array("I"))
+        self.in_edges.append(array("I"))
+        return node_id
+
+    def _add_edge(self, src: int, type_id: int, dst: int) -> int:
+        edge_id = len(self.edge_src)
+        self.edge_src.append(src)
+        self.edge_dst.append(dst)
+        self.edge_type.append(type_id)
+        self.edge_alive.append(1)
+        self.out_edges[src].append(edge_id)
+        self.in_edges[dst].append(edge_id)
+        self.edge_keys[(src, type_id, dst)] = edge_id
+        if type_id != self.BELONGS_TO:
+            self._change_degree(src, 1)
+            self._change_degree(dst, 1)
+        return edge_id
+
+    def _hub_key(self, node_id: int) -> Tuple[int, str, str]:
+        # Ties rank by label and name, as in the Neo4j backend
+        return (-self.node_degree[node_id], self.strings.get(self.node_label[node_id]), self.strings.get(self.node_name[node_id]))
+
+    def _change_degree(self, node_id: int, delta: int):
+        self.node_degree[node_id] += delta
+        tenant = self.tenant_of(node_id)
+        if tenant is None or not tenant.hubs_valid:
+            return
+        hubs = tenant.hubs
+        if node_id in hubs:
+            if delta < 0:
+                # A node outside the list may now rank higher; rebuilt on the next read
+                tenant.hubs_valid = False
+            else:
+                hubs.sort(key=self._hub_key)
+        elif delta > 0 and (len(hubs) < STATS_TOP_HUBS or self._hub_key(node_id) < self._hub_key(hubs[-1])):
+            hubs.append(node_id)
+            hubs.sort(key=self._hub_key)
+            del hubs[STATS_TOP_HUBS:]
+
+    def create_tenant(self, tenant_id: str, display_name: str):
+        node_id = self._add_node(self.TENANT, self.strings.intern(display_name), None)
+        self.tenant_props[node_id] = {
+            "id": tenant_id,
+            "name": display_name,
+            "created_at": datetime.now(timezone.utc).isoformat()
+        }
+        self.tenants[tenant_id] = _TenantIndex(node_id)
+
+    def merge_node(self, tenant: _TenantIndex, label: str, name: str) -> Tuple[int, bool]:
+        label_id = self.strings.intern(label)
+        name_id = self.strings.intern(name)
+        key = (tenant.node_id, label_id, name_id)
+        node_id = self.node_keys.get(key)
+        if node_id is not None:
+            return node_id, False
+
+        node_id = self._add_node(label_id, name_id, tenant.node_id)
+        self.node_keys[key] = node_id
+        self._add_edge(node_id, self.BELONGS_TO, tenant.node_id)
+        tenant.by_label.setdefault(label_id, array("I")).append(node_id)
+        tenant.by_name.setdefault(name_id, array("I")).append(node_id)
+        tenant.label_counts[label_id] = tenant.label_counts.get(label_id, 0) + 1
+        return node_id, True
+
+    def merge_edge(self, tenant: _TenantIndex, src: int, rel_type: str, dst: int) -> bool:
+        type_id = self.strings.intern(rel_type)
+        if (src, type_id, dst) in self.edge_keys:
+            return False
+        self._add_edge(src, type_id, dst)
+        tenant.rel_counts[type_id] = tenant.rel_counts.get(type_id, 0) + 1
+        return True
+
+    def delete_edge(self, edge_id: int):
+        if not self.edge_alive[edge_id]:
+            return
+        self.edge_alive[edge_id] = 0
+        src, type_id, dst = self.edge_src[edge_id], self.edge_type[edge_id], self.edge_dst[edge_id]
+        self.edge_keys.pop((src, type_id, dst), None)
+        if type_id != self.BELONGS_TO:
+            tenant = self.tenant_of(src)
+            if tenant is not None and tenant.rel_counts.get(type_id):
+                tenant.rel_counts[type_id] -= 1
+            self._change_degree(src, -1)
+            self._change_degree(dst, -1)
+
+    def delete_node(self, node_id: int) -> int:
+        """Delete a node and its relationships, returning how many relationships were deleted"""
+        deleted = 0
+        for edge_id in list(self.out_edges[node_id]) + list(self.in_edges[node_id]):
+            if self.edge_alive[edge_id]:
+                self.delete_edge(edge_id)
+                if self.edge_type[edge_id] != self.BELONGS_TO:
+                    deleted += 1
+        self.node_alive[node_id] = 0
+        self.out_edges[node_id] = array("I")
+        self.in_edges[node_id] = array("I")
+        label_id = self.node_label[node_id]
+        self.node_keys.pop((self.node_tenant[node_id], label_id, self.node_name[node_id]), None)
+        tenant = self.tenant_of(node_id)
+        if tenant is not None and tenant.node_id != node_id and tenant.label_counts.get(label_id):
+            tenant.label_counts[label_id] -= 1
+        return deleted
+
+    # Reads
+
+    def tenant_of(self, node_id: int) -> Optional[_TenantIndex]:
+        props = self.tenant_props.get(self.node_tenant[node_id])
+        return self.tenants.get(props["id"]) if props else None
+
+    def tenant_nodes(self, tenant: _TenantIndex) -> Iterator[int]:
+        for nodes in tenant.by_label.values():
+            for node_id in nodes:
+                if self.node_alive[node_id]:
+                    yield node_id
+
+    def top_hubs(self, tenant: _TenantIndex) -> List[int]:
+        """The tenant's nodes with the highest degree, rebuilding the list if a delete invalidated it"""
+        if not tenant.hubs_valid:
+            connected = (node_id for node_id in self.tenant_nodes(tenant) if self.node_degree[node_id] > 0)
+            tenant.hubs = heapq.nsmallest(STATS_TOP_HUBS, connected, key=self._hub_key)
+            tenant.hubs_valid = True
+        return tenant.hubs
+
+    def node_property(self, node_id: int, key: str) -> Any:
+        if self.node_label[node_id] == self.TENANT:
+            return self.tenant_props[node_id].get(key)
+        if key == "name":
+            return self.strings.get(self.node_name[node_id])
+        if key == "degree":
+            return self.node_degree[node_id]
+        return None
+
+    def node_properties(self, node_id: int) -> Dict[str, Any]:
+        if self.node_label[node_id] == self.TENANT:
+            return dict(self.tenant_props[node_id])
+        return {"name": self.strings.get(self.node_name[node_id]), "degree": self.node_degree[node_id]}
+
+class MemoryStorage(GraphStorage):
+    """GraphStorage that keeps everything in process, for single-node deployments, tests and benchmarks"""
+
+    def __init__(self):
+        self.graph = MemoryGraph()
+
+    async def create_tenant(self, tenant_id: str, display_name: str):
+        if tenant_id not in self.graph.tenants:
+            self.graph.create_tenant(tenant_id, display_name)
+
+    async def tenant_exists(self, tenant_id: str) -> bool:
+        return tenant_id in self.graph.tenants
+
+    async def get_schema(self, tenant_id: str) -> Dict[str, Any]:
+        tenant = self.graph.tenants.get(tenant_id)
+        if tenant is None:
+            return {"node_types": [], "relationship_types": [], "node_type_counts": {}, "relationship_type_counts": {}}
+        strings = self.graph.strings
+
+        def ranked(counts: Dict[int, int]) -> Dict[str, int]:
+            named = [(strings.get(key), count) for key, count in counts.items() if count > 0]
+            return dict(sorted(named, key=lambda item: (-item[1], item[0])))
+
+        node_counts = ranked(tenant.label_counts)
+        rel_counts = ranked(tenant.rel_counts)
+        return {
+            "node_types": list(node_counts),
+            "relationship_types": list(rel_counts),
+            "node_type_counts": node_counts,
+            "relationship_type_counts": rel_counts
+        }
+
+    async def bulk_upsert(self, tenant_id: str, nodes: List[Dict[str, Any]], relationships: List[Dict[str, Any]]) -> Dict[str, int]:
+        graph = self.graph
+        counts = {"nodes_created": 0, "relationships_created": 0}
+        tenant = graph.tenants.get(tenant_id)
+        if tenant is None:
+            return counts
+
+        for node in nodes:
+            _, created = graph.merge_node(tenant, node["type"], node["name"])
+            counts["nodes_created"] += created
+
+        # Like the Neo4j backend, endpoints are matched by name within the tenant, and by label if given
+        for rel in relationships:
+            sources = self._find_nodes(tenant, rel["from_id"], rel.get("from_type"))
+            targets = self._find_nodes(tenant, rel["to_id"], rel.get("to_type"))
+            for src in sources:
+                for dst in targets:
+                    counts["relationships_created"] += graph.merge_edge(tenant, src, rel["type"], dst)
+        return counts
+
+    async def get_stats(self, tenant_id: str, top_k: int = 10) -> Dict[str, Any]:
+        graph = self.graph
+        tenant = graph.tenants.get(tenant_id)
+        schema = await self.get_schema(tenant_id)
+        hubs = graph.top_hubs(tenant)[:top_k] if tenant is not None else []
+        return {
+            "tenant_id": tenant_id,
+            "node_count": sum(schema["node_type_counts"].values()),
+            "relationship_count": sum(schema["relationship_type_counts"].values()),
+            "node_type_counts": schema["node_type_counts"],
+            "relationship_type_counts": schema["relationship_type_counts"],
+            "top_hubs": [
+                {
+                    "type": graph.strings.get(graph.node_label[node_id]),
+                    "name": graph.strings.get(graph.node_name[node_id]),
+                    "degree": graph.node_degree[node_id]
+                }
+                for node_id in hubs
+            ],
+            "reconciled_at": tenant.reconciled_at if tenant is not None else None
+        }
+
+    async def reconcile_stats(self, tenant_id: str, batch_size: Optional[int] = None) -> Dict[str, Any]:
+        graph = self.graph
+        tenant = graph.tenants.get(tenant_id)
+        if tenant is None:
+            return {"node_counts_corrected": 0, "relationship_counts_corrected": 0, "degrees_corrected": 0}
+
+        label_counts: Dict[int, int] = {}
+        rel_counts: Dict[int, int] = {}
+        degrees_corrected = 0
+        for node_id in graph.tenant_nodes(tenant):
+            label_id = graph.node_label[node_id]
+            label_counts[label_id] = label_counts.get(label_id, 0) + 1
+            degree = 0
+            for edge_id in graph.out_edges[node_id]:
+                type_id = graph.edge_type[edge_id]
+                if graph.edge_alive[edge_id] and type_id != graph.BELONGS_TO:
+                    rel_counts[type_id] = rel_counts.get(type_id, 0) + 1
+                    degree += 1
+            for edge_id in graph.in_edges[node_id]:
+                if graph.edge_alive[edge_id] and graph.edge_type[edge_id] != graph.BELONGS_TO:
+                    degree += 1
+            if graph.node_degree[node_id] != degree:
+                graph.node_degree[node_id] = degree
+                degrees_corrected += 1
+
+        drift = {
+            "node_counts_corrected": _count_drift(tenant.label_counts, label_counts),
+            "relationship_counts_corrected": _count_drift(tenant.rel_counts, rel_counts),
+            "degrees_corrected": degrees_corrected
+        }
+        tenant.label_counts = label_counts
+        tenant.rel_counts = rel_counts
+        tenant.hubs_valid = False
+        tenant.reconciled_at = datetime.now(timezone.utc).isoformat()
+        return drift
+
+    def _find_nodes(self, tenant: _TenantIndex, name: str, label: Optional[str]) -> List[int]:
+        graph = self.graph
+        name_id = graph.strings.lookup(name)
+        if name_id is None:
+            return []
+        label_id = graph.strings.lookup(label) if label else None
+        if label and label_id is None:
+            return []
+        return [
+            node_id for node_id in tenant.by_name.get(name_id, ())
+            if graph.node_alive[node_id] and (label_id is None or graph.node_label[node_id] == label_id)
+        ]
+
+    async def run_read_query(self, query: str, parameters: Optional[Dict[str, Any]] = None, tenant_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        return _QueryExecutor(self.graph, parse_query(query), parameters or {}).run()
+
+    async def export_tenant(self, tenant_id: str) -> AsyncIterator[Dict[str, Any]]:
+        graph = self.graph
+        tenant = graph.tenants.get(tenant_id)
+        if tenant is None:
+            return
+        strings = graph.strings
+        yield {"kind": "tenant", "id": tenant_id, "name": graph.tenant_props[tenant.node_id]["name"]}
+
+        node_ids = list(graph.tenant_nodes(tenant))
+        for node_id in node_ids:
+            yield {"kind": "node", "type": strings.get(graph.node_label[node_id]), "name": strings.get(graph.node_name[node_id])}
+
+        for node_id in node_ids:
+            for edge_id in graph.out_edges[node_id]:
+                if not graph.edge_alive[edge_id] or graph.edge_type[edge_id] == graph.BELONGS_TO:
+                    continue
+                dst = graph.edge_dst[edge_id]
+                yield {
+                    "kind": "relationship",
+                    "from_type": strings.get(graph.node_label[node_id]),
+                    "from_id": strings.get(graph.node_name[node_id]),
+                    "type": strings.get(graph.edge_type[edge_id]),
+                    "to_type": strings.get(graph.node_label[dst]),
+                    "to_id": strings.get(graph.node_name[dst])
+                }
+
+    async def delete_tenant_data(
+        self,
+        tenant_id: str,
+        batch_size: Optional[int] = None,
+        on_progress: Optional[Callable[[str, int], None]] = None
+    ) -> Dict[str, int]:
+        graph = self.graph
+        totals = {"relationships_deleted": 0, "nodes_deleted": 0}
+        tenant = graph.tenants.get(tenant_id)
+        if tenant is None:
+            return totals
+
+        batch_size = batch_size or 1000
+        node_ids = list(graph.tenant_nodes(tenant))
+        for start in range(0, len(node_ids), batch_size):
+            batch = node_ids[start:start + batch_size]
+            relationships = sum(graph.delete_node(node_id) for node_id in batch)
+            totals["relationships_deleted"] += relationships
+            totals["nodes_deleted"] += len(batch)
+            if on_progress:
+                on_progress("relationships_deleted", relationships)
+                on_progress("nodes_deleted", len(batch))
+            # Let other requests run between batches
+            await asyncio.sleep(0)
+
+        tenant.clear()
+        return totals
+
+    async def delete_tenant(self, tenant_id: str):
+        tenant = self.graph.tenants.pop(tenant_id, None)
+        if tenant is not None:
+            self.graph.delete_node(tenant.node_id)
+            del self.graph.tenant_props[tenant.node_id]
+
+def _count_drift(stored: Dict[int, int], actual: Dict[int, int]) -> int:
+    """How many types had a stored count that differed from the recomputed one"""
+    return sum(1 for key in stored.keys() | actual.keys() if stored.get(key, 0) != actual.get(key, 0))
+
+# Cypher subset
+#
+#   MATCH pattern [, pattern]* [WHERE condition]   (one or more)
+#   RETURN [DISTINCT] expr [AS alias], ...  [ORDER BY expr [ASC|DESC], ...]  [SKIP n]  [LIMIT n]
+#
+# Patterns are chains of (var:Label {key: value}) and -[var:TYPE|TYPE]->, <-[...]-, -[...]-, -->, <--, --.
+# Expressions cover literals, $parameters, properties, comparisons, AND/OR/NOT, IS [NOT] NULL, IN,
+# STARTS WITH / ENDS WITH / CONTAINS, label checks (n:Label), list indexing and the functions below.
+
+_TOKEN_RE = re.compile(r"""
+    (?P<ws>\s+|//[^\n]*)
+  | (?P<num>\d+(?:\.\d+)?)
+  | (?P<str>'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*")
+  | (?P<qname>`(?:[^`]|``)*`)
+  | (?P<param>\$\w+)
+  | (?P<name>[A-Za-z_]\w*)
+  | (?P<op><>|<=|>=|[()\[\]{}:,.\-<>=*|;+/])
+""", re.VERBOSE)
+
+_ESCAPES = {"n": "\n", "t": "\t", "r": "\r"}
+
+_SCALAR_FUNCTIONS = {"tolower", "toupper", "type", "labels", "id", "elementid", "coalesce", "size", "trim", "tostring"}
+_AGGREGATE_FUNCTIONS = {"count", "collect", "sum", "min", "max", "avg"}
+
+def _tokenize(query: str) -> List[Tuple[str, Any, int, int]]:
+    tokens = []
+    position = 0
+    while position < len(query):
+        match = _TOKEN_RE.match(query, position)
+        if match is None:
+            raise UnsupportedQueryError(f"Unexpected character at {position}: {query[position]!r}")
+        kind = match.lastgroup
+        text = match.group()
+        if kind == "num":
+            tokens.append(("lit", float(text) if "." in text else int(text), match.start(), match.end()))
+        elif kind == "str":
+            value = re.sub(r"\\(.)", lambda m: _ESCAPES.get(m.group(1), m.group(1)), text[1:-1])
+            tokens.append(("lit", value, match.start(), match.end()))
+        elif kind == "qname":
+            tokens.append(("name", text[1:-1].replace("``", "`"), match.start(), match.end()))
+        elif kind == "param":
+            tokens.append(("param", text[1:], match.start(), match.end()))
+        elif kind != "ws":
+            tokens.append((kind, text, match.start(), match.end()))
+        position = match.end()
+    tokens.append(("end", None, len(query), len(query)))
+    return tokens
+
+class _NodePattern:
+    __slots__ = ("var", "labels", "props")
+
+    def __init__(self, var: Optional[str], labels: List[str], props: Dict[str, tuple]):
+        self.var = var
+        self.labels = labels
+        self.props = props
+
+class _RelPattern:
+    __slots__ = ("var", "types", "props", "direction")
+
+    def __init__(self, var: Optional[str], types: List[str], props: Dict[str, tuple], direction: str):
+        self.var = var
+        self.types = types
+        self.props = props
+        self.direction = direction
+
+class _Path:
+    __slots__ = ("nodes", "rels")
+
+    def __init__(self, nodes: List[_NodePattern], rels: List[_RelPattern]):
+        self.nodes = nodes
+        self.rels = rels
+
+class _Query:
+    def __init__(self):
+        self.matches: List[Tuple[List[_Path], Optional[tuple]]] = []
+        self.distinct = False
+        self.items: List[Tuple[tuple, str]] = []
+        self.order: List[Tuple[tuple, bool]] = []
+        self.skip: Optional[tuple] = None
+        self.limit: Optional[tuple] = None
+
+class _Parser:
+    def __init__(self, query: str):
+        self.query = query
+        self.tokens = _tokenize(query)
+        self.position = 0
+        self.anonymous = 0
+
+    def peek(self, offset: int = 0) -> Tuple[str, Any, int, int]:
+        return self.tokens[min(self.position + offset, len(self.tokens) - 1)]
+
+    def next(self) -> Tuple[str, Any, int, int]:
+        token = self.tokens[self.position]
+        self.position += 1
+        return token
+
+    def at_op(self, value: str, offset: int = 0) -> bool:
+        kind, text, _, _ = self.peek(offset)
+        return kind == "op" and text == value
+
+    def at_keyword(self, *words: str) -> bool:
+        for offset, word in enumerate(words):
+            kind, text, _, _ = self.peek(offset)
+            if kind != "name" or text.upper() != word:
+                return False
+        return True
+
+    def accept_op(self, value: str) -> bool:
+        if self.at_op(value):
+            self.position += 1
+            return True
+        return False
+
+    def accept_keyword(self, *words: str) -> bool:
+        if self.at_keyword(*words):
+            self.position += len(words)
+            return True
+        return False
+
+    def expect_op(self, value: str):
+        if not self.accept_op(value):
+            self.fail(f"expected '{value}'")
+
+    def expect_name(self) -> str:
+        kind, text, _, _ = self.peek()
+        if kind != "name":
+            self.fail("expected a name")
+        self.position += 1
+        return text
+
+    def fail(self, message: str):
+        _, text, start, _ = self.peek()
+        raise UnsupportedQueryError(f"{message} at {start} (found {text!r})")
+
+    def anonymous_var(self) -> str:
+        self.anonymous += 1
+        return f"  anon{self.anonymous}"
+
+    # Clauses
+
+    def parse(self) -> _Query:
+        query = _Query()
+        while self.accept_keyword("MATCH"):
+            paths = [self.parse_path()]
+            while self.accept_op(","):
+                paths.append(self.parse_path())
+            where = self.parse_expression() if self.accept_keyword("WHERE") else None
+            query.matches.append((paths, where))
+
+        if not query.matches:
+            self.fail("expected MATCH")
+        if not self.accept_keyword("RETURN"):
+            self.fail("expected MATCH, WHERE or RETURN")
+
+        query.distinct = self.accept_keyword("DISTINCT")
+        while True:
+            start = self.peek()[2]
+            expression = self.parse_expression()
+            if self.accept_keyword("AS"):
+                alias = self.expect_name()
+            else:
+                alias = self.query[start:self.tokens[self.position - 1][3]]
+            query.items.append((expression, alias))
+            if not self.accept_op(","):
+                break
+
+        if self.accept_keyword("ORDER", "BY"):
+            while True:
+                expression = self.parse_expression()
+                descending = False
+                if self.accept_keyword("DESC") or self.accept_keyword("DESCENDING"):
+                    descending = True
+                else:
+                    self.accept_keyword("ASC") or self.accept_keyword("ASCENDING")
+                query.order.append((expression, descending))
+                if not self.accept_op(","):
+                    break
+        if self.accept_keyword("SKIP"):
+            query.skip = self.parse_expression()
+        if self.accept_keyword("LIMIT"):
+            query.limit = self.parse_expression()
+
+        self.accept_op(";")
+        if self.peek()[0] != "end":
+            self.fail("unsupported clause")
+        return query
+
+    def parse_path(self) -> _Path:
+        nodes = [self.parse_node()]
+        rels = []
+        while self.at_op("-") or self.at_op("<"):
+            rels.append(self.parse_rel())
+            nodes.append(self.parse_node())
+        return _Path(nodes, rels)
+
+    def parse_node(self) -> _NodePattern:
+        self.expect_op("(")
+        var = None
+        if self.peek()[0] == "name":
+            var = self.expect_name()
+        labels = []
+        while self.accept_op(":"):
+            labels.append(self.expect_name())
+        props = self.parse_props() if self.at_op("{") else {}
+        self.expect_op(")")
+        return _NodePattern(var or self.anonymous_var(), labels, props)
+
+    def parse_rel(self) -> _RelPattern:
+        left_arrow = self.accept_op("<")
+        self.expect_op("-")
+        var = None
+        types = []
+        props = {}
+        if self.accept_op("["):
+            if self.peek()[0] == "name":
+                var = self.expect_name()
+            if self.accept_op(":"):
+                types.append(self.expect_name())
+                while self.accept_op("|"):
+                    self.accept_op(":")
+                    types.append(self.expect_name())
+            if self.at_op("*"):
+                self.fail("variable-length relationships are not supported")
+            if self.at_op("{"):
+                props = self.parse_props()
+            self.expect_op("]")
+        self.expect_op("-")
+        right_arrow = self.accept_op(">")
+        if left_arrow and right_arrow:
+            self.fail("relationship can't point both ways")
+        direction = "out" if right_arrow else "in" if left_arrow else "both"
+        return _RelPattern(var or self.anonymous_var(), types, props, direction)
+
+    def parse_props(self) -> Dict[str, tuple]:
+        self.expect_op("{")
+        props = {}
+        if not self.at_op("}"):
+            while True:
+                key = self.expect_name()
+                self.expect_op(":")
+                props[key] = self.parse_expression()
+                if not self.accept_op(","):
+                    break
+        self.expect_op("}")
+        return props
+
+    # Expressions, lowest precedence first
+
+    def parse_expression(self) -> tuple:
+        left = self.parse_and()
+        while self.accept_keyword("OR"):
+            left = ("or", left, self.parse_and())
+        return left
+
+    def parse_and(self) -> tuple:
+        left = self.parse_not()
+        while self.accept_keyword("AND"):
+            left = ("and", left, self.parse_not())
+        return left
+
+    def parse_not(self) -> tuple:
+        if self.accept_keyword("NOT"):
+            return ("not", self.parse_not())
+        return self.parse_comparison()
+
+    def parse_comparison(self) -> tuple:
+        left = self.parse_additive()
+        while True:
+            kind, text, _, _ = self.peek()
+            if kind == "op" and text in ("=", "<>", "<", ">", "<=", ">="):
+                self.position += 1
+                left = ("cmp", text, left, self.parse_additive())
+            elif self.accept_keyword("STARTS", "WITH"):
+                left = ("cmp", "starts", left, self.parse_additive())
+            elif self.accept_keyword("ENDS", "WITH"):
+                left = ("cmp", "ends", left, self.parse_additive())
+            elif self.accept_keyword("CONTAINS"):
+                left = ("cmp", "contains", left, self.parse_additive())
+            elif self.accept_keyword("IN"):
+                left = ("in", left, self.parse_additive())
+            elif self.accept_keyword("IS", "NOT", "NULL"):
+                left = ("isnull", left, True)
+            elif self.accept_keyword("IS", "NULL"):
+                left = ("isnull", left, False)
+            else:
+                return left
+
+    def parse_additive(self) -> tuple:
+        left = self.parse_multiplicative()
+        while self.at_op("+") or self.at_op("-"):
+            op = self.next()[1]
+            left = ("arith", op, left, self.parse_multiplicative())
+        return left
+
+    def parse_multiplicative(self) -> tuple:
+        left = self.parse_unary()
+        while self.at_op("*") or self.at_op("/"):
+            op = self.next()[1]
+            left = ("arith", op, left, self.parse_unary())
+        return left
+
+    def parse_unary(self) -> tuple:
+        if self.accept_op("-"):
+            return ("arith", "-", ("lit", 0), self.parse_unary())
+        return self.parse_postfix()
+
+    def parse_postfix(self) -> tuple:
+        expression = self.parse_atom()
+        while True:
+            if self.accept_op("."):
+                expression = ("prop", expression, self.expect_name())
+            elif self.accept_op("["):
+                index = self.parse_expression()
+                self.expect_op("]")
+                expression = ("index", expression, index)
+            elif self.at_op(":") and expression[0] == "var":
+                labels = []
+                while self.accept_op(":"):
+                    labels.append(self.expect_name())
+                expression = ("haslabel", expression, labels)
+            else:
+                return expression
+
+    def parse_atom(self) -> tuple:
+        kind, value, _, _ = self.peek()
+        if kind == "lit":
+            self.position += 1
+            return ("lit", value)
+        if kind == "param":
+            self.position += 1
+            return ("param", value)
+        if self.accept_op("("):
+            expression = self.parse_expression()
+            self.expect_op(")")
+            return expression
+        if self.accept_op("["):
+            elements = []
+            if not self.at_op("]"):
+                while True:
+                    elements.append(self.parse_expression())
+                    if not self.accept_op(","):
+                        break
+            self.expect_op("]")
+            return ("list", elements)
+        if kind == "name":
+            upper = value.upper()
+            if upper in ("TRUE", "FALSE"):
+                self.position += 1
+                return ("lit", upper == "TRUE")
+            if upper == "NULL":
+                self.position += 1
+                return ("lit", None)
+            if self.at_op("(", 1):
+                return self.parse_call()
+            if upper in ("CASE", "EXISTS", "WITH", "UNWIND", "OPTIONAL", "CALL"):
+                self.fail(f"{upper} is not supported")
+            self.position += 1
+            return ("var", value)
+        self.fail("expected an expression")
+
+    def parse_call(self) -> tuple:
+        name = self.expect_name().lower()
+        if name not in _SCALAR_FUNCTIONS and name not in _AGGREGATE_FUNCTIONS:
+            self.fail(f"function {name}() is not supported")
+        self.expect_op("(")
+        distinct = self.accept_keyword("DISTINCT")
+        args = []
+        if self.accept_op("*"):
+            args.append(("star",))
+        elif not self.at_op(")"):
+            while True:
+                args.append(self.parse_expression())
+                if not self.accept_op(","):
+                    break
+        self.expect_op(")")
+        return ("call", name, distinct, args)
+
+def parse_query(query: str) -> _Query:
+    return _Parser(query).parse()
+
+def _is_constant(expression: tuple) -> bool:
+    return expression[0] in ("lit", "param")
+
+def _is_aggregate(expression: tuple) -> bool:
+    return expression[0] == "call" and expression[1] in _AGGREGATE_FUNCTIONS
+
+def _contains_aggregate(expression: Any) -> bool:
+    if isinstance(expression, tuple):
+        if _is_aggregate(expression):
+            return True
+        return any(_contains_aggregate(part) for part in expression[1:])
+    if isinstance(expression, list):
+        return any(_contains_aggregate(part) for part in expression)
+    return False
+
+def _hashable(value: Any) -> Any:
+    if isinstance(value, list):
+        return tuple(_hashable(element) for element in value)
+    return value
+
+def _sort_key(value: Any) -> tuple:
+    # Nulls sort last, and values of different types never compare directly
+    if value is None:
+        return (2, 0, 0)
+    if isinstance(value, bool):
+        return (0, 1, value)
+    if isinstance(value, (int, float)):
+        return (0, 2, value)
+    if isinstance(value, str):
+        return (0, 3, value)
+    if isinstance(value, tuple) and len(value) == 2 and value[0] in ("node", "rel"):
+        return (0, 4, value[1])
+    return (1, 0, str(value))
+
+class _Aggregator:
+    def __init__(self, name: str, distinct: bool):
+        self.name = name
+        self.distinct = distinct
+        self.seen = set()
+        self.values: List[Any] = []
+        self.count = 0
+
+    def add(self, value: Any):
+        if value is None:
+            return
+        if self.distinct:
+            key = _hashable(value)
+            if key in self.seen:
+                return
+            self.seen.add(key)
+        self.count += 1
+        if self.name != "count":
+            self.values.append(value)
+
+    def result(self) -> Any:
+        if self.name == "count":
+            return self.count
+        if self.name == "collect":
+            return self.values
+        if not self.values:
+            return None
+        if self.name == "sum":
+            return sum(self.values)
+        if self.name == "avg":
+            return sum(self.values) / len(self.values)
+        if self.name == "min":
+            return min(self.values, key=_sort_key)
+        return max(self.values, key=_sort_key)
+
+class _QueryExecutor:
+    """Evaluates a parsed query with backtracking pattern matching.
+
+    Node values are ("node", id) and relationship values ("rel", id) while the
+    query runs; they are turned into property dicts in the returned rows. Each
+    path is matched outward from its most selective node, using the per-tenant
+    label and name indexes when the path ties that node to a Tenant.
+    """
+
+    def __init__(self, graph: MemoryGraph, query: _Query, parameters: Dict[str, Any]):
+        self.graph = graph
+        self.query = query
+        self.parameters = parameters
+        # Variables bound to `:Tenant {id: ...}` anywhere in the query
+        self.tenant_vars: Dict[str, tuple] = {}
+        for paths, _ in query.matches:
+            for path in paths:
+                for node in path.nodes:
+                    if "Tenant" in node.labels and "id" in node.props:
+                        self.tenant_vars[node.var] = node.props["id"]
+
+    def run(self) -> List[Dict[str, Any]]:
+        bindings: Iterator[Dict[str, Any]] = iter([{}])
+        for paths, where in self.query.matches:
+            bindings = self._match_clause(bindings, paths, where)
+        return self._project(bindings)
+
+    # Matching
+
+    def _match_clause(self, bindings: Iterator[Dict[str, Any]], paths: List[_Path], where: Optional[tuple]) -> Iterator[Dict[str, Any]]:
+        hints = self._where_hints(where)
+        scopes = self._tenant_scopes(paths)
+        for binding in bindings:
+            for matched, _ in self._match_paths(paths, 0, binding, (), hints, scopes):
+                if where is None or self._eval(where, matched) is True:
+                    yield matched
+
+    def _where_hints(self, where: Optional[tuple]) -> Dict[str, Dict[str, tuple]]:
+        """Collect `var.key = value` conjuncts so they can drive index lookups"""
+        hints: Dict[str, Dict[str, tuple]] = {}
+        pending = [where] if where is not None else []
+        while pending:
+            expression = pending.pop()
+            if expression[0] == "and":
+                pending.extend(expression[1:])
+            elif expression[0] == "cmp" and expression[1] == "=":
+                for left, right in ((expression[2], expression[3]), (expression[3], expression[2])):
+                    if left[0] == "prop" and left[1][0] == "var" and right[0] in ("lit", "param"):
+                        hints.setdefault(left[1][1], {})[left[2]] = right
+        return hints
+
+    def _tenant_scopes(self, paths: List[_Path]) -> Dict[int, tuple]:
+        """Map node patterns joined to a `:Tenant {id: ...}` by BELONGS_TO to that tenant id expression"""
+        scopes = {}
+        for path in paths:
+            for index, rel in enumerate(path.rels):
+                if rel.types != ["BELONGS_TO"] or rel.direction == "both":
+                    continue
+                member, tenant = path.nodes[index], path.nodes[index + 1]
+                if rel.direction == "in":
+                    member, tenant = tenant, member
+                tenant_id = tenant.props.get("id") if "Tenant" in tenant.labels else None
+                tenant_id = tenant_id or self.tenant_vars.get(tenant.var)
+                if tenant_id is not None:
+                    scopes[id(member)] = tenant_id
+        return scopes
+
+    def _match_paths(self, paths, index, binding, used, hints, scopes):
+        if index == len(paths):
+            yield binding, used
+            return
+        for matched, matched_used in self._match_path(paths[index], binding, used, hints, scopes):
+            yield from self._match_paths(paths, index + 1, matched, matched_used, hints, scopes)
+
+    def _match_path(self, path: _Path, binding, used, hints, scopes):
+        scoped = any(id(node) in scopes for node in path.nodes)
+        anchor = min(
+            range(len(path.nodes)),
+            key=lambda i: self._estimate(path.nodes[i], binding, hints, scopes, scoped)
+        )
+        # Walk right from the anchor, then left
+        steps = [(i, i, i + 1, True) for i in range(anchor, len(path.rels))]
+        steps += [(i, i + 1, i, False) for i in range(anchor - 1, -1, -1)]
+
+        anchor_node = path.nodes[anchor]
+        for node_id in self._candidates(anchor_node, binding, hints, scopes):
+            if self._node_matches(node_id, anchor_node, binding):
+                bound = dict(binding)
+                bound[anchor_node.var] = ("node", node_id)
+                yield from self._walk(path, steps, 0, {anchor: node_id}, bound, used)
+
+    def _walk(self, path: _Path, steps, step, positions, binding, used):
+        if step == len(steps):
+            yield binding, used
+            return
+        rel_index, source, target, forward = steps[step]
+        rel = path.rels[rel_index]
+        node = path.nodes[target]
+        for edge_id, other in self._neighbors(positions[source], rel, forward):
+            if edge_id in used:
+                continue
+            bound_rel = binding.get(rel.var)
+            if bound_rel is not None and bound_rel != ("rel", edge_id):
+                continue
+            if not self._node_matches(other, node, binding):
+                continue
+            bound = dict(binding)
+            bound[rel.var] = ("rel", edge_id)
+            bound[node.var] = ("node", other)
+            yield from self._walk(path, steps, step + 1, {**positions, target: other}, bound, used + (edge_id,))
+
+    def _neighbors(self, node_id: int, rel: _RelPattern, forward: bool) -> Iterator[Tuple[int, int]]:
+        graph = self.graph
+        if rel.props:
+            return  # Relationships have no properties
+        type_ids = None
+        if rel.types:
+            type_ids = {graph.strings.lookup(name) for name in rel.types} - {None}
+            if not type_ids:
+                return
+
+        outgoing = rel.direction in ("out", "both") if forward else rel.direction in ("in", "both")
+        incoming = rel.direction in ("in", "both") if forward else rel.direction in ("out", "both")
+        if outgoing:
+            for edge_id in graph.out_edges[node_id]:
+                if graph.edge_alive[edge_id] and (type_ids is None or graph.edge_type[edge_id] in type_ids):
+                    yield edge_id, graph.edge_dst[edge_id]
+        if incoming:
+            for edge_id in graph.in_edges[node_id]:
+                if graph.edge_alive[edge_id] and (type_ids is None or graph.edge_type[edge_id] in type_ids):
+                    yield edge_id, graph.edge_src[edge_id]
+
+    def _node_matches(self, node_id: int, node: _NodePattern, binding) -> bool:
+        graph = self.graph
+        if not graph.node_alive[node_id]:
+            return False
+        bound = binding.get(node.var)
+        if bound is not None and bound != ("node", node_id):
+            return False
+        for label in node.labels:
+            if graph.node_label[node_id] != graph.strings.lookup(label):
+                return False
+        for key, expression in node.props.items():
+            if graph.node_property(node_id, key) != self._eval(expression, binding):
+                return False
+        return True
+
+    def _lookup_props(self, node: _NodePattern, hints) -> Dict[str, tuple]:
+        return {**hints.get(node.var, {}), **node.props}
+
+    def _estimate(self, node: _NodePattern, binding, hints, scopes, scoped: bool) -> float:
+        if node.var in binding:
+            return 0
+        # Expanding a tenant's BELONGS_TO fan-in is the most expensive way to reach its members
+        if "Tenant" in node.labels and scoped and id(node) not in scopes:
+            return float("inf")
+        return sum(len(nodes) for nodes in self._candidate_arrays(node, hints, scopes))
+
+    def _candidates(self, node: _NodePattern, binding, hints, scopes) -> Iterator[int]:
+        bound = binding.get(node.var)
+        if bound is not None:
+            if bound[0] == "node":
+                yield bound[1]
+            return
+        for nodes in self._candidate_arrays(node, hints, scopes):
+            yield from nodes
+
+    def _candidate_arrays(self, node: _NodePattern, hints, scopes) -> List[Any]:
+        """Node ids to try for a pattern, narrowed by index lookups; _node_matches checks every condition.
+
+        Only literals and parameters drive lookups. Values like `a.name` depend on
+        other variables, which aren't bound yet when candidates are chosen.
+        """
+        graph = self.graph
+        props = {key: value for key, value in self._lookup_props(node, hints).items() if _is_constant(value)}
+
+        # Tenant nodes aren't in any tenant's indexes
+        if "Tenant" in node.labels:
+            if "id" in props:
+                tenant = graph.tenants.get(self._eval(props["id"], {}))
+                return [(tenant.node_id,)] if tenant else []
+            return [[tenant.node_id for tenant in graph.tenants.values()]]
+
+        if id(node) in scopes and _is_constant(scopes[id(node)]):
+            tenant = graph.tenants.get(self._eval(scopes[id(node)], {}))
+            tenants = [tenant] if tenant else []
+        else:
+            tenants = list(graph.tenants.values())
+
+        if "name" in props:
+            name = self._eval(props["name"], {})
+            name_id = graph.strings.lookup(name) if isinstance(name, str) else None
+            if name_id is None:
+                return []
+            arrays = [tenant.by_name[name_id] for tenant in tenants if name_id in tenant.by_name]
+            if not node.labels and id(node) not in scopes:
+                arrays.append([tenant.node_id for tenant in tenants if graph.node_name[tenant.node_id] == name_id])
+            return arrays
+
+        if node.labels:
+            label_id = graph.strings.lookup(node.labels[0])
+            if label_id is None:
+                return []
+            return [tenant.by_label[label_id] for tenant in tenants if label_id in tenant.by_label]
+
+        if id(node) in scopes:
+            return [tenant.by_label[label_id] for tenant in tenants for label_id in tenant.by_label]
+        return [range(len(graph.node_label))]
+
+    # Expressions
+
+    def _eval(self, expression: tuple, binding: Dict[str, Any]) -> Any:
+        kind = expression[0]
+        if kind == "lit":
+            return expression[1]
+        if kind == "param":
+            if expression[1] not in self.parameters:
+                raise UnsupportedQueryError(f"Missing parameter ${expression[1]}")
+            return self.parameters[expression[1]]
+        if kind == "var":
+            if expression[1] not in binding:
+                raise UnsupportedQueryError(f"Unknown variable {expression[1]}")
+            return binding[expression[1]]
+        if kind == "prop":
+            value = self._eval(expression[1], binding)
+            if isinstance(value, tuple) and value[0] == "node":
+                return self.graph.node_property(value[1], expression[2])
+            if isinstance(value, dict):
+                return value.get(expression[2])
+            return None
+        if kind == "and":
+            left = self._eval(expression[1], binding)
+            if left is False:
+                return False
+            right = self._eval(expression[2], binding)
+            if right is False:
+                return False
+            return None if left is None or right is None else True
+        if kind == "or":
+            left = self._eval(expression[1], binding)
+            if left is True:
+                return True
+            right = self._eval(expression[2], binding)
+            if right is True:
+                return True
+            return None if left is None or right is None else False
+        if kind == "not":
+            value = self._eval(expression[1], binding)
+            return None if value is None else not value
+        if kind == "cmp":
+            return self._compare(expression[1], self._eval(expression[2], binding), self._eval(expression[3], binding))
+        if kind == "in":
+            value = self._eval(expression[1], binding)
+            options = self._eval(expression[2], binding)
+            if value is None or not isinstance(options, list):
+                return None
+            return value in options
+        if kind == "isnull":
+            value = self._eval(expression[1], binding)
+            return (value is not None) if expression[2] else (value is None)
+        if kind == "haslabel":
+            value = self._eval(expression[1], binding)
+            if not (isinstance(value, tuple) and value[0] == "node"):
+                return None
+            label = self.graph.strings.get(self.graph.node_label[value[1]])
+            return all(name == label for name in expression[2])
+        if kind == "list":
+            return [self._eval(element, binding) for element in expression[1]]
+        if kind == "index":
+            value = self._eval(expression[1], binding)
+            index = self._eval(expression[2], binding)
+            if not isinstance(value, (list, str)) or not isinstance(index, int):
+                return None
+            return value[index] if -len(value) <= index < len(value) else None
+        if kind == "arith":
+            return self._arithmetic(expression[1], self._eval(expression[2], binding), self._eval(expression[3], binding))
+        if kind == "call":
+            return self._call(expression, binding)
+        raise UnsupportedQueryError(f"Unsupported expression: {kind}")
+
+    def _compare(self, op: str, left: Any, right: Any) -> Any:
+        if left is None or right is None:
+            return None
+        if op == "=":
+            return left == right
+        if op == "<>":
+            return left != right
+        if op in ("starts", "ends", "contains"):
+            if not (isinstance(left, str) and isinstance(right, str)):
+                return None
+            if op == "starts":
+                return left.startswith(right)
+            if op == "ends":
+                return left.endswith(right)
+            return right in left
+        try:
+            if op == "<":
+                return left < right
+            if op == ">":
+                return left > right
+            if op == "<=":
+                return left <= right
+            return left >= right
+        except TypeError:
+            return None
+
+    def _arithmetic(self, op: str, left: Any, right: Any) -> Any:
+        if left is None or right is None:
+            return None
+        try:
+            if op == "+":
+                return left + right
+            if op == "-":
+                return left - right
+            if op == "*":
+                return left * right
+            if isinstance(left, int) and isinstance(right, int):
+                return int(left / right)
+            return left / right
+        except (TypeError, ZeroDivisionError):
+            return None
+
+    def _call(self, expression: tuple, binding: Dict[str, Any]) -> Any:
+        _, name, _, args = expression
+        if name in _AGGREGATE_FUNCTIONS:
+            raise UnsupportedQueryError(f"{name}() is only supported as a RETURN item")
+        values = [self._eval(arg, binding) for arg in args]
+        graph = self.graph
+        if name == "coalesce":
+            return next((value for value in values if value is not None), None)
+        value = values[0] if values else None
+        if value is None:
+            return None
+        if name == "tolower":
+            return value.lower() if isinstance(value, str) else None
+        if name == "toupper":
+            return value.upper() if isinstance(value, str) else None
+        if name == "trim":
+            return value.strip() if isinstance(value, str) else None
+        if name == "tostring":
+            return str(value) if not isinstance(value, tuple) else None
+        if name == "size":
+            return len(value) if isinstance(value, (str, list)) else None
+        if name == "type":
+            return graph.strings.get(graph.edge_type[value[1]]) if value[0] == "rel" else None
+        if name == "labels":
+            return [graph.strings.get(graph.node_label[value[1]])] if value[0] == "node" else None
+        if name == "id":
+            return value[1]
+        return f"{value[0]}:{value[1]}"
+
+    # Projection
+
+    def _project(self, bindings: Iterator[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        query = self.query
+        items = query.items
+        aliases = [alias for _, alias in items]
+        aggregated = [_is_aggregate(expression) for expression, _ in items]
+        for (expression, _), is_aggregate in zip(items, aggregated):
+            if not is_aggregate and _contains_aggregate(expression):
+                raise UnsupportedQueryError("Aggregates must be top-level RETURN items")
+
+        skip = self._eval(query.skip, {}) if query.skip else 0
+        limit = self._eval(query.limit, {}) if query.limit else None
+
+        # Each row is (values, context for ORDER BY)
+        rows: List[Tuple[List[Any], Dict[str, Any]]] = []
+        if any(aggregated):
+            groups: Dict[tuple, Tuple[List[Any], List[Optional[_Aggregator]]]] = {}
+            for binding in bindings:
+                keys = [None if is_aggregate else self._eval(expression, binding) for (expression, _), is_aggregate in zip(items, aggregated)]
+                group_key = tuple(_hashable(key) for key in keys)
+                group = groups.get(group_key)
+                if group is None:
+                    group = (keys, [_Aggregator(expression[1], expression[2]) if is_aggregate else None for (expression, _), is_aggregate in zip(items, aggregated)])
+                    groups[group_key] = group
+                for (expression, _), aggregator in zip(items, group[1]):
+                    if aggregator is not None:
+                        argument = expression[3][0] if expression[3] else ("star",)
+                        aggregator.add(True if argument[0] == "star" else self._eval(argument, binding))
+            if not groups and not any(not is_aggregate for is_aggregate in aggregated):
+                # Aggregating nothing still produces one row, e.g. count(*) = 0
+                groups[()] = ([None] * len(items), [_Aggregator(expression[1], expression[2]) for expression, _ in items])
+            for keys, aggregators in groups.values():
+                values = [aggregator.result() if aggregator else key for key, aggregator in zip(keys, aggregators)]
+                rows.append((values, dict(zip(aliases, values))))
+        else:
+            streaming = not query.order and not query.distinct
+            for binding in bindings:
+                values = [self._eval(expression, binding) for expression, _ in items]
+                rows.append((values, {**binding, **dict(zip(aliases, values))}))
+                if streaming and limit is not None and len(rows) >= skip + limit:
+                    break
+
+        if query.distinct:
+            seen = set()
+            unique = []
+            for row in rows:
+                key = tuple(_hashable(value) for value in row[0])
+                if key not in seen:
+                    seen.add(key)
+                    unique.append(row)
+            rows = unique
+
+        # Stable sorts from the last key to the first give a multi-key ordering
+        for expression, descending in reversed(query.order):
+            rows.sort(key=lambda row: self._order_value(expression, row), reverse=descending)
+
+        rows = rows[skip:]
+        if limit is not None:
+            rows = rows[:limit]
+        return [dict(zip(aliases, (self._output(value) for value in values))) for values, _ in rows]
+
+    def _order_value(self, expression: tuple, row: Tuple[List[Any], Dict[str, Any]]) -> tuple:
+        values, context = row
+        for index, (item, _) in enumerate(self.query.items):
+            if item == expression:
+                return _sort_key(values[index])
+        return _sort_key(self._eval(expression, context))
+
+    def _output(self, value: Any) -> Any:
+        if isinstance(value, tuple) and len(value) == 2:
+            if value[0] == "node":
+                return self.graph.node_properties(value[1])
+            if value[0] == "rel":
+                return {}
+        if isinstance(value, list):
+            return [self._output(element) for element in value]
+        return value
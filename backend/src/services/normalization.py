@@ -0,0 +1,140 @@
+import re
+from typing import Any, Dict, List, Optional, Set, Tuple
+from pydantic import TypeAdapter, ValidationError
+from typing_extensions import TypedDict
+from src.models.graph import Node, Relationship, NormalizedData
+
+# Names the graph uses for tenancy; extracted data may not create them
+RESERVED_NODE_TYPES = {"Tenant"}
+RESERVED_RELATIONSHIP_TYPES = {"BELONGS_TO"}
+
+class _Payload(TypedDict):
+    nodes: List[Any]
+    relationships: List[Any]
+
+# Built once; validating with a TypeAdapter runs pydantic's compiled validators
+_payload_adapter = TypeAdapter(_Payload)
+_node_adapter = TypeAdapter(Node)
+_relationship_adapter = TypeAdapter(Relationship)
+
+# Runs of letters and digits in any script
+_WORD = re.compile(r"[^\W_]+")
+
+def _split_case(token: str) -> List[str]:
+    """Split camelCase and PascalCase: "programmingLanguage", "AIModel" """
+    words = []
+    start = 0
+    for i in range(1, len(token)):
+        previous, current = token[i - 1], token[i]
+        following = token[i + 1] if i + 1 < len(token) else ""
+        if current.isupper() and (
+            previous.islower() or previous.isdigit() or (previous.isupper() and following.islower())
+        ):
+            words.append(token[start:i])
+            start = i
+    words.append(token[start:])
+    return words
+
+def _words(value: str) -> List[str]:
+    """Split an identifier or phrase into words: "programmingLanguage", "works at", "WORKS_AT" """
+    return [word for token in _WORD.findall(value) for word in _split_case(token)]
+
+def canonical_node_type(value: str) -> str:
+    """PascalCase label: "programming language" and "PROGRAMMING_LANGUAGE" become "ProgrammingLanguage".
+
+    Acronyms such as "NGO" in "NGOPartner" keep their case. A value with no
+    letters or digits is kept as it is rather than becoming an empty label.
+    """
+    words = _words(value)
+    if not words:
+        return value.strip()
+    # An all-caps value of several words is SCREAMING_SNAKE, not a run of acronyms
+    shouting = len(words) > 1 and value.upper() == value
+    return "".join(word if word.isupper() and not shouting else word.capitalize() for word in words)
+
+def canonical_relationship_type(value: str) -> str:
+    """UPPER_SNAKE relationship type: "works at" and "worksAt" become "WORKS_AT" """
+    words = _words(value)
+    if not words:
+        return value.strip()
+    return "_".join(word.upper() for word in words)
+
+def canonical_name(value: str) -> str:
+    return " ".join(value.split())
+
+def parse_extracted_data(data: Any) -> Optional[Dict[str, List[Any]]]:
+    """Check the envelope of an extraction result: a dict with `nodes` and `relationships` lists"""
+    try:
+        return _payload_adapter.validate_python(data)
+    except ValidationError:
+        return None
+
+def normalize_extracted_data(data: Dict[str, List[Any]]) -> NormalizedData:
+    """Reduce an extraction result to the minimal set of writes.
+
+    Type names are canonicalized, names are whitespace-normalized, malformed
+    and reserved entries are dropped, duplicates are collapsed and
+    relationships whose endpoints aren't among the nodes are dropped.
+    Relationships get `from_type` and `to_type` when their endpoint names are
+    unambiguous. `removed` counts what was dropped, by reason.
+    """
+    removed = {
+        "invalid_nodes": 0,
+        "duplicate_nodes": 0,
+        "invalid_relationships": 0,
+        "duplicate_relationships": 0,
+        "dangling_relationships": 0
+    }
+
+    nodes: List[Node] = []
+    seen_nodes: Set[Tuple[str, str]] = set()
+    types_by_name: Dict[str, Set[str]] = {}
+    for raw in data["nodes"]:
+        try:
+            node = _node_adapter.validate_python(raw)
+        except ValidationError:
+            removed["invalid_nodes"] += 1
+            continue
+        node_type = canonical_node_type(node["type"])
+        name = canonical_name(node["name"])
+        if not node_type or not name or node_type in RESERVED_NODE_TYPES:
+            removed["invalid_nodes"] += 1
+            continue
+        if (node_type, name) in seen_nodes:
+            removed["duplicate_nodes"] += 1
+            continue
+        seen_nodes.add((node_type, name))
+        types_by_name.setdefault(name, set()).add(node_type)
+        nodes.append(Node(type=node_type, name=name))
+
+    relationships: List[Relationship] = []
+    seen_relationships: Set[Tuple[str, str, str]] = set()
+    for raw in data["relationships"]:
+        try:
+            rel = _relationship_adapter.validate_python(raw)
+        except ValidationError:
+            removed["invalid_relationships"] += 1
+            continue
+        rel_type = canonical_relationship_type(rel["type"])
+        from_id = canonical_name(rel["from_id"])
+        to_id = canonical_name(rel["to_id"])
+        if not rel_type or rel_type in RESERVED_RELATIONSHIP_TYPES:
+            removed["invalid_relationships"] += 1
+            continue
+        if from_id not in types_by_name or to_id not in types_by_name:
+            removed["dangling_relationships"] += 1
+            continue
+        if (from_id, rel_type, to_id) in seen_relationships:
+            removed["duplicate_relationships"] += 1
+            continue
+        seen_relationships.add((from_id, rel_type, to_id))
+
+        relationship = Relationship(from_id=from_id, to_id=to_id, type=rel_type)
+        # With a single candidate label the endpoints can be matched through the label index
+        if len(types_by_name[from_id]) == 1:
+            relationship["from_type"] = next(iter(types_by_name[from_id]))
+        if len(types_by_name[to_id]) == 1:
+            relationship["to_type"] = next(iter(types_by_name[to_id]))
+        relationships.append(relationship)
+
+    return NormalizedData(nodes=nodes, relationships=relationships, removed=removed)
@@ -0,0 +1,182 @@
+import os
+from typing import Any, Dict, List, Optional, Set, Tuple
+from src.services.storage import get_storage, STATS_TOP_HUBS
+from src.services.database import quote_identifier
+from src.services.prompts import identifier_words, singular
+
+# Names returned when a question asks to list the nodes of one type
+OVERVIEW_LIST_LIMIT = int(os.getenv("OVERVIEW_LIST_LIMIT", "100"))
+# Hubs listed when a ranking question doesn't say how many
+OVERVIEW_DEFAULT_TOP_K = 10
+
+def _word_set(text: str) -> Set[str]:
+    return {singular(word) for word in text.split()}
+
+# A question is answered from the statistics only if every word is one of these or part of a type name
+_COUNT_WORDS = _word_set("how many number count")
+_RANK_WORDS = _word_set("most top highest biggest largest")
+_HUB_WORDS = _word_set("connected connections hubs central degree relationships links")
+_OVERVIEW_WORDS = _word_set("overview summary summarize statistics stats types kinds")
+_LIST_WORDS = _word_set("list show what which name names")
+_NODE_WORDS = _word_set("nodes entities things items")
+_RELATIONSHIP_WORDS = _word_set("relationships connections edges links relations")
+_FILLER_WORDS = _word_set(
+    "a an and the is are there in of on with by do does we i you me my our this have has total all who "
+    "mentioned exist known graph database data tell give get find please about different kind type"
+) | _COUNT_WORDS | _OVERVIEW_WORDS | _LIST_WORDS | _NODE_WORDS | _RELATIONSHIP_WORDS
+# Ranking words only fit hub questions; "How many companies are connected?" is about the data
+_HUB_FILLER_WORDS = _FILLER_WORDS | _RANK_WORDS | _HUB_WORDS
+# Words a question may have that are neither filler nor numbers, e.g. a two-word type name
+_MAX_TYPE_WORDS = 4
+
+def _question_kind(words: List[str]) -> Optional[str]:
+    present = set(words)
+    if present & _RANK_WORDS and present & _HUB_WORDS:
+        return "hubs"
+    if ("how" in present and "many" in present) or present & {"count", "number"}:
+        return "count"
+    if present & _OVERVIEW_WORDS:
+        return "overview"
+    if present & _LIST_WORDS:
+        return "list"
+    return None
+
+def _match_type(words: List[str], counts: Dict[str, int]) -> Tuple[Optional[str], List[str]]:
+    """The type whose name's words all appear in `words`, preferring longer names, and the other words"""
+    best = None
+    best_words: List[str] = []
+    for name in counts:
+        name_words = identifier_words(name)
+        if name_words and len(name_words) > len(best_words) and all(word in words for word in name_words):
+            best, best_words = name, name_words
+    return best, [word for word in words if word not in best_words]
+
+def _plan(question: str, stats: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+    """Decide whether the statistics answer `question`.
+
+    Without `stats` this only checks that the question looks like an overview
+    question, so other questions don't cost a statistics read.
+    """
+    words = identifier_words(question)
+    kind = _question_kind(words)
+    if kind is None:
+        return None
+    filler = _HUB_FILLER_WORDS if kind == "hubs" else _FILLER_WORDS
+    numbers = [int(word) for word in words if word.isdigit()]
+    other = [word for word in words if word not in filler and not word.isdigit()]
+    if len(other) > _MAX_TYPE_WORDS or len(numbers) > 1:
+        return None
+    if stats is None:
+        return {"kind": kind}
+
+    node_type, rest = _match_type(words, stats["node_type_counts"])
+    rel_type = None
+    if node_type is None:
+        rel_type, rest = _match_type(words, stats["relationship_type_counts"])
+    if any(word not in filler and not word.isdigit() for word in rest):
+        return None
+
+    plan = {"kind": kind, "node_type": node_type, "relationship_type": rel_type, "limit": numbers[0] if numbers else None}
+    if kind == "count":
+        # "How many relationships does a Person have" is about the data, not the totals
+        if node_type and set(rest) & _RELATIONSHIP_WORDS:
+            return None
+        if not (node_type or rel_type or set(rest) & (_NODE_WORDS | _RELATIONSHIP_WORDS)):
+            return None
+    if kind in ("hubs", "list") and rel_type:
+        return None
+    if kind == "overview" and (node_type or rel_type):
+        return None
+    if kind == "list" and not node_type:
+        return None
+    return plan
+
+def _count_answer(plan: Dict[str, Any], stats: Dict[str, Any], words: Set[str]) -> Tuple[List[Dict[str, Any]], str]:
+    if plan["node_type"]:
+        count = stats["node_type_counts"][plan["node_type"]]
+        return [{"type": plan["node_type"], "count": count}], f"There are {count} {plan['node_type']} nodes."
+    if plan["relationship_type"]:
+        count = stats["relationship_type_counts"][plan["relationship_type"]]
+        return [{"type": plan["relationship_type"], "count": count}], f"There are {count} {plan['relationship_type']} relationships."
+    row = {}
+    if words & _NODE_WORDS or not words & _RELATIONSHIP_WORDS:
+        row["node_count"] = stats["node_count"]
+    if words & _RELATIONSHIP_WORDS:
+        row["relationship_count"] = stats["relationship_count"]
+    described = " and ".join(f"{count} {key.split('_')[0]}s" for key, count in row.items())
+    return [row], f"The graph has {described}."
+
+def _overview_answer(stats: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], str]:
+    rows = [{"kind": "node", "type": name, "count": count} for name, count in stats["node_type_counts"].items()]
+    rows += [{"kind": "relationship", "type": name, "count": count} for name, count in stats["relationship_type_counts"].items()]
+    summary = (
+        f"The graph has {stats['node_count']} nodes of {len(stats['node_type_counts'])} types "
+        f"and {stats['relationship_count']} relationships of {len(stats['relationship_type_counts'])} types."
+    )
+    if stats["node_type_counts"]:
+        common = ", ".join(f"{name} ({count})" for name, count in list(stats["node_type_counts"].items())[:5])
+        summary += f" The most common node types are {common}."
+    return rows, summary
+
+def _hubs_answer(plan: Dict[str, Any], stats: Dict[str, Any]) -> Optional[Tuple[List[Dict[str, Any]], str]]:
+    hubs = stats["top_hubs"]
+    # Fewer than STATS_TOP_HUBS stored means every node with relationships is listed
+    complete = len(hubs) < STATS_TOP_HUBS
+    limit = plan["limit"] or OVERVIEW_DEFAULT_TOP_K
+    if plan["node_type"]:
+        hubs = [hub for hub in hubs if hub["type"] == plan["node_type"]]
+    if len(hubs) < limit and not complete:
+        # Nodes outside the stored top hubs may rank here, so the statistics can't answer
+        return None
+    hubs = hubs[:limit]
+    if not hubs:
+        nodes = f"{plan['node_type']} nodes" if plan["node_type"] else "nodes"
+        return [], f"No {nodes} have relationships yet."
+    listed = ", ".join(f"{hub['name']} ({hub['degree']} relationships)" for hub in hubs)
+    return hubs, f"The most connected {plan['node_type'] or 'nodes'} are {listed}."
+
+async def _list_answer(tenant_id: str, plan: Dict[str, Any], stats: Dict[str, Any]) -> Tuple[str, List[Dict[str, Any]], str]:
+    node_type = plan["node_type"]
+    limit = min(plan["limit"] or OVERVIEW_LIST_LIMIT, OVERVIEW_LIST_LIMIT)
+    query = (
+        f"MATCH (n:{quote_identifier(node_type)})-[:BELONGS_TO]->(:Tenant {{id: $tenant_id}}) "
+        f"RETURN n.name as name ORDER BY name LIMIT {limit}"
+    )
+    rows = await get_storage().run_read_query(query, {"tenant_id": tenant_id}, tenant_id=tenant_id)
+    count = stats["node_type_counts"][node_type]
+    summary = f"There are {count} {node_type} nodes"
+    if rows:
+        shown = "" if len(rows) == count else f" (first {len(rows)} by name)"
+        summary += f"{shown}: " + ", ".join(str(row["name"]) for row in rows)
+    return query, rows, summary + "."
+
+async def answer_from_stats(tenant_id: str, question: str) -> Optional[Dict[str, Any]]:
+    """Answer counting, overview, hub ranking and listing questions without the LLM.
+
+    Returns None for any other question. Counts and hubs come from the tenant's
+    materialized statistics; listing runs one label-indexed query. The answer has
+    the `query` that was run (None if none was) and the result `rows` and `summary`.
+    """
+    if _plan(question) is None:
+        return None
+    stats = await get_storage().get_stats(tenant_id, top_k=STATS_TOP_HUBS)
+    if stats["node_count"] is None:
+        # The tenant's statistics haven't been computed yet, so they can't answer anything
+        return None
+    plan = _plan(question, stats)
+    if plan is None:
+        return None
+
+    query = None
+    if plan["kind"] == "count":
+        rows, summary = _count_answer(plan, stats, set(identifier_words(question)))
+    elif plan["kind"] == "overview":
+        rows, summary = _overview_answer(stats)
+    elif plan["kind"] == "hubs":
+        answer = _hubs_answer(plan, stats)
+        if answer is None:
+            return None
+        rows, summary = answer
+    else:
+        query, rows, summary = await _list_answer(tenant_id, plan, stats)
+    return {"query": query, "rows": rows, "summary": summary}
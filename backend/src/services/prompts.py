@@ -0,0 +1,169 @@
+import os
+import re
+import math
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# Hard limit on the tokens of a prompt we send, and the share of it the schema may use
+PROMPT_MAX_TOKENS = int(os.getenv("PROMPT_MAX_TOKENS", "16000"))
+PROMPT_SCHEMA_TOKEN_BUDGET = int(os.getenv("PROMPT_SCHEMA_TOKEN_BUDGET", "1500"))
+# Model whose tokenizer is used when tiktoken is installed
+PROMPT_TOKENIZER_MODEL = os.getenv("PROMPT_TOKENIZER_MODEL", "gpt-4o")
+
+_encoding = None
+_stats: Dict[str, Dict[str, int]] = {}
+
+class PromptTooLargeError(ValueError):
+    """Raised when the fixed parts of a prompt and the input alone exceed PROMPT_MAX_TOKENS"""
+
+def _get_encoding():
+    """The tiktoken encoding for PROMPT_TOKENIZER_MODEL, or False if tiktoken isn't installed"""
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+        except ImportError:
+            _encoding = False
+        else:
+            try:
+                _encoding = tiktoken.encoding_for_model(PROMPT_TOKENIZER_MODEL)
+            except KeyError:
+                _encoding = tiktoken.get_encoding("o200k_base")
+    return _encoding
+
+def count_tokens(text: str) -> int:
+    """Count tokens with tiktoken if it's installed, otherwise estimate about 4 characters per token"""
+    encoding = _get_encoding()
+    if encoding:
+        return len(encoding.encode(text))
+    return math.ceil(len(text) / 4)
+
+_IRREGULAR_PLURALS = {"people": "person", "children": "child", "men": "man", "women": "woman"}
+
+def singular(word: str) -> str:
+    """A rough singular of a lowercase English word, applied alike to questions and type names"""
+    if word in _IRREGULAR_PLURALS:
+        return _IRREGULAR_PLURALS[word]
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if word.endswith(("sses", "xes", "ches", "shes")):
+        return word[:-2]
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+def identifier_words(text: str) -> List[str]:
+    """Singular lowercase words of free text or of an identifier (PascalCase, UPPER_SNAKE), in order"""
+    text = re.sub(r"([a-z0-9])([A-Z])", r"\1 \2", text)
+    return [singular(word) for word in re.findall(r"[a-z0-9]+", text.lower())]
+
+def rank_schema_elements(counts: Dict[str, int], text: str) -> List[str]:
+    """Order schema elements by how many of their words appear in `text`, then by how common they are"""
+    text_words = set(identifier_words(text))
+
+    def key(name: str) -> Tuple[int, int, str]:
+        return (-len(set(identifier_words(name)) & text_words), -counts.get(name, 0), name)
+
+    return sorted(counts, key=key)
+
+def select_schema_elements(counts: Dict[str, int], text: str, budget: int) -> List[str]:
+    """The highest ranked elements that fit in `budget` tokens, listed most common first.
+
+    Listing by frequency rather than relevance keeps the start of the list the
+    same from call to call, which helps the provider's prompt cache.
+    """
+    selected = []
+    used = 0
+    for name in rank_schema_elements(counts, text):
+        cost = count_tokens(name) + 1
+        if used + cost > budget:
+            continue
+        selected.append(name)
+        used += cost
+    return sorted(selected, key=lambda name: (-counts.get(name, 0), name))
+
+def _counts(schema: Dict[str, Any], kind: str) -> Dict[str, int]:
+    # Schemas from older callers only list the types; treat them as equally common
+    counts = schema.get(f"{kind}_counts")
+    if counts is None:
+        counts = {name: 0 for name in schema.get(f"{kind}s", [])}
+    return counts
+
+def _format_types(names: Sequence[str], total: int) -> str:
+    listed = ", ".join(names) if names else "(none)"
+    if total > len(names):
+        listed += f" (and {total - len(names)} less relevant types not listed)"
+    return listed
+
+def build_prompt(
+    operation: str,
+    instructions: str,
+    schema: Dict[str, Any],
+    text: str,
+    tail: str,
+    max_tokens: Optional[int] = None,
+    schema_budget: Optional[int] = None
+) -> Dict[str, Any]:
+    """Assemble `instructions`, the schema section and `tail` into a prompt within the token budget.
+
+    `instructions` is the part that is the same for every call and comes first;
+    `tail` holds the per-call input. Node and relationship types are chosen by
+    relevance to `text` and frequency until the schema budget is used up.
+    Returns the `prompt`, its `prompt_tokens` and how many schema types were left out.
+    """
+    max_tokens = max_tokens or PROMPT_MAX_TOKENS
+    schema_budget = schema_budget or PROMPT_SCHEMA_TOKEN_BUDGET
+
+    fixed_tokens = count_tokens(instructions) + count_tokens(tail)
+    if fixed_tokens > max_tokens:
+        raise PromptTooLargeError(f"Input is too long: {fixed_tokens} prompt tokens, the limit is {max_tokens}")
+    budget = min(schema_budget, max_tokens - fixed_tokens)
+
+    node_counts = _counts(schema, "node_type")
+    rel_counts = _counts(schema, "relationship_type")
+    # Split the budget by how many of each there are, so neither crowds out the other
+    total = len(node_counts) + len(rel_counts)
+    node_budget = budget * len(node_counts) // total if total else 0
+    nodes = select_schema_elements(node_counts, text, node_budget)
+    # Relationship types get whatever the node types didn't use
+    rels = select_schema_elements(rel_counts, text, budget - sum(count_tokens(name) + 1 for name in nodes))
+
+    schema_section = (
+        f"Node types: {_format_types(nodes, len(node_counts))}\n"
+        f"Relationship types: {_format_types(rels, len(rel_counts))}\n"
+    )
+    prompt = f"{instructions}\n{schema_section}\n{tail}"
+    prompt_tokens = count_tokens(prompt)
+    omitted = total - len(nodes) - len(rels)
+
+    stats = _operation_stats(operation)
+    stats["prompts_built"] += 1
+    stats["prompt_tokens"] += prompt_tokens
+    stats["schema_types_omitted"] += omitted
+    print(f"{operation} prompt: {prompt_tokens} tokens, {len(nodes) + len(rels)}/{total} schema types")
+
+    return {"prompt": prompt, "prompt_tokens": prompt_tokens, "schema_types_omitted": omitted}
+
+def _operation_stats(operation: str) -> Dict[str, int]:
+    return _stats.setdefault(operation, {
+        "prompts_built": 0,
+        "prompt_tokens": 0,
+        "schema_types_omitted": 0,
+        "api_calls": 0,
+        "api_prompt_tokens": 0,
+        "api_cached_tokens": 0,
+        "api_completion_tokens": 0
+    })
+
+def record_api_usage(operation: str, usage: Any):
+    """Add the usage the API reported for a completion, including prompt tokens served from its cache"""
+    if usage is None:
+        return
+    stats = _operation_stats(operation)
+    stats["api_calls"] += 1
+    stats["api_prompt_tokens"] += getattr(usage, "prompt_tokens", 0) or 0
+    stats["api_completion_tokens"] += getattr(usage, "completion_tokens", 0) or 0
+    details = getattr(usage, "prompt_tokens_details", None)
+    stats["api_cached_tokens"] += getattr(details, "cached_tokens", 0) or 0
+
+def prompt_stats() -> Dict[str, Dict[str, int]]:
+    return {operation: dict(stats) for operation, stats in _stats.items()}
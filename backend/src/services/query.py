@@ -1,10 +1,30 @@
-from openai import OpenAI
 import os
-from typing import Dict, Any, List, Optional
+import asyncio
+from typing import Dict, Any, List, Optional, Tuple
 import json
-from src.services.database import get_schema, driver
-
-openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+import hashlib
+from src.services.storage import get_storage, get_schema
+from src.services.cache import (
+    cached, cache_key, cache_lookup, cache_store, tenant_scope, CACHE_CYPHER_TTL, CACHE_RESULTS_TTL
+)
+from src.services.llm import chat_completion
+from src.services.overview import answer_from_stats
+from src.services.prompts import build_prompt
+from src.utils.singleflight import SingleFlight, normalize_text
+from src.utils.resilience import CircuitOpenError, DeadlineExceeded
+
+# Questions one /query_batch request may ask
+QUERY_BATCH_MAX_QUESTIONS = int(os.getenv("QUERY_BATCH_MAX_QUESTIONS", "100"))
+# Questions per Cypher generation call in a batch, and queries a batch runs at once
+QUERY_BATCH_CHUNK_SIZE = int(os.getenv("QUERY_BATCH_CHUNK_SIZE", "10"))
+QUERY_BATCH_CONCURRENCY = int(os.getenv("QUERY_BATCH_CONCURRENCY", "8"))
+# Result rows per question included in a batch summary prompt
+QUERY_BATCH_SUMMARY_ROWS = int(os.getenv("QUERY_BATCH_SUMMARY_ROWS", "20"))
+
+# Concurrent identical requests share one computation per phase
+_cypher_flight = SingleFlight("generate_cypher")
+_execute_flight = SingleFlight("execute_cypher_query")
+_format_flight = SingleFlight("format_query_results")
 
 async def validate_cypher_query(query: str) -> Dict[str, Any]:
     """Basic validation of a Cypher query for safety"""
@@ -58,7 +78,8 @@ async def format_query_results(results: List[Dict[str, Any]], query: str, natura
     - limitations: Any limitations of the results or potential issues
     """
 
-    response = openai_client.chat.completions.create(
+    response = await chat_completion(
+        operation="format_results",
         model="gpt-4o-2024-05-13",
         messages=[
             {"role": "system", "content": "You are a data analyst assistant that helps interpret query results from a graph database."},
@@ -74,86 +95,125 @@ async def format_query_results(results: List[Dict[str, Any]], query: str, natura
         "formatted_response": formatted_response
     }
 
-async def execute_cypher_query(query: str) -> List[Dict[str, Any]]:
-    """Execute a Cypher query and return the results"""
-    try:
-        with driver.session() as session:
-            result = session.run(query)
-            # Convert Neo4j records to a list of dictionaries
-            records = [dict(record) for record in result]
-            return records
-    except Exception as e:
-        print(f"Error executing Cypher query: {e}")
-        return []
+async def execute_cypher_query(query: str, tenant_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Execute a Cypher query and return the results. Errors propagate to the caller."""
+    scope = tenant_scope(tenant_id) if tenant_id else None
+    return await _execute_flight.do(
+        (tenant_id, query),
+        lambda: cached(
+            "results",
+            cache_key(tenant_id, query),
+            lambda: get_storage().run_read_query(query, tenant_id=tenant_id),
+            scope=scope,
+            ttl=CACHE_RESULTS_TTL
+        )
+    )
+
+def cypher_instructions(tenant_id: str) -> str:
+    """The part of a Cypher generation prompt that is the same for every question of a tenant"""
+    return f"""
+    Convert the following natural language question into a Neo4j Cypher query.
+
+    TENANT:
+    - All nodes belong to a tenant with ID: {tenant_id}
+    - All nodes are connected to the tenant via a BELONGS_TO relationship
+
+    CONSTRAINTS:
+    - Query MUST only return data connected to tenant with ID: {tenant_id}
+    - Query must include a tenant filter: MATCH (n)-[:BELONGS_TO]->(:Tenant {{id: "{tenant_id}"}})
+    - Only READ operations are allowed (MATCH, RETURN, WHERE, etc.)
+    - No data modification operations (CREATE, DELETE, SET, etc.)
+
+    EXAMPLE CONVERSIONS:
+
+    Natural Language: "Show me all Person nodes"
+    Cypher:
+    ```
+    MATCH (p:Person)-[:BELONGS_TO]->(:Tenant {{id: "{tenant_id}"}})
+    RETURN p.name
+    ```
+
+    Natural Language: "Which companies are related to John?"
+    Cypher:
+    ```
+    MATCH (p:Person {{name: "John"}})-[:BELONGS_TO]->(:Tenant {{id: "{tenant_id}"}})
+    MATCH (p)-[r]-(c:Company)
+    RETURN p.name as person, type(r) as relationship, c.name as company
+    ```
+
+    SCHEMA INFORMATION (types in the database):"""
+
+def strip_code_fence(text: str) -> str:
+    """Return the Cypher inside a ``` block, without a language identifier, if the text has one"""
+    text = text.strip()
+    if "```" in text:
+        # Extract content between code blocks
+        text = text.split("```")[1]
+        # Remove language identifier if present (like "cypher")
+        if text.lower().startswith("cypher"):
+            text = text[6:]
+        text = text.strip()
+    return text
+
+async def generate_cypher(tenant_id: str, query: str, schema: Dict[str, Any]) -> str:
+    """Ask the LLM to translate a natural language question into Cypher"""
+    # Instructions and examples first and the question last, so calls for a tenant share a cacheable prefix
+    prompt = build_prompt(
+        "generate_cypher",
+        instructions=cypher_instructions(tenant_id),
+        schema=schema,
+        text=query,
+        tail=f"""YOUR TASK:
+    Convert this natural language query to a valid Cypher query:
+    "{query}"
+
+    Return ONLY the Cypher query with no additional text or explanations. The query must be optimized, correct, and follow Neo4j best practices.
+    """
+    )["prompt"]
+
+    # Get the Cypher query from OpenAI
+    response = await chat_completion(
+        operation="generate_cypher",
+        model="gpt-4o-2024-05-13",
+        messages=[
+            {"role": "system", "content": "You are a database expert that converts natural language queries to Cypher queries for Neo4j graph databases."},
+            {"role": "user", "content": prompt}
+        ],
+        temperature=0.1
+    )
+
+    return strip_code_fence(response.choices[0].message.content)
+
+def _cypher_inputs(tenant_id: str, normalized: str, schema: Dict[str, Any]) -> Tuple:
+    return (tenant_id, normalized, tuple(sorted(schema["node_types"])), tuple(sorted(schema["relationship_types"])))
 
 async def natural_language_to_cypher(tenant_id: str, query: str) -> Dict[str, Any]:
     """Convert a natural language query to a Cypher query and execute it"""
     try:
+        # Counts, overviews and hub rankings come straight from the tenant's statistics
+        overview = await answer_from_stats(tenant_id, query)
+        if overview is not None:
+            return {
+                "success": True,
+                "query": overview["query"],
+                "source": "stats",
+                "results": {
+                    "raw_results": overview["rows"],
+                    "formatted_response": {"summary": overview["summary"], "insights": [], "limitations": ""}
+                }
+            }
+
         # Get existing schema for the tenant
         schema = await get_schema(tenant_id)
 
-        # Create a prompt that includes schema information and examples
-        prompt = f"""
-        Convert the following natural language question into a Neo4j Cypher query.
-
-        SCHEMA INFORMATION:
-        - Node types in the database: {schema['node_types']}
-        - Relationship types in the database: {schema['relationship_types']}
-        - All nodes belong to a tenant with ID: {tenant_id}
-        - All nodes are connected to the tenant via a BELONGS_TO relationship
-
-        CONSTRAINTS:
-        - Query MUST only return data connected to tenant with ID: {tenant_id}
-        - Query must include a tenant filter: MATCH (n)-[:BELONGS_TO]->(:Tenant {{id: "{tenant_id}"}})
-        - Only READ operations are allowed (MATCH, RETURN, WHERE, etc.)
-        - No data modification operations (CREATE, DELETE, SET, etc.)
-
-        EXAMPLE CONVERSIONS:
-
-        Natural Language: "Show me all Person nodes"
-        Cypher:
-        ```
-        MATCH (p:Person)-[:BELONGS_TO]->(:Tenant {{id: "{tenant_id}"}})
-        RETURN p.name
-        ```
-
-        Natural Language: "Which companies are related to John?"
-        Cypher:
-        ```
-        MATCH (p:Person {{name: "John"}})-[:BELONGS_TO]->(:Tenant {{id: "{tenant_id}"}})
-        MATCH (p)-[r]-(c:Company)
-        RETURN p.name as person, type(r) as relationship, c.name as company
-        ```
-
-        YOUR TASK:
-        Convert this natural language query to a valid Cypher query:
-        "{query}"
-
-        Return ONLY the Cypher query with no additional text or explanations. The query must be optimized, correct, and follow Neo4j best practices.
-        """
-
-        # Get the Cypher query from OpenAI
-        response = openai_client.chat.completions.create(
-            model="gpt-4o-2024-05-13",
-            messages=[
-                {"role": "system", "content": "You are a database expert that converts natural language queries to Cypher queries for Neo4j graph databases."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.1
+        # The generated Cypher depends on the question and the schema, not on the data
+        normalized = normalize_text(query)
+        cypher_inputs = _cypher_inputs(tenant_id, normalized, schema)
+        cypher_query = await _cypher_flight.do(
+            cypher_inputs,
+            lambda: cached("cypher", cache_key(*cypher_inputs), lambda: generate_cypher(tenant_id, query, schema), ttl=CACHE_CYPHER_TTL)
         )
 
-        cypher_query = response.choices[0].message.content.strip()
-
-        # Extract code if wrapped in backticks
-        if "```" in cypher_query:
-            # Extract content between code blocks
-            cypher_query = cypher_query.split("```")[1]
-            # Remove language identifier if present (like "cypher")
-            if cypher_query.lower().startswith("cypher"):
-                cypher_query = cypher_query[6:].strip()
-            else:
-                cypher_query = cypher_query.strip()
-
         # Validate the query for safety
         validation = await validate_cypher_query(cypher_query)
         if not validation["valid"]:
@@ -164,10 +224,15 @@ async def natural_language_to_cypher(tenant_id: str, query: str) -> Dict[str, An
             }
 
         # Execute the query
-        results = await execute_cypher_query(cypher_query)
+        results = await execute_cypher_query(cypher_query, tenant_id)
 
         # Format results using LLM
-        formatted_results = await format_query_results(results, cypher_query, query)
+        results_key = hashlib.sha256(json.dumps(results, sort_keys=True, default=str).encode()).hexdigest()
+        format_inputs = (tenant_id, cypher_query, normalized, results_key)
+        formatted_results = await _format_flight.do(
+            format_inputs,
+            lambda: cached("format", cache_key(*format_inputs), lambda: format_query_results(results, cypher_query, query), ttl=CACHE_CYPHER_TTL)
+        )
 
         return {
             "success": True,
@@ -175,6 +240,9 @@ async def natural_language_to_cypher(tenant_id: str, query: str) -> Dict[str, An
             "results": formatted_results
         }
 
+    except (CircuitOpenError, DeadlineExceeded):
+        # Surfaced as 503/504 by the app's exception handlers
+        raise
     except Exception as e:
         import traceback
         print(f"Error processing natural language query: {e}")
@@ -183,3 +251,167 @@ async def natural_language_to_cypher(tenant_id: str, query: str) -> Dict[str, An
             "success": False,
             "error": str(e)
         }
+
+async def generate_cypher_batch(tenant_id: str, questions: List[str], schema: Dict[str, Any]) -> List[str]:
+    """Translate several questions into Cypher with one LLM call, in the order given"""
+    numbered = "\n".join(f'{i}. "{question}"' for i, question in enumerate(questions))
+    prompt = build_prompt(
+        "generate_cypher_batch",
+        instructions=cypher_instructions(tenant_id),
+        schema=schema,
+        text=" ".join(questions),
+        tail=f"""YOUR TASK:
+    Convert each of these numbered natural language queries to a valid Cypher query:
+    {numbered}
+
+    Return a JSON object {{"queries": [{{"index": 0, "cypher": "..."}}, ...]}} with one entry per question.
+    Each query must be optimized, correct, and follow Neo4j best practices.
+    """
+    )["prompt"]
+
+    response = await chat_completion(
+        operation="generate_cypher_batch",
+        model="gpt-4o-2024-05-13",
+        messages=[
+            {"role": "system", "content": "You are a database expert that converts natural language queries to Cypher queries for Neo4j graph databases."},
+            {"role": "user", "content": prompt}
+        ],
+        temperature=0.1,
+        response_format={"type": "json_object"}
+    )
+
+    by_index = {}
+    for entry in json.loads(response.choices[0].message.content).get("queries", []):
+        if isinstance(entry, dict) and isinstance(entry.get("index"), int) and isinstance(entry.get("cypher"), str):
+            by_index[entry["index"]] = strip_code_fence(entry["cypher"])
+    return [by_index.get(i, "") for i in range(len(questions))]
+
+async def _cypher_for_questions(tenant_id: str, questions: List[str], schema: Dict[str, Any]) -> Dict[str, Any]:
+    """Map each distinct normalized question to its Cypher, or to the exception that prevented it.
+
+    Questions already in the cache (from single or batch queries) are not sent
+    to the LLM; the rest are generated QUERY_BATCH_CHUNK_SIZE per call.
+    """
+    cypher: Dict[str, Any] = {}
+    missing: Dict[str, str] = {}
+    for question in questions:
+        normalized = normalize_text(question)
+        if normalized in cypher or normalized in missing:
+            continue
+        found, value, _ = await cache_lookup("cypher", cache_key(*_cypher_inputs(tenant_id, normalized, schema)))
+        if found:
+            cypher[normalized] = value
+        else:
+            missing[normalized] = question
+
+    async def generate_chunk(chunk: List[Tuple[str, str]]):
+        try:
+            queries = await generate_cypher_batch(tenant_id, [question for _, question in chunk], schema)
+        except Exception as e:
+            for normalized, _ in chunk:
+                cypher[normalized] = e
+            return
+        for (normalized, _), query in zip(chunk, queries):
+            if not query:
+                cypher[normalized] = ValueError("No query was generated for this question")
+                continue
+            cypher[normalized] = query
+            await cache_store("cypher", cache_key(*_cypher_inputs(tenant_id, normalized, schema)), query, ttl=CACHE_CYPHER_TTL)
+
+    pending = list(missing.items())
+    chunks = [pending[i:i + QUERY_BATCH_CHUNK_SIZE] for i in range(0, len(pending), QUERY_BATCH_CHUNK_SIZE)]
+    await asyncio.gather(*(generate_chunk(chunk) for chunk in chunks))
+    return cypher
+
+async def summarize_batch_results(answers: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Use one LLM call to answer every successful question of a batch"""
+    sections = []
+    for i, answer in enumerate(answers):
+        if not answer["success"]:
+            continue
+        rows = answer["results"][:QUERY_BATCH_SUMMARY_ROWS]
+        truncated = f" (first {len(rows)} of {len(answer['results'])})" if len(rows) < len(answer["results"]) else ""
+        sections.append(
+            f"{i}. Question: \"{answer['question']}\"\n"
+            f"   Cypher: {answer['query']}\n"
+            f"   Results{truncated}: {json.dumps(rows, default=str)}"
+        )
+
+    prompt = f"""
+    Each numbered question below was answered by running a Cypher query against a graph database.
+
+    {chr(10).join(sections)}
+
+    Format your response as a JSON object with these keys:
+    - answers: An array of {{"index": <question number>, "answer": <a direct natural language answer to that question>}}
+    - summary: A summary of what the results show across all questions
+    - insights: An array of key insights from the data
+    - limitations: Any limitations of the results or potential issues
+    """
+
+    response = await chat_completion(
+        operation="format_batch_results",
+        model="gpt-4o-2024-05-13",
+        messages=[
+            {"role": "system", "content": "You are a data analyst assistant that helps interpret query results from a graph database."},
+            {"role": "user", "content": prompt}
+        ],
+        temperature=0.1,
+        response_format={"type": "json_object"}
+    )
+
+    return json.loads(response.choices[0].message.content)
+
+async def natural_language_batch(tenant_id: str, questions: List[str], summarize: bool = False) -> Dict[str, Any]:
+    """Answer several natural language questions for a tenant.
+
+    Questions the tenant's statistics answer skip the LLM. For the rest the
+    schema is fetched once, Cypher is generated in a few batched LLM calls
+    and the queries run concurrently. A failing question gets its own error
+    without failing the others. With `summarize`, one more LLM call answers
+    every question and summarizes them together.
+    """
+    overviews: Dict[str, Dict[str, Any]] = {}
+    for question in questions:
+        normalized = normalize_text(question)
+        if normalized not in overviews:
+            overviews[normalized] = await answer_from_stats(tenant_id, question)
+    remaining = [question for question in questions if overviews[normalize_text(question)] is None]
+
+    cypher: Dict[str, Any] = {}
+    if remaining:
+        schema = await get_schema(tenant_id)
+        cypher = await _cypher_for_questions(tenant_id, remaining, schema)
+    semaphore = asyncio.Semaphore(QUERY_BATCH_CONCURRENCY)
+
+    async def answer(question: str) -> Dict[str, Any]:
+        overview = overviews[normalize_text(question)]
+        if overview is not None:
+            return {"question": question, "success": True, "query": overview["query"], "source": "stats", "results": overview["rows"]}
+
+        query = cypher[normalize_text(question)]
+        if isinstance(query, Exception):
+            return {"question": question, "success": False, "error": str(query)}
+
+        validation = await validate_cypher_query(query)
+        if not validation["valid"]:
+            return {"question": question, "success": False, "error": validation["reason"], "query": query}
+
+        try:
+            async with semaphore:
+                results = await execute_cypher_query(query, tenant_id)
+        except Exception as e:
+            return {"question": question, "success": False, "error": str(e), "query": query}
+        return {"question": question, "success": True, "query": query, "results": results}
+
+    answers = await asyncio.gather(*(answer(question) for question in questions))
+
+    # Each answer has its own `success`; the batch itself succeeded once it got this far
+    response: Dict[str, Any] = {"success": True, "answers": answers}
+    if summarize and any(answer["success"] for answer in answers):
+        try:
+            response["summary"] = await summarize_batch_results(answers)
+        except Exception as e:
+            print(f"Error summarizing batch results: {e}")
+            response["summary_error"] = str(e)
+    return response
@@ -0,0 +1,263 @@
+import os
+import time
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Callable, Deque, Dict, Optional
+
+# Extract and query requests that may run at once per worker
+SCHEDULER_CONCURRENCY = int(os.getenv("SCHEDULER_CONCURRENCY", "32"))
+# Slots one tenant may hold at once, so a backfill can't occupy all of them (0 means no limit)
+SCHEDULER_TENANT_MAX_CONCURRENCY = int(os.getenv("SCHEDULER_TENANT_MAX_CONCURRENCY", "8"))
+# Requests one tenant may have waiting before new ones are rejected
+SCHEDULER_TENANT_MAX_QUEUED = int(os.getenv("SCHEDULER_TENANT_MAX_QUEUED", "100"))
+# Sustained requests per second per tenant, and the burst allowed on top (0 disables)
+TENANT_RATE_PER_SECOND = float(os.getenv("TENANT_RATE_PER_SECOND", "10"))
+TENANT_RATE_BURST = float(os.getenv("TENANT_RATE_BURST", "50"))
+# LLM tokens per minute per tenant, measured from API usage data (0 disables)
+TENANT_TOKENS_PER_MINUTE = float(os.getenv("TENANT_TOKENS_PER_MINUTE", "200000"))
+# Tenants tracked per worker before idle ones are forgotten
+SCHEDULER_MAX_TENANTS = int(os.getenv("SCHEDULER_MAX_TENANTS", "10000"))
+# Scheduling weights as "tenant_id=weight,..."; tenants not listed have weight 1
+TENANT_WEIGHTS = os.getenv("TENANT_WEIGHTS", "")
+
+# Tenant whose request is running in this task, so LLM usage can be charged to it
+current_tenant: ContextVar[Optional[str]] = ContextVar("current_tenant", default=None)
+
+class TenantOverloadedError(Exception):
+    """Raised when a tenant is over its rate, token budget or queue limit"""
+
+    def __init__(self, tenant_id: str, reason: str, retry_after: float):
+        super().__init__(f"Tenant {tenant_id} is over its {reason}, retry in {retry_after:.0f}s")
+        self.tenant_id = tenant_id
+        self.reason = reason
+        self.retry_after = retry_after
+
+class TokenBucket:
+    """Holds up to `capacity` tokens, refilled at `rate` per second. The balance may go negative."""
+
+    def __init__(self, rate: float, capacity: float, clock: Callable[[], float]):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = capacity
+        self.updated = clock()
+
+    def refill(self) -> float:
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return self.tokens
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until the balance reaches `amount`"""
+        return max(0.0, (amount - self.refill()) / self.rate)
+
+    def take(self, amount: float):
+        self.refill()
+        self.tokens -= amount
+
+class _Tenant:
+    def __init__(self, weight: float, rate: Optional[TokenBucket], budget: Optional[TokenBucket]):
+        self.weight = weight
+        self.rate = rate
+        self.budget = budget
+        self.queue: Deque[list] = deque()
+        self.running = 0
+        self.last_finish = 0.0
+        self.admitted = 0
+        self.rejected = 0
+        self.tokens_used = 0
+
+class FairScheduler:
+    """Weighted fair queuing of requests across tenants, with per-tenant admission control.
+
+    Each request gets a virtual finish time of `max(virtual time, tenant's last
+    finish) + cost / weight`. When a slot frees, the waiting request with the
+    smallest finish time runs, so a tenant with a long backlog only delays its
+    own requests. Requests are rejected with TenantOverloadedError when the
+    tenant is over its request rate, its LLM token budget or its queue limit.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = SCHEDULER_CONCURRENCY,
+        tenant_max_concurrency: int = SCHEDULER_TENANT_MAX_CONCURRENCY,
+        tenant_max_queued: int = SCHEDULER_TENANT_MAX_QUEUED,
+        rate_per_second: float = TENANT_RATE_PER_SECOND,
+        rate_burst: float = TENANT_RATE_BURST,
+        tokens_per_minute: float = TENANT_TOKENS_PER_MINUTE,
+        weights: Optional[Dict[str, float]] = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.concurrency = concurrency
+        self.tenant_max_concurrency = tenant_max_concurrency
+        self.tenant_max_queued = tenant_max_queued
+        self.rate_per_second = rate_per_second
+        self.rate_burst = rate_burst
+        self.tokens_per_minute = tokens_per_minute
+        self.weights = weights if weights is not None else parse_weights(TENANT_WEIGHTS)
+        self.clock = clock
+        self.running = 0
+        self.virtual_time = 0.0
+        self._tenants: Dict[str, _Tenant] = {}
+        # Tenants with queued requests, so dispatch doesn't scan every known tenant
+        self._waiting: Dict[str, _Tenant] = {}
+
+    def _tenant(self, tenant_id: str) -> _Tenant:
+        tenant = self._tenants.get(tenant_id)
+        if tenant is None:
+            if len(self._tenants) >= SCHEDULER_MAX_TENANTS:
+                self._prune()
+            rate = None
+            if self.rate_per_second > 0:
+                rate = TokenBucket(self.rate_per_second, max(1.0, self.rate_burst), self.clock)
+            budget = None
+            if self.tokens_per_minute > 0:
+                budget = TokenBucket(self.tokens_per_minute / 60, self.tokens_per_minute, self.clock)
+            tenant = _Tenant(self.weights.get(tenant_id, 1.0), rate, budget)
+            self._tenants[tenant_id] = tenant
+        return tenant
+
+    def _prune(self):
+        """Forget idle tenants. A dropped tenant starts again with full buckets,
+        so tenants still paying off a token overdraft are kept."""
+        for tenant_id, tenant in list(self._tenants.items()):
+            if tenant.running or tenant.queue:
+                continue
+            if tenant.budget is not None and tenant.budget.refill() < 0:
+                continue
+            del self._tenants[tenant_id]
+
+    def _admit(self, tenant_id: str, tenant: _Tenant, cost: float):
+        reason = None
+        retry_after = 0.0
+        # A request costing more than the burst needs a full bucket, and overdraws it
+        rate_needed = min(cost, tenant.rate.capacity) if tenant.rate is not None else 0.0
+        if tenant.budget is not None and tenant.budget.refill() <= 0:
+            # Spent more LLM tokens than the budget allows; wait until it is positive again
+            reason, retry_after = "LLM token budget", max(1.0, tenant.budget.wait_time(1))
+        elif tenant.rate is not None and tenant.rate.refill() < rate_needed:
+            reason, retry_after = "request rate", tenant.rate.wait_time(rate_needed)
+        elif self.tenant_max_queued and len(tenant.queue) >= self.tenant_max_queued:
+            reason, retry_after = "queue limit", 1.0
+        if reason is not None:
+            tenant.rejected += 1
+            raise TenantOverloadedError(tenant_id, reason, retry_after)
+        if tenant.rate is not None:
+            tenant.rate.take(cost)
+        tenant.admitted += 1
+
+    def _eligible(self, tenant: _Tenant) -> bool:
+        return bool(tenant.queue) and (
+            not self.tenant_max_concurrency or tenant.running < self.tenant_max_concurrency
+        )
+
+    def _dispatch(self):
+        """Hand free slots to the waiting requests with the smallest virtual finish time"""
+        while self.running < self.concurrency:
+            candidates = [item for item in self._waiting.items() if self._eligible(item[1])]
+            if not candidates:
+                return
+            tenant_id, tenant = min(candidates, key=lambda item: item[1].queue[0][1])
+            start, _, waiter = tenant.queue.popleft()
+            if not tenant.queue:
+                del self._waiting[tenant_id]
+            self.virtual_time = max(self.virtual_time, start)
+            tenant.running += 1
+            self.running += 1
+            waiter.set_result(None)
+
+    def _release(self, tenant: _Tenant):
+        tenant.running -= 1
+        self.running -= 1
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, tenant_id: str, cost: float = 1.0) -> AsyncIterator[None]:
+        """Wait for the tenant's turn and hold a slot for the duration of the block.
+
+        `cost` is how many requests this one counts as, both against the
+        tenant's request rate and its share of the slots. LLM usage inside the
+        block is charged to the tenant's token budget.
+        """
+        tenant = self._tenant(tenant_id)
+        self._admit(tenant_id, tenant, cost)
+
+        start = max(self.virtual_time, tenant.last_finish)
+        finish = start + cost / tenant.weight
+        tenant.last_finish = finish
+        waiter = asyncio.get_running_loop().create_future()
+        entry = [start, finish, waiter]
+        tenant.queue.append(entry)
+        self._waiting[tenant_id] = tenant
+        self._dispatch()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Got the slot just as the caller went away
+                self._release(tenant)
+            else:
+                tenant.queue.remove(entry)
+                if not tenant.queue:
+                    self._waiting.pop(tenant_id, None)
+            raise
+
+        context_token = current_tenant.set(tenant_id)
+        try:
+            yield
+        finally:
+            current_tenant.reset(context_token)
+            self._release(tenant)
+
+    def record_usage(self, tenant_id: str, tokens: int):
+        tenant = self._tenant(tenant_id)
+        tenant.tokens_used += tokens
+        if tenant.budget is not None:
+            tenant.budget.take(tokens)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "concurrency": self.concurrency,
+            "tenants": {
+                tenant_id: {
+                    "weight": tenant.weight,
+                    "running": tenant.running,
+                    "queued": len(tenant.queue),
+                    "admitted": tenant.admitted,
+                    "rejected": tenant.rejected,
+                    "tokens_used": tenant.tokens_used,
+                    "token_budget_remaining": tenant.budget.refill() if tenant.budget else None
+                }
+                for tenant_id, tenant in self._tenants.items()
+            }
+        }
+
+def parse_weights(value: str) -> Dict[str, float]:
+    weights = {}
+    for item in value.split(","):
+        if "=" in item:
+            tenant_id, weight = item.split("=", 1)
+            tenant_id, weight = tenant_id.strip(), float(weight)
+            # A tenant's finish times advance by cost / weight
+            if not weight > 0:
+                raise ValueError(f"TENANT_WEIGHTS: the weight of {tenant_id} must be positive, got {weight}")
+            weights[tenant_id] = weight
+    return weights
+
+_scheduler: Optional[FairScheduler] = None
+
+def get_scheduler() -> FairScheduler:
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = FairScheduler()
+    return _scheduler
+
+def record_llm_usage(tokens: int):
+    """Charge LLM tokens to the tenant whose request is running, if any"""
+    tenant_id = current_tenant.get()
+    if tenant_id is not None and tokens:
+        get_scheduler().record_usage(tenant_id, tokens)
@@ -0,0 +1,269 @@
+import asyncio
+import os
+import traceback
+from abc import ABC, abstractmethod
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+from src.models.graph import ExtractedData
+from src.utils.singleflight import SingleFlight
+from src.utils.resilience import CircuitBreaker, CircuitOpenError, DeadlineExceeded, with_deadline
+from src.services.cache import cached, invalidate, tenant_scope, CACHE_SCHEMA_TTL
+
+# Which GraphStorage implementation the app uses: "neo4j" or "memory"
+GRAPH_BACKEND = os.getenv("GRAPH_BACKEND", "neo4j")
+# Deadline for one storage call (exports and tenant deletes run without one)
+GRAPH_TIMEOUT_SECONDS = float(os.getenv("GRAPH_TIMEOUT_SECONDS", "30"))
+# Consecutive failures that open the breaker, and how long it stays open
+GRAPH_BREAKER_FAILURES = int(os.getenv("GRAPH_BREAKER_FAILURES", "5"))
+GRAPH_BREAKER_RESET_SECONDS = float(os.getenv("GRAPH_BREAKER_RESET_SECONDS", "15"))
+# Most connected nodes kept in each tenant's materialized statistics
+STATS_TOP_HUBS = int(os.getenv("STATS_TOP_HUBS", "50"))
+
+class GraphStorage(ABC):
+    """Operations the services need from a graph store.
+
+    Nodes are identified by their type (label) and name and belong to a tenant
+    through a BELONGS_TO relationship to the tenant's `Tenant` node. Read queries
+    are Cypher; backends other than Neo4j support the subset our prompts produce.
+    """
+
+    async def start(self):
+        """Open connections. Called from the app lifespan."""
+
+    async def close(self):
+        """Release connections. Called from the app lifespan."""
+
+    def is_outage(self, error: BaseException) -> bool:
+        """Whether an error means the store is unhealthy, as opposed to the request being bad"""
+        return not isinstance(error, ValueError)
+
+    @abstractmethod
+    async def create_tenant(self, tenant_id: str, display_name: str):
+        ...
+
+    @abstractmethod
+    async def tenant_exists(self, tenant_id: str) -> bool:
+        ...
+
+    @abstractmethod
+    async def get_schema(self, tenant_id: str) -> Dict[str, Any]:
+        """Return the tenant's `node_types` and `relationship_types`, most common first,
+        and how many of each the tenant has in `node_type_counts` and `relationship_type_counts`"""
+
+    @abstractmethod
+    async def bulk_upsert(self, tenant_id: str, nodes: List[Dict[str, Any]], relationships: List[Dict[str, Any]]) -> Dict[str, int]:
+        """Merge nodes and relationships and return `nodes_created` and `relationships_created`"""
+
+    @abstractmethod
+    async def run_read_query(self, query: str, parameters: Optional[Dict[str, Any]] = None, tenant_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Run a read-only query. `tenant_id` lets the backend order it after that tenant's writes."""
+
+    @abstractmethod
+    def export_tenant(self, tenant_id: str) -> AsyncIterator[Dict[str, Any]]:
+        """Stream a tenant record, then node records, then relationship records"""
+
+    @abstractmethod
+    async def delete_tenant_data(
+        self,
+        tenant_id: str,
+        batch_size: Optional[int] = None,
+        on_progress: Optional[Callable[[str, int], None]] = None
+    ) -> Dict[str, int]:
+        """Delete a tenant's nodes and relationships in batches, keeping the tenant"""
+
+    @abstractmethod
+    async def delete_tenant(self, tenant_id: str):
+        ...
+
+    @abstractmethod
+    async def get_stats(self, tenant_id: str, top_k: int = 10) -> Dict[str, Any]:
+        """Return the tenant's materialized statistics without scanning its graph.
+
+        `node_count`, `relationship_count`, `node_type_counts`, `relationship_type_counts`
+        and `top_hubs` (the `top_k` nodes with the most relationships, at most
+        STATS_TOP_HUBS) are maintained by writes. They can drift, for example when
+        another tenant's purge removes relationships of shared nodes, until
+        `reconcile_stats` recomputes them. For a tenant whose statistics were never
+        computed (created before they were kept) they are all None until then.
+        """
+
+    @abstractmethod
+    async def reconcile_stats(self, tenant_id: str, batch_size: Optional[int] = None) -> Dict[str, Any]:
+        """Recompute the tenant's statistics from its graph and return the corrections made"""
+
+    async def insert_graph_data(self, tenant_id: str, data: ExtractedData) -> bool:
+        """Write an extraction result. Returns False if the tenant doesn't exist or the data is rejected.
+
+        Outages, open breakers and timeouts are raised, so callers report the
+        store as unavailable rather than the data as bad.
+        """
+        try:
+            if not await self.tenant_exists(tenant_id):
+                print(f"Error: Tenant {tenant_id} does not exist")
+                return False
+            await self.bulk_upsert(tenant_id, data["nodes"], data["relationships"])
+            return True
+        except (CircuitOpenError, DeadlineExceeded):
+            raise
+        except Exception as e:
+            if self.is_outage(e):
+                raise
+            print(f"Error inserting graph data: {e}")
+            traceback.print_exc()
+            return False
+
+class GuardedStorage(GraphStorage):
+    """Wraps a backend with per-call deadlines and circuit breakers.
+
+    While the backend is failing, calls raise CircuitOpenError immediately
+    instead of tying up workers until they time out. Reads and writes have
+    separate breakers: a store can keep answering reads while its writes fail,
+    and successful reads mustn't reset the count of failed writes. Writes to a
+    tenant invalidate its entries in the shared cache.
+    """
+
+    def __init__(
+        self,
+        backend: GraphStorage,
+        name: str = "graph",
+        timeout: Optional[float] = GRAPH_TIMEOUT_SECONDS,
+        breaker: Optional[CircuitBreaker] = None,
+        write_breaker: Optional[CircuitBreaker] = None
+    ):
+        self.backend = backend
+        self.timeout = timeout
+        self.breaker = breaker or CircuitBreaker(
+            name,
+            failure_threshold=GRAPH_BREAKER_FAILURES,
+            reset_timeout=GRAPH_BREAKER_RESET_SECONDS,
+            is_failure=backend.is_outage
+        )
+        self.write_breaker = write_breaker or CircuitBreaker(
+            f"{name}.write",
+            failure_threshold=GRAPH_BREAKER_FAILURES,
+            reset_timeout=GRAPH_BREAKER_RESET_SECONDS,
+            is_failure=backend.is_outage
+        )
+
+    async def _guard(self, fn: Callable[[], Any], timeout: Optional[float] = None, name: str = "storage call"):
+        return await self.breaker.call(lambda: with_deadline(fn(), timeout, name))
+
+    async def _guard_write(self, fn: Callable[[], Any], timeout: Optional[float] = None, name: str = "storage write"):
+        return await self.write_breaker.call(lambda: with_deadline(fn(), timeout, name))
+
+    async def start(self):
+        await self.backend.start()
+
+    async def close(self):
+        await self.backend.close()
+
+    def is_outage(self, error: BaseException) -> bool:
+        return self.backend.is_outage(error)
+
+    async def create_tenant(self, tenant_id: str, display_name: str):
+        await self._guard_write(lambda: self.backend.create_tenant(tenant_id, display_name), self.timeout, "create_tenant")
+        await invalidate(tenant_scope(tenant_id))
+
+    async def tenant_exists(self, tenant_id: str) -> bool:
+        return await self._guard(lambda: self.backend.tenant_exists(tenant_id), self.timeout, "tenant_exists")
+
+    async def get_schema(self, tenant_id: str) -> Dict[str, Any]:
+        return await self._guard(lambda: self.backend.get_schema(tenant_id), self.timeout, "get_schema")
+
+    # insert_graph_data is the GraphStorage default, so its tenant check and its write
+    # go through the read and write breakers separately
+
+    async def bulk_upsert(self, tenant_id: str, nodes: List[Dict[str, Any]], relationships: List[Dict[str, Any]]) -> Dict[str, int]:
+        # Invalidate also after a failure or timeout: part of the data may have been written
+        try:
+            return await self._guard_write(lambda: self.backend.bulk_upsert(tenant_id, nodes, relationships), self.timeout, "bulk_upsert")
+        finally:
+            await invalidate(tenant_scope(tenant_id))
+
+    async def run_read_query(self, query: str, parameters: Optional[Dict[str, Any]] = None, tenant_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        return await self._guard(lambda: self.backend.run_read_query(query, parameters, tenant_id), self.timeout, "run_read_query")
+
+    def export_tenant(self, tenant_id: str) -> AsyncIterator[Dict[str, Any]]:
+        # Checked before streaming starts, so an open breaker is an error response rather than a cut-off body
+        self.breaker.check()
+        return self._guard_stream(self.backend.export_tenant(tenant_id))
+
+    async def _guard_stream(self, records: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[Dict[str, Any]]:
+        """Pass records through, recording the stream's outcome once it ends. Streams have no deadline."""
+        try:
+            async for record in records:
+                yield record
+        except (asyncio.CancelledError, GeneratorExit):
+            # The client went away; that says nothing about the store
+            self.breaker.release()
+            raise
+        except Exception as e:
+            self.breaker.record_error(e)
+            raise
+        finally:
+            # Close the backend's stream (and its session) now, not when it is garbage collected
+            await records.aclose()
+        self.breaker.record_success()
+
+    async def delete_tenant_data(
+        self,
+        tenant_id: str,
+        batch_size: Optional[int] = None,
+        on_progress: Optional[Callable[[str, int], None]] = None
+    ) -> Dict[str, int]:
+        try:
+            return await self._guard_write(lambda: self.backend.delete_tenant_data(tenant_id, batch_size, on_progress))
+        finally:
+            await invalidate(tenant_scope(tenant_id))
+
+    async def delete_tenant(self, tenant_id: str):
+        try:
+            await self._guard_write(lambda: self.backend.delete_tenant(tenant_id), self.timeout, "delete_tenant")
+        finally:
+            await invalidate(tenant_scope(tenant_id))
+
+    async def get_stats(self, tenant_id: str, top_k: int = 10) -> Dict[str, Any]:
+        return await self._guard(lambda: self.backend.get_stats(tenant_id, top_k), self.timeout, "get_stats")
+
+    async def reconcile_stats(self, tenant_id: str, batch_size: Optional[int] = None) -> Dict[str, Any]:
+        # Walks the whole tenant, like a purge, so it runs without a deadline
+        return await self._guard_write(lambda: self.backend.reconcile_stats(tenant_id, batch_size))
+
+_storage: Optional[GraphStorage] = None
+
+def init_storage(backend: str = GRAPH_BACKEND) -> GraphStorage:
+    """Create the shared storage backend. The backend module is imported only when selected."""
+    global _storage
+    if _storage is None:
+        if backend == "neo4j":
+            from src.services.database import Neo4jStorage
+            _storage = GuardedStorage(Neo4jStorage(), name="graph.neo4j")
+        elif backend == "memory":
+            from src.services.memory_graph import MemoryStorage
+            _storage = GuardedStorage(MemoryStorage(), name="graph.memory")
+        else:
+            raise ValueError(f"Unknown GRAPH_BACKEND: {backend}")
+    return _storage
+
+def get_storage() -> GraphStorage:
+    return _storage or init_storage()
+
+async def close_storage():
+    global _storage
+    if _storage is not None:
+        await _storage.close()
+        _storage = None
+
+_schema_flight = SingleFlight("get_schema")
+
+async def get_schema(tenant_id: str) -> Dict[str, Any]:
+    """Get a tenant's schema from the shared cache, sharing one lookup between concurrent callers"""
+    return await _schema_flight.do(
+        tenant_id,
+        lambda: cached(
+            "schema",
+            tenant_id,
+            lambda: get_storage().get_schema(tenant_id),
+            scope=tenant_scope(tenant_id),
+            ttl=CACHE_SCHEMA_TTL
+        )
+    )
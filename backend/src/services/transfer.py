@@ -0,0 +1,203 @@
+import asyncio
+import io
+import json
+import os
+from typing import Any, AsyncIterator, Dict, List, Optional
+from src.services.storage import get_storage
+from src.services.normalization import (
+    RESERVED_NODE_TYPES, RESERVED_RELATIONSHIP_TYPES,
+    canonical_node_type, canonical_relationship_type, canonical_name
+)
+
+# Rows written per UNWIND transaction on import
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "5000"))
+# Rows per Parquet row group on export, and per batch read on import
+PARQUET_ROW_GROUP_SIZE = int(os.getenv("PARQUET_ROW_GROUP_SIZE", "10000"))
+# Bytes buffered before an NDJSON chunk is sent
+NDJSON_CHUNK_SIZE = 64 * 1024
+
+# Columns of the Parquet layout; each record fills the ones that apply to its kind
+PARQUET_COLUMNS = ["kind", "id", "type", "name", "from_type", "from_id", "to_type", "to_id"]
+
+class ImportFormatError(Exception):
+    """Raised when an import stream contains a malformed record"""
+
+def require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportFormatError("Parquet support requires pyarrow (pip install pyarrow)")
+    return pyarrow, pyarrow.parquet
+
+async def encode_ndjson(records: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[bytes]:
+    buffer = []
+    size = 0
+    async for record in records:
+        line = json.dumps(record) + "\n"
+        buffer.append(line)
+        size += len(line)
+        if size >= NDJSON_CHUNK_SIZE:
+            yield "".join(buffer).encode()
+            buffer = []
+            size = 0
+    if buffer:
+        yield "".join(buffer).encode()
+
+async def decode_ndjson(chunks: AsyncIterator[bytes]) -> AsyncIterator[Dict[str, Any]]:
+    pending = b""
+    line_number = 0
+    async for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            line_number += 1
+            if line.strip():
+                yield _parse_line(line, line_number)
+    if pending.strip():
+        yield _parse_line(pending, line_number + 1)
+
+def _parse_line(line: bytes, line_number: int) -> Dict[str, Any]:
+    try:
+        return json.loads(line)
+    except json.JSONDecodeError as e:
+        raise ImportFormatError(f"Line {line_number}: invalid JSON: {e}")
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object that collects whatever the Parquet writer has produced so far"""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+async def encode_parquet(records: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[bytes]:
+    """Write records as Parquet, sending each row group as soon as it is encoded.
+
+    Encoding runs in a thread, like decoding, so a large row group doesn't block the event loop.
+    """
+    pa, pq = require_pyarrow()
+    schema = pa.schema([(column, pa.string()) for column in PARQUET_COLUMNS])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+
+    def write_rows(rows: List[Dict[str, Any]]):
+        columns = {column: [row.get(column) for row in rows] for column in PARQUET_COLUMNS}
+        writer.write_table(pa.table(columns, schema=schema))
+
+    rows = []
+    async for record in records:
+        rows.append(record)
+        if len(rows) >= PARQUET_ROW_GROUP_SIZE:
+            await asyncio.to_thread(write_rows, rows)
+            rows = []
+            yield sink.drain()
+    if rows:
+        await asyncio.to_thread(write_rows, rows)
+    await asyncio.to_thread(writer.close)
+    yield sink.drain()
+
+async def decode_parquet(path: str) -> AsyncIterator[Dict[str, Any]]:
+    """Read a Parquet file one batch at a time"""
+    _, pq = require_pyarrow()
+    batches = pq.ParquetFile(path).iter_batches(batch_size=PARQUET_ROW_GROUP_SIZE)
+    while True:
+        batch = await asyncio.to_thread(next, batches, None)
+        if batch is None:
+            break
+        for row in batch.to_pylist():
+            yield {key: value for key, value in row.items() if value is not None}
+
+def _check_fields(record: Dict[str, Any], fields: List[str]):
+    for field in fields:
+        if not isinstance(record.get(field), str) or not record[field]:
+            raise ImportFormatError(f"{record.get('kind')} record is missing '{field}': {record}")
+
+def _normalize_node(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Canonicalize a node record like extracted nodes, rejecting the labels the graph uses for tenancy"""
+    _check_fields(record, ["type", "name"])
+    node = {"type": canonical_node_type(record["type"]), "name": canonical_name(record["name"])}
+    _check_fields({"kind": "node", **node}, ["type", "name"])
+    if node["type"] in RESERVED_NODE_TYPES:
+        raise ImportFormatError(f"Node type {record['type']!r} is reserved: {record}")
+    return node
+
+def _normalize_relationship(record: Dict[str, Any]) -> Dict[str, Any]:
+    _check_fields(record, ["type", "from_id", "to_id"])
+    relationship = {
+        "type": canonical_relationship_type(record["type"]),
+        "from_id": canonical_name(record["from_id"]),
+        "to_id": canonical_name(record["to_id"])
+    }
+    for field in ("from_type", "to_type"):
+        if record.get(field):
+            relationship[field] = canonical_node_type(record[field])
+    _check_fields({"kind": "relationship", **relationship}, ["type", "from_id", "to_id"])
+    if relationship["type"] in RESERVED_RELATIONSHIP_TYPES:
+        raise ImportFormatError(f"Relationship type {record['type']!r} is reserved: {record}")
+    if relationship.get("from_type") in RESERVED_NODE_TYPES or relationship.get("to_type") in RESERVED_NODE_TYPES:
+        raise ImportFormatError(f"Relationship endpoints may not be Tenant nodes: {record}")
+    return relationship
+
+async def import_tenant(tenant_id: str, records: AsyncIterator[Dict[str, Any]], batch_size: int = IMPORT_BATCH_SIZE) -> Dict[str, int]:
+    """Write exported records into a tenant through batched UNWIND transactions.
+
+    Types and names are canonicalized like extracted data, and records using the
+    reserved Tenant label or BELONGS_TO type are rejected. A missing tenant is created from the stream's tenant record, so an export can be
+    restored under its original id or cloned under a new one.
+    """
+    counts = {"nodes": 0, "relationships": 0, "nodes_created": 0, "relationships_created": 0}
+    nodes: List[Dict[str, Any]] = []
+    relationships: List[Dict[str, Any]] = []
+    exists: Optional[bool] = None
+
+    async def flush():
+        nonlocal nodes, relationships
+        if nodes or relationships:
+            created = await get_storage().bulk_upsert(tenant_id, nodes, relationships)
+            counts["nodes_created"] += created["nodes_created"]
+            counts["relationships_created"] += created["relationships_created"]
+            nodes = []
+            relationships = []
+
+    async for record in records:
+        kind = record.get("kind")
+        if exists is None:
+            exists = await get_storage().tenant_exists(tenant_id)
+            if not exists:
+                if kind != "tenant":
+                    raise ImportFormatError(f"Tenant {tenant_id} does not exist and the stream has no tenant record")
+                await get_storage().create_tenant(tenant_id, record.get("name") or tenant_id)
+                exists = True
+
+        if kind == "tenant":
+            continue
+        elif kind == "node":
+            nodes.append(_normalize_node(record))
+            counts["nodes"] += 1
+        elif kind == "relationship":
+            relationships.append(_normalize_relationship(record))
+            counts["relationships"] += 1
+        else:
+            raise ImportFormatError(f"Unknown record kind: {kind!r}")
+
+        if len(nodes) + len(relationships) >= batch_size:
+            await flush()
+
+    await flush()
+    return counts
@@ -0,0 +1,213 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+_breakers: List["CircuitBreaker"] = []
+_hedges: List["HedgePolicy"] = []
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency whose circuit breaker is open"""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} is unavailable, retry in {retry_after:.0f}s")
+        self.name = name
+        self.retry_after = retry_after
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a call to a dependency takes longer than its deadline"""
+
+async def with_deadline(awaitable: Awaitable[T], seconds: Optional[float], name: str = "call") -> T:
+    """Await with a deadline, cancelling the work if it runs over. None means no deadline."""
+    if seconds is None:
+        return await awaitable
+    try:
+        return await asyncio.wait_for(awaitable, timeout=seconds)
+    except asyncio.TimeoutError:
+        raise DeadlineExceeded(f"{name} exceeded its {seconds}s deadline")
+
+class CircuitBreaker:
+    """Fails fast while a dependency is down.
+
+    Closed: calls go through and consecutive failures are counted. After
+    `failure_threshold` of them the breaker opens and calls raise
+    CircuitOpenError for `reset_timeout` seconds. Then it is half-open: one probe
+    call goes through, and its outcome closes or re-opens the breaker.
+    `is_failure` decides which exceptions count; errors caused by the request
+    itself (bad input, invalid query) shouldn't.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        is_failure: Callable[[BaseException], bool] = lambda e: True,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.is_failure = is_failure
+        self.clock = clock
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+        self.rejected = 0
+        self.trips = 0
+        _breakers.append(self)
+
+    def check(self):
+        """Raise CircuitOpenError if a call shouldn't be attempted now"""
+        if self.state == "open":
+            remaining = self.opened_at + self.reset_timeout - self.clock()
+            if remaining > 0:
+                self.rejected += 1
+                raise CircuitOpenError(self.name, remaining)
+            self.state = "half_open"
+            self.probing = False
+        if self.state == "half_open":
+            if self.probing:
+                self.rejected += 1
+                raise CircuitOpenError(self.name, self.reset_timeout)
+            self.probing = True
+
+    def record_success(self):
+        self.state = "closed"
+        self.failures = 0
+        self.probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                self.trips += 1
+            self.state = "open"
+            self.opened_at = self.clock()
+            self.probing = False
+
+    def record_error(self, error: BaseException):
+        """Record a call that raised: a failure if `is_failure` says so, otherwise the dependency answered"""
+        if self.is_failure(error):
+            self.record_failure()
+        elif self.state == "half_open":
+            self.record_success()
+
+    def release(self):
+        """Give up a call without an outcome, e.g. because the caller went away"""
+        self.probing = False
+
+    async def call(self, fn: Callable[[], Awaitable[T]]) -> T:
+        self.check()
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            # The caller went away; that says nothing about the dependency
+            self.release()
+            raise
+        except Exception as e:
+            self.record_error(e)
+            raise
+        self.record_success()
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "trips": self.trips,
+            "rejected": self.rejected
+        }
+
+class HedgePolicy:
+    """Sends a duplicate request when the first one is slower than usual.
+
+    The hedge delay is the `percentile` of recent successful latencies (at least
+    `min_delay`). Whichever attempt finishes first wins and the other is
+    cancelled. Until `min_samples` latencies are recorded, requests aren't hedged.
+    Only use this for idempotent calls.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        percentile: float = 0.95,
+        min_delay: float = 1.0,
+        min_samples: int = 20,
+        window: int = 200,
+        enabled: bool = True
+    ):
+        self.name = name
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self.enabled = enabled
+        self.latencies: deque = deque(maxlen=window)
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        _hedges.append(self)
+
+    def delay(self) -> Optional[float]:
+        if not self.enabled or len(self.latencies) < self.min_samples:
+            return None
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, int(self.percentile * len(ordered)))
+        return max(self.min_delay, ordered[index])
+
+    async def run(self, fn: Callable[[], Awaitable[T]]) -> T:
+        self.calls += 1
+        delay = self.delay()
+        started = {}
+
+        def launch() -> asyncio.Future:
+            task = asyncio.ensure_future(fn())
+            started[task] = time.monotonic()
+            return task
+
+        tasks = [launch()]
+        error: Optional[BaseException] = None
+        try:
+            while True:
+                pending = [task for task in tasks if not task.done()]
+                if not pending:
+                    # Every attempt failed; hedging doesn't retry errors
+                    raise error
+                can_hedge = delay is not None and len(tasks) < 2
+                done, _ = await asyncio.wait(
+                    pending,
+                    timeout=delay if can_hedge else None,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    self.hedged += 1
+                    tasks.append(launch())
+                    continue
+                for task in done:
+                    if task.exception() is None:
+                        self.latencies.append(time.monotonic() - started[task])
+                        if task is not tasks[0]:
+                            self.hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "current_delay": self.delay()
+        }
+
+def resilience_stats() -> Dict[str, Any]:
+    return {
+        "circuit_breakers": {breaker.name: breaker.stats() for breaker in _breakers},
+        "hedging": {hedge.name: hedge.stats() for hedge in _hedges}
+    }
@@ -0,0 +1,60 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, TypeVar
+
+T = TypeVar("T")
+
+_groups: List["SingleFlight"] = []
+
+class SingleFlight:
+    """Collapses concurrent calls with the same key into one in-flight computation.
+
+    The first caller for a key starts the computation and later callers await the
+    same task, so all of them get its result or its exception. Once it finishes the
+    key is forgotten; this is request coalescing, not caching. A caller that is
+    cancelled doesn't cancel the computation for the others.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.calls = 0
+        self.executions = 0
+        self.collapsed = 0
+        _groups.append(self)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        self.calls += 1
+        task = self._inflight.get(key)
+        if task is None:
+            self.executions += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self.collapsed += 1
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Future):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the exception as retrieved when every caller was cancelled before it arrived
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "collapsed": self.collapsed,
+            "in_flight": len(self._inflight)
+        }
+
+def singleflight_stats() -> Dict[str, Dict[str, Any]]:
+    return {group.name: group.stats() for group in _groups}
+
+def normalize_text(text: str) -> str:
+    """Normalize user input for use in a key: whitespace and trailing punctuation don't matter.
+
+    Case does, since names in a question end up as literals in the generated Cypher.
+    """
+    return " ".join(text.split()).rstrip("?!. ")
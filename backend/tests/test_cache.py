@@ -0,0 +1,159 @@
+import os
+import asyncio
+import datetime
+import tempfile
+import unittest
+
+from src.services import cache, database, query, storage
+from src.services.cache import SharedCache, cached
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+class SharedCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "cache.sqlite3")
+        self.clock = FakeClock()
+        # Two handles on one file stand in for two workers
+        self.first = SharedCache(self.path, clock=self.clock)
+        self.second = SharedCache(self.path, clock=self.clock)
+
+    def tearDown(self):
+        self.first.close()
+        self.second.close()
+        self.dir.cleanup()
+
+    def test_entries_are_shared(self):
+        self.first.store("k", {"node_types": ["Person"]})
+        self.assertEqual(self.second.lookup("k"), (True, {"node_types": ["Person"]}, 0))
+
+    def test_ttl(self):
+        self.first.store("k", 1, ttl=10)
+        self.clock.now += 11
+        self.assertFalse(self.second.lookup("k")[0])
+
+    def test_invalidation_reaches_other_processes(self):
+        found, _, version = self.first.lookup("k", scope="tenant:t1")
+        self.assertFalse(found)
+        self.first.store("k", "old", version, scope="tenant:t1")
+        self.assertTrue(self.second.lookup("k", scope="tenant:t1")[0])
+        self.second.invalidate("tenant:t1")
+        self.assertFalse(self.first.lookup("k", scope="tenant:t1")[0])
+        # Other scopes keep their entries
+        self.first.store("other", "value", scope="tenant:t2")
+        self.second.invalidate("tenant:t1")
+        self.assertTrue(self.first.lookup("other", scope="tenant:t2")[0])
+
+    def test_value_computed_before_an_invalidation_is_never_served(self):
+        _, _, version = self.first.lookup("k", scope="tenant:t1")
+        self.second.invalidate("tenant:t1")
+        self.first.store("k", "stale", version, scope="tenant:t1")
+        self.assertFalse(self.second.lookup("k", scope="tenant:t1")[0])
+
+    def test_least_recently_used_entries_are_evicted(self):
+        small = SharedCache(self.path, max_bytes=1000, evict_every=1, clock=self.clock)
+        try:
+            for i in range(20):
+                self.clock.now += 1
+                small.store(f"k{i}", "x" * 98)
+            self.assertFalse(small.lookup("k0")[0])
+            self.assertTrue(small.lookup("k19")[0])
+            self.assertGreater(small.evictions, 0)
+        finally:
+            small.close()
+
+    def test_survives_reopening(self):
+        self.first.store("k", [1, 2])
+        reopened = SharedCache(self.path, clock=self.clock)
+        try:
+            self.assertEqual(reopened.lookup("k")[1], [1, 2])
+        finally:
+            reopened.close()
+
+class CachedTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        cache._cache = SharedCache(os.path.join(self.dir.name, "cache.sqlite3"))
+
+    async def asyncTearDown(self):
+        cache.close_cache()
+        self.dir.cleanup()
+
+    async def test_computes_once_until_invalidated(self):
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            return {"count": len(calls)}
+
+        for _ in range(3):
+            self.assertEqual(await cached("test", "k", compute, scope="tenant:t1"), {"count": 1})
+        await cache.invalidate("tenant:t1")
+        self.assertEqual(await cached("test", "k", compute, scope="tenant:t1"), {"count": 2})
+
+    async def test_without_cache(self):
+        cache.close_cache()
+        self.assertEqual(await cached("test", "k", lambda: asyncio.sleep(0, "value")), "value")
+
+class FakeEntity:
+    """Stands in for neo4j.graph.Node: properties, labels and an element id"""
+
+    def __init__(self, **properties):
+        self.properties = properties
+        self.element_id = "4:abc:1"
+        self.labels = frozenset(["Person"])
+
+    def items(self):
+        return self.properties.items()
+
+class FakeDateTime:
+    """Stands in for neo4j.time.DateTime"""
+
+    def iso_format(self) -> str:
+        return "2024-05-01T12:00:00+00:00"
+
+class FakeNeo4jStorage:
+    """Converts records the way Neo4jStorage.run_read_query does"""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def run_read_query(self, query, parameters=None, tenant_id=None):
+        self.calls += 1
+        records = [{
+            "p": FakeEntity(name="Ada", born=datetime.date(1815, 12, 10)),
+            "seen": FakeDateTime(),
+            "names": ("Ada", "Grace")
+        }]
+        return [database._plain_value(record) for record in records]
+
+class QueryResultCacheTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        cache._cache = SharedCache(os.path.join(self.dir.name, "cache.sqlite3"))
+        self.backend = FakeNeo4jStorage()
+        storage._storage = self.backend
+
+    async def asyncTearDown(self):
+        storage._storage = None
+        cache.close_cache()
+        self.dir.cleanup()
+
+    async def test_hit_and_miss_return_the_same_rows(self):
+        miss = await query.execute_cypher_query("MATCH (p:Person) RETURN p", "t1")
+        hit = await query.execute_cypher_query("MATCH (p:Person) RETURN p", "t1")
+        self.assertEqual(self.backend.calls, 1)
+        self.assertEqual(hit, miss)
+        self.assertEqual(miss, [{
+            "p": {"name": "Ada", "born": "1815-12-10"},
+            "seen": "2024-05-01T12:00:00+00:00",
+            "names": ["Ada", "Grace"]
+        }])
+
+if __name__ == "__main__":
+    unittest.main()
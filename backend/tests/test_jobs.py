@@ -0,0 +1,111 @@
+import asyncio
+import os
+import tempfile
+import unittest
+
+from pydantic import ValidationError
+
+from src.models.api import TenantJobRequest
+from src.services import cache, jobs
+from src.services.cache import SharedCache
+from src.services.jobs import cancel_jobs, get_job, get_job_status, start_job
+from src.services.memory_graph import MemoryStorage
+
+class TenantJobRequestTest(unittest.TestCase):
+    def test_batch_size_must_be_positive(self):
+        self.assertIsNone(TenantJobRequest(tenant_id="t1").batch_size)
+        self.assertEqual(TenantJobRequest(tenant_id="t1", batch_size=10).batch_size, 10)
+        for batch_size in (0, -1):
+            with self.assertRaises(ValidationError):
+                TenantJobRequest(tenant_id="t1", batch_size=batch_size)
+
+class JobTest(unittest.IsolatedAsyncioTestCase):
+    def tearDown(self):
+        jobs._jobs.clear()
+
+    async def test_completed_job_reports_progress_and_result(self):
+        storage = MemoryStorage()
+        await storage.create_tenant("t1", "Tenant 1")
+        await storage.bulk_upsert("t1", [{"type": "Person", "name": f"p{i}"} for i in range(5)], [])
+
+        job = start_job(
+            "reset_tenant",
+            "t1",
+            lambda job: storage.delete_tenant_data("t1", batch_size=2, on_progress=job.advance)
+        )
+        self.assertEqual(job.to_dict()["status"], "pending")
+        await job.task
+
+        status = get_job(job.id).to_dict()
+        self.assertEqual(status["status"], "completed")
+        self.assertEqual(status["progress"], {"relationships_deleted": 0, "nodes_deleted": 5})
+        self.assertEqual(status["result"], {"relationships_deleted": 0, "nodes_deleted": 5})
+        self.assertIsNotNone(status["elapsed_seconds"])
+
+    async def test_failed_job_keeps_the_error(self):
+        async def fail(job):
+            raise ValueError("bad batch")
+
+        job = start_job("purge_tenant", "t1", fail)
+        await job.task
+        self.assertEqual((job.status, job.error), ("failed", "bad batch"))
+
+    async def test_cancel_jobs_on_shutdown(self):
+        job = start_job("purge_tenant", "t1", lambda job: asyncio.sleep(60))
+        await asyncio.sleep(0)
+        await cancel_jobs()
+        self.assertEqual(job.status, "cancelled")
+        self.assertIsNotNone(job.finished_at)
+
+    async def test_finished_jobs_are_pruned(self):
+        jobs.MAX_FINISHED_JOBS, limit = 2, jobs.MAX_FINISHED_JOBS
+        try:
+            started = [start_job("reset_tenant", None, lambda job: asyncio.sleep(0)) for _ in range(4)]
+            await asyncio.gather(*(job.task for job in started))
+        finally:
+            jobs.MAX_FINISHED_JOBS = limit
+        self.assertEqual([get_job(job.id) is not None for job in started], [False, False, True, True])
+
+class SharedJobStatusTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        cache._cache = SharedCache(os.path.join(self.dir.name, "cache.sqlite3"))
+        jobs.JOB_PUBLISH_INTERVAL, self.interval = 0.01, jobs.JOB_PUBLISH_INTERVAL
+
+    async def asyncTearDown(self):
+        jobs.JOB_PUBLISH_INTERVAL = self.interval
+        jobs._jobs.clear()
+        cache.close_cache()
+        self.dir.cleanup()
+
+    async def status_elsewhere(self, job_id):
+        """The status as a worker that didn't start the job sees it"""
+        job = jobs._jobs.pop(job_id)
+        try:
+            return await get_job_status(job_id)
+        finally:
+            jobs._jobs[job_id] = job
+
+    async def test_other_workers_see_progress_and_outcome(self):
+        release = asyncio.Event()
+
+        async def run(job):
+            job.advance("nodes_deleted", 3)
+            await release.wait()
+            return {"nodes_deleted": 3}
+
+        job = start_job("reset_tenant", "t1", run)
+        await asyncio.sleep(0.05)
+        status = await self.status_elsewhere(job.id)
+        self.assertEqual((status["status"], status["progress"]), ("running", {"nodes_deleted": 3}))
+
+        release.set()
+        await job.task
+        status = await self.status_elsewhere(job.id)
+        self.assertEqual((status["status"], status["result"]), ("completed", {"nodes_deleted": 3}))
+
+    async def test_unknown_job(self):
+        self.assertIsNone(await get_job_status("missing"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import asyncio
+import io
+import json
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stderr
+
+from src.services.log_sink import JsonlLogSink, LogSinkClosedError
+
+class LogSinkTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "log.jsonl")
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def read_lines(self):
+        with open(self.path) as f:
+            return [json.loads(line) for line in f]
+
+    async def test_close_flushes_queued_entries(self):
+        sink = JsonlLogSink(self.path, flush_interval=10)
+        sink.start()
+        for i in range(5):
+            await sink.write({"i": i})
+        await sink.close()
+        self.assertEqual(self.read_lines(), [{"i": i} for i in range(5)])
+        self.assertEqual(sink.stats()["written"], 5)
+
+    async def test_rotates_at_max_bytes(self):
+        sink = JsonlLogSink(self.path, max_bytes=20, batch_size=1)
+        sink.start()
+        for i in range(3):
+            await sink.write({"entry": i})
+            # Let each entry be written on its own
+            while sink.written <= i:
+                await asyncio.sleep(0.01)
+        await sink.close()
+        self.assertEqual(sink.rotations, 2)
+        self.assertEqual(len(os.listdir(self.dir.name)), 3)
+
+    async def test_write_after_close_is_rejected(self):
+        sink = JsonlLogSink(self.path)
+        sink.start()
+        await sink.close()
+        with self.assertRaises(LogSinkClosedError):
+            await sink.write({"late": True})
+
+    async def test_failing_disk_falls_back_to_stderr(self):
+        # A directory where the file should be makes every write fail
+        os.mkdir(self.path)
+        sink = JsonlLogSink(self.path, max_retries=2, flush_interval=0)
+        sink.start()
+        stderr = io.StringIO()
+        with redirect_stderr(stderr):
+            await sink.write({"kept": True})
+            await sink.close(timeout=5)
+        self.assertEqual(json.loads(stderr.getvalue()), {"kept": True})
+        self.assertEqual((sink.write_errors, sink.dropped_to_stderr), (2, 1))
+
+    async def test_close_gives_up_after_timeout(self):
+        os.mkdir(self.path)
+        sink = JsonlLogSink(self.path, max_retries=1000, flush_interval=0)
+        sink.start()
+        await sink.write({"stuck": True})
+        await asyncio.sleep(0.05)
+        await asyncio.wait_for(sink.close(timeout=0.2), timeout=2)
+        self.assertIsNone(sink._task)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import unittest
+
+from src.services.memory_graph import MemoryStorage, UnsupportedQueryError, parse_query
+
+TENANT = '(:Tenant {id: "t1"})'
+
+class CypherParserTest(unittest.TestCase):
+    def test_parses_supported_clauses(self):
+        query = parse_query(
+            f'MATCH (p:Person)-[:BELONGS_TO]->{TENANT} MATCH (p)-[r:WORKS_AT|KNOWS]-(o) '
+            'WHERE p.name STARTS WITH "A" AND NOT o.name IS NULL '
+            'RETURN DISTINCT p.name AS person, count(o) AS n ORDER BY n DESC, person SKIP 1 LIMIT 5'
+        )
+        self.assertIsNotNone(query)
+
+    def test_rejects_unsupported_cypher(self):
+        for query in [
+            "CREATE (n:Person {name: 'Eve'})",
+            "MATCH (n) DETACH DELETE n",
+            "MATCH (n) RETURN n.name ORDER BY",
+            "MATCH (n RETURN n",
+        ]:
+            with self.assertRaises(UnsupportedQueryError, msg=query):
+                parse_query(query)
+
+class CypherExecutorTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.storage = MemoryStorage()
+        await self.storage.create_tenant("t1", "Acme")
+        await self.storage.create_tenant("t2", "Globex")
+        await self.storage.bulk_upsert("t1", [
+            {"type": "Person", "name": "Ada"},
+            {"type": "Person", "name": "Grace"},
+            {"type": "Company", "name": "AE"}
+        ], [
+            {"from_id": "Ada", "to_id": "AE", "type": "WORKS_AT"},
+            {"from_id": "Grace", "to_id": "AE", "type": "WORKS_AT"},
+            {"from_id": "Ada", "to_id": "Grace", "type": "KNOWS"}
+        ])
+        # Same names in another tenant must never leak into t1's results
+        await self.storage.bulk_upsert("t2", [{"type": "Person", "name": "Ada"}], [])
+
+    async def run_query(self, query, parameters=None):
+        return await self.storage.run_read_query(query, parameters, tenant_id="t1")
+
+    async def test_tenant_scoped_match(self):
+        rows = await self.run_query(f"MATCH (p:Person)-[:BELONGS_TO]->{TENANT} RETURN p.name AS name ORDER BY name")
+        self.assertEqual(rows, [{"name": "Ada"}, {"name": "Grace"}])
+
+    async def test_relationships_and_aggregation(self):
+        rows = await self.run_query(
+            f"MATCH (p:Person)-[:BELONGS_TO]->{TENANT} MATCH (p)-[:WORKS_AT]->(c:Company) "
+            "RETURN c.name AS company, count(p) AS people, collect(p.name) AS names"
+        )
+        self.assertEqual(rows, [{"company": "AE", "people": 2, "names": ["Ada", "Grace"]}])
+
+        rows = await self.run_query(f"MATCH (a {{name: 'Ada'}})-[:BELONGS_TO]->{TENANT} MATCH (a)-[r]-(b) WHERE type(r) <> 'BELONGS_TO' RETURN type(r) AS type, b.name AS other ORDER BY type")
+        self.assertEqual(rows, [{"type": "KNOWS", "other": "Grace"}, {"type": "WORKS_AT", "other": "AE"}])
+
+    async def test_where_parameters_and_paging(self):
+        rows = await self.run_query(
+            "MATCH (p:Person)-[:BELONGS_TO]->(:Tenant {id: $tenant_id}) WHERE p.name = $name RETURN p.name AS name",
+            {"tenant_id": "t1", "name": "Grace"}
+        )
+        self.assertEqual(rows, [{"name": "Grace"}])
+        rows = await self.run_query(f"MATCH (p:Person)-[:BELONGS_TO]->{TENANT} RETURN p.name AS name ORDER BY name DESC SKIP 1 LIMIT 1")
+        self.assertEqual(rows, [{"name": "Ada"}])
+
+    async def test_property_that_refers_to_another_variable(self):
+        rows = await self.run_query(
+            f"MATCH (a:Person)-[:BELONGS_TO]->{TENANT}, (b:Person {{name: a.name}}) "
+            "RETURN a.name AS name, count(b) AS matches ORDER BY name"
+        )
+        # Ada exists in both tenants; the second pattern isn't scoped
+        self.assertEqual(rows, [{"name": "Ada", "matches": 2}, {"name": "Grace", "matches": 1}])
+
+    async def test_tenant_by_name(self):
+        self.assertEqual(await self.run_query('MATCH (t:Tenant {name: "Acme"}) RETURN t.id AS id'), [{"id": "t1"}])
+        self.assertEqual(await self.run_query('MATCH (t:Tenant) WHERE t.name = "Acme" RETURN t.id AS id'), [{"id": "t1"}])
+        self.assertEqual(await self.run_query('MATCH (t {name: "Globex"}) RETURN t.id AS id'), [{"id": "t2"}])
+
+    async def test_missing_parameter(self):
+        with self.assertRaises(UnsupportedQueryError):
+            await self.run_query("MATCH (p:Person {name: $name}) RETURN p.name")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+import unittest
+
+from src.services.memory_graph import MemoryStorage
+from src.services.normalization import (
+    canonical_node_type, canonical_relationship_type, normalize_extracted_data, parse_extracted_data
+)
+
+class CanonicalTypeTest(unittest.TestCase):
+    def test_node_types(self):
+        for spelling in ["ProgrammingLanguage", "programming language", "PROGRAMMING_LANGUAGE", "programming-language", "programmingLanguage"]:
+            self.assertEqual(canonical_node_type(spelling), "ProgrammingLanguage")
+        # Only letters and digits survive, so a type can't break out of its quoting
+        self.assertEqual(canonical_node_type("Person`) DETACH DELETE (n"), "PersonDETACHDELETEN")
+        self.assertEqual(canonical_node_type("Person`) detach delete (n"), "PersonDetachDeleteN")
+        self.assertEqual(canonical_node_type("!!"), "!!")
+
+    def test_non_ascii_types(self):
+        self.assertEqual(canonical_node_type("Société"), "Société")
+        self.assertEqual(canonical_node_type("café"), "Café")
+        self.assertEqual(canonical_node_type("会社"), "会社")
+        self.assertEqual(canonical_node_type("école privée"), "ÉcolePrivée")
+        self.assertEqual(canonical_relationship_type("DÉVELOPPE"), "DÉVELOPPE")
+        self.assertEqual(canonical_relationship_type("développe pour"), "DÉVELOPPE_POUR")
+        self.assertEqual(canonical_relationship_type("所属"), "所属")
+
+    def test_acronyms_keep_their_case(self):
+        self.assertEqual(canonical_node_type("NGO"), "NGO")
+        self.assertEqual(canonical_node_type("API"), "API")
+        self.assertEqual(canonical_node_type("AIModel"), "AIModel")
+        self.assertEqual(canonical_node_type("API client"), "APIClient")
+
+    def test_relationship_types(self):
+        for spelling in ["WORKS_AT", "works at", "worksAt", "Works-At"]:
+            self.assertEqual(canonical_relationship_type(spelling), "WORKS_AT")
+
+class NormalizeTest(unittest.TestCase):
+    def test_rejects_malformed_payloads(self):
+        self.assertIsNone(parse_extracted_data([]))
+        self.assertIsNone(parse_extracted_data({"nodes": []}))
+        self.assertIsNone(parse_extracted_data({"nodes": {}, "relationships": []}))
+
+    def test_minimal_write_set(self):
+        data = parse_extracted_data({
+            "nodes": [
+                {"type": "person", "name": "Ada  Lovelace"},
+                {"type": "Person", "name": "Ada Lovelace"},
+                {"type": "Company", "name": "Analytical Engines"},
+                {"type": "Tenant", "name": "other-tenant"},
+                {"type": "Person"},
+                {"type": "Person", "name": 42},
+                {"type": "  ", "name": "Nobody"}
+            ],
+            "relationships": [
+                {"from_id": "Ada Lovelace", "to_id": "Analytical Engines", "type": "works at"},
+                {"from_id": "Ada  Lovelace", "to_id": "Analytical Engines", "type": "WORKS_AT"},
+                {"from_id": "Ada Lovelace", "to_id": "Charles Babbage", "type": "KNOWS"},
+                {"from_id": "Ada Lovelace", "to_id": "Analytical Engines", "type": "BELONGS_TO"},
+                {"from_id": "Ada Lovelace", "type": "KNOWS"}
+            ]
+        })
+        result = normalize_extracted_data(data)
+        self.assertEqual(result["nodes"], [
+            {"type": "Person", "name": "Ada Lovelace"},
+            {"type": "Company", "name": "Analytical Engines"}
+        ])
+        self.assertEqual(result["relationships"], [{
+            "from_id": "Ada Lovelace",
+            "to_id": "Analytical Engines",
+            "type": "WORKS_AT",
+            "from_type": "Person",
+            "to_type": "Company"
+        }])
+        self.assertEqual(result["removed"], {
+            "invalid_nodes": 4,
+            "duplicate_nodes": 1,
+            "invalid_relationships": 2,
+            "duplicate_relationships": 1,
+            "dangling_relationships": 1
+        })
+
+    def test_ambiguous_endpoint_has_no_type(self):
+        result = normalize_extracted_data({
+            "nodes": [
+                {"type": "Person", "name": "Jordan"},
+                {"type": "Country", "name": "Jordan"},
+                {"type": "City", "name": "Amman"}
+            ],
+            "relationships": [{"from_id": "Amman", "to_id": "Jordan", "type": "LOCATED_IN"}]
+        })
+        self.assertEqual(result["relationships"], [
+            {"from_id": "Amman", "to_id": "Jordan", "type": "LOCATED_IN", "from_type": "City"}
+        ])
+
+class InsertNormalizedTest(unittest.IsolatedAsyncioTestCase):
+    async def test_writes_normalized_data(self):
+        storage = MemoryStorage()
+        await storage.create_tenant("t1", "Tenant 1")
+        data = normalize_extracted_data({
+            "nodes": [{"type": "person", "name": "Ada"}, {"type": "Person", "name": "Ada"}, {"type": "company", "name": "AE"}],
+            "relationships": [{"from_id": "Ada", "to_id": "AE", "type": "works at"}] * 2
+        })
+        self.assertTrue(await storage.insert_graph_data("t1", data))
+        schema = await storage.get_schema("t1")
+        self.assertEqual(schema["node_type_counts"], {"Company": 1, "Person": 1})
+        self.assertEqual(schema["relationship_type_counts"], {"WORKS_AT": 1})
+
+if __name__ == "__main__":
+    unittest.main()
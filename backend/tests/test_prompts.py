@@ -0,0 +1,58 @@
+import unittest
+
+from src.services.prompts import (
+    PromptTooLargeError, build_prompt, count_tokens, rank_schema_elements, select_schema_elements
+)
+
+def large_schema():
+    node_counts = {f"Type{i}": i for i in range(300)}
+    node_counts.update({"Person": 500, "ProgrammingLanguage": 2})
+    rel_counts = {f"REL_{i}": i for i in range(200)}
+    rel_counts["WORKS_AT"] = 1
+    return {
+        "node_types": list(node_counts),
+        "relationship_types": list(rel_counts),
+        "node_type_counts": node_counts,
+        "relationship_type_counts": rel_counts
+    }
+
+class PromptBuilderTest(unittest.TestCase):
+    def test_relevant_types_rank_first(self):
+        ranked = rank_schema_elements(large_schema()["node_type_counts"], "Which programming languages does Ann use?")
+        self.assertEqual(ranked[:2], ["ProgrammingLanguage", "Person"])
+
+    def test_selection_fits_budget_and_is_ordered_by_frequency(self):
+        counts = large_schema()["node_type_counts"]
+        selected = select_schema_elements(counts, "programming languages", 50)
+        self.assertIn("ProgrammingLanguage", selected)
+        self.assertLessEqual(sum(count_tokens(name) + 1 for name in selected), 50)
+        self.assertEqual(selected, sorted(selected, key=lambda name: -counts[name]))
+
+    def test_schema_is_cut_to_budget(self):
+        schema = large_schema()
+        question = "Who works at Acme and which programming languages do they use?"
+        small = build_prompt("test", "INSTRUCTIONS", schema, question, "QUESTION", schema_budget=100)
+        large = build_prompt("test", "INSTRUCTIONS", schema, question, "QUESTION", schema_budget=100000)
+        self.assertLess(small["prompt_tokens"], large["prompt_tokens"])
+        self.assertGreater(small["schema_types_omitted"], 0)
+        self.assertEqual(large["schema_types_omitted"], 0)
+        self.assertIn("ProgrammingLanguage", small["prompt"])
+        self.assertIn("WORKS_AT", small["prompt"])
+
+    def test_prefix_is_stable_across_questions(self):
+        schema = large_schema()
+        first = build_prompt("test", "INSTRUCTIONS", schema, "Who works at Acme?", "Who works at Acme?", schema_budget=100)
+        second = build_prompt("test", "INSTRUCTIONS", schema, "List all people", "List all people", schema_budget=100)
+        self.assertTrue(first["prompt"].startswith("INSTRUCTIONS\nNode types: Person, Type299"))
+        self.assertTrue(second["prompt"].startswith("INSTRUCTIONS\nNode types: Person, Type299"))
+
+    def test_schema_without_counts(self):
+        result = build_prompt("test", "I", {"node_types": ["Person"], "relationship_types": []}, "text", "T")
+        self.assertIn("Node types: Person\nRelationship types: (none)", result["prompt"])
+
+    def test_input_over_limit(self):
+        with self.assertRaises(PromptTooLargeError):
+            build_prompt("test", "I", large_schema(), "text", "x" * 1000, max_tokens=100)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,179 @@
+import importlib.util
+import json
+import os
+import re
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+from src.services import cache, llm, query, storage
+from src.services.cache import SharedCache
+from src.services.memory_graph import MemoryStorage
+from src.utils.singleflight import normalize_text
+
+QUERIES = {
+    "who are the people": 'MATCH (p:Person)-[:BELONGS_TO]->(:Tenant {id: "t1"}) RETURN p.name as name ORDER BY name',
+    "how many companies employ people": 'MATCH (c:Company)-[:BELONGS_TO]->(:Tenant {id: "t1"}) RETURN count(c) as count',
+    "delete everything": 'MATCH (n) DETACH DELETE n',
+    "a broken one": 'MATCH (n:Person)-[:BELONGS_TO]->(:Tenant {id: "t1"}) RETURN n.name ORDER BY',
+}
+
+def completion(content: str):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=None)
+
+class FakeOpenAI:
+    """Answers Cypher prompts from QUERIES and summary prompts with a canned answer.
+
+    A batched Cypher prompt that includes a question in `failing` raises instead.
+    """
+
+    def __init__(self):
+        self.operations = []
+        self.questions = []
+        self.failing = set()
+        self.chat = self
+        self.completions = self
+
+    async def create(self, messages, **kwargs):
+        prompt = messages[-1]["content"]
+        if "numbered natural language queries" in prompt:
+            self.operations.append("cypher_batch")
+            questions = re.findall(r'^\s*(\d+)\. "(.*)"$', prompt, re.MULTILINE)
+            self.questions += [question for _, question in questions]
+            if any(question in self.failing for _, question in questions):
+                raise RuntimeError("LLM unavailable")
+            return completion(json.dumps({"queries": [
+                {"index": int(i), "cypher": QUERIES[normalize_text(question).lower()]}
+                for i, question in questions if normalize_text(question).lower() in QUERIES
+            ]}))
+        single = re.search(r'Convert this natural language query to a valid Cypher query:\s*"(.*)"', prompt)
+        if single:
+            self.operations.append("cypher")
+            self.questions.append(single.group(1))
+            return completion(QUERIES[normalize_text(single.group(1)).lower()])
+        self.operations.append("summary")
+        return completion(json.dumps({"answers": [], "summary": "ok", "insights": [], "limitations": ""}))
+
+    async def close(self):
+        pass
+
+class QueryBatchTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.client = FakeOpenAI()
+        llm.init_openai_client(self.client)
+        llm.llm_breaker.record_success()
+        self.backend = MemoryStorage()
+        await self.backend.create_tenant("t1", "Tenant 1")
+        await self.backend.bulk_upsert("t1", [
+            {"type": "Person", "name": "Ada"},
+            {"type": "Person", "name": "Grace"},
+            {"type": "Company", "name": "AE"}
+        ], [])
+        storage._storage = self.backend
+        query.QUERY_BATCH_CHUNK_SIZE, self.chunk_size = 2, query.QUERY_BATCH_CHUNK_SIZE
+
+    async def asyncTearDown(self):
+        query.QUERY_BATCH_CHUNK_SIZE = self.chunk_size
+        storage._storage = None
+        await llm.close_openai_client()
+
+    async def test_questions_are_generated_in_chunks(self):
+        result = await query.natural_language_batch("t1", [
+            "Who are the people?",
+            "How many companies employ people",
+            "Who are the people?",
+            "Something unknown"
+        ])
+        answers = result["answers"]
+        self.assertEqual(answers[0]["results"], [{"name": "Ada"}, {"name": "Grace"}])
+        self.assertEqual(answers[1]["results"], [{"count": 1}])
+        self.assertEqual(answers[2], answers[0])
+        self.assertEqual(answers[3]["error"], "No query was generated for this question")
+        # Three distinct questions in chunks of two, and no summary unless asked for
+        self.assertEqual(self.client.operations, ["cypher_batch", "cypher_batch"])
+        self.assertNotIn("summary", result)
+
+    async def test_summary_takes_one_more_call(self):
+        result = await query.natural_language_batch("t1", ["Who are the people?", "Something unknown"], summarize=True)
+        self.assertEqual(self.client.operations.count("summary"), 1)
+        self.assertEqual(result["summary"]["summary"], "ok")
+
+    async def test_unsafe_query_is_rejected(self):
+        result = await query.natural_language_batch("t1", ["Who are the people?", "Delete everything"])
+        self.assertTrue(result["answers"][0]["success"])
+        self.assertEqual(result["answers"][1]["error"], "Data modification queries are not allowed")
+        self.assertEqual(len(await self.backend.run_read_query(QUERIES["who are the people"], tenant_id="t1")), 2)
+
+    async def test_failing_llm_call_only_fails_its_chunk(self):
+        self.client.failing.add("Something unknown")
+        result = await query.natural_language_batch("t1", [
+            "Who are the people?",
+            "How many companies employ people",
+            "A broken one",
+            "Something unknown"
+        ])
+        answers = result["answers"]
+        self.assertTrue(answers[0]["success"] and answers[1]["success"])
+        self.assertEqual([answer["error"] for answer in answers[2:]], ["LLM unavailable", "LLM unavailable"])
+        self.assertTrue(result["success"])
+
+    async def test_failing_query_only_fails_its_answer(self):
+        result = await query.natural_language_batch("t1", ["Who are the people?", "A broken one"])
+        self.assertTrue(result["answers"][0]["success"])
+        broken = result["answers"][1]
+        self.assertFalse(broken["success"])
+        self.assertEqual(broken["query"], QUERIES["a broken one"])
+        self.assertIn("expected an expression", broken["error"])
+
+    async def test_questions_differing_in_case_get_their_own_cypher(self):
+        # Names become literals in the Cypher, so "ada" and "Ada" can't share a query
+        result = await query.natural_language_batch("t1", ["Who are the people?", "who are the people", "Who are the people"])
+        self.assertEqual(self.client.questions, ["Who are the people?", "who are the people"])
+        self.assertTrue(all(answer["success"] for answer in result["answers"]))
+
+class SharedCypherCacheTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.client = FakeOpenAI()
+        llm.init_openai_client(self.client)
+        llm.llm_breaker.record_success()
+        backend = MemoryStorage()
+        await backend.create_tenant("t1", "Tenant 1")
+        await backend.bulk_upsert("t1", [{"type": "Person", "name": "Ada"}], [])
+        storage._storage = backend
+        self.dir = tempfile.TemporaryDirectory()
+        cache._cache = SharedCache(os.path.join(self.dir.name, "cache.sqlite3"))
+
+    async def asyncTearDown(self):
+        cache.close_cache()
+        self.dir.cleanup()
+        storage._storage = None
+        await llm.close_openai_client()
+
+    async def test_batch_reuses_cypher_from_single_query(self):
+        await query.natural_language_to_cypher("t1", "Who are the people?")
+        result = await query.natural_language_batch("t1", ["Who are the people?"])
+        self.assertEqual(result["answers"][0]["results"], [{"name": "Ada"}])
+        self.assertEqual(self.client.operations.count("cypher"), 1)
+        self.assertNotIn("cypher_batch", self.client.operations)
+
+    async def test_single_query_reuses_cypher_from_batch(self):
+        await query.natural_language_batch("t1", ["Who are the people?"])
+        result = await query.natural_language_to_cypher("t1", "Who are the people?")
+        self.assertEqual(result["query"], QUERIES["who are the people"])
+        self.assertEqual(self.client.operations.count("cypher_batch"), 1)
+        self.assertNotIn("cypher", self.client.operations)
+
+@unittest.skipIf(importlib.util.find_spec("fastapi") is None, "fastapi is not installed")
+class QueryBatchEndpointTest(unittest.IsolatedAsyncioTestCase):
+    async def test_rejects_empty_and_oversized_batches(self):
+        from fastapi import HTTPException
+        from src.api import routes
+        from src.models.api import QueryBatchRequest
+
+        for queries in ([], ["Who are the people?"] * (query.QUERY_BATCH_MAX_QUESTIONS + 1)):
+            with self.assertRaises(HTTPException) as raised:
+                await routes.query_batch_endpoint(QueryBatchRequest(tenant_id="t1", queries=queries))
+            self.assertEqual(raised.exception.status_code, 400)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,301 @@
+import asyncio
+import unittest
+
+from src.services import llm, storage
+from src.services.memory_graph import MemoryStorage, UnsupportedQueryError
+from src.services.query import execute_cypher_query
+from src.utils.resilience import (
+    CircuitBreaker, CircuitOpenError, DeadlineExceeded, HedgePolicy, with_deadline
+)
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+class APIError(Exception):
+    def __init__(self, status_code: int):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+
+class FakeOpenAI:
+    """Stand-in for AsyncOpenAI that answers after `delay` seconds or raises `error`"""
+
+    def __init__(self, delay: float = 0.0, error: Exception = None):
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+        self.chat = self
+        self.completions = self
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return {"model": kwargs.get("model")}
+
+    async def close(self):
+        pass
+
+class FaultyStorage(MemoryStorage):
+    """Memory backend whose read queries hang for `delay` seconds or raise `error`,
+    whose writes raise `write_error` and whose exports raise `error` after the first record"""
+
+    def __init__(self):
+        super().__init__()
+        self.delay = 0.0
+        self.error = None
+        self.write_error = None
+
+    async def export_tenant(self, tenant_id):
+        async for record in super().export_tenant(tenant_id):
+            yield record
+            if self.error is not None:
+                raise self.error
+
+    async def bulk_upsert(self, tenant_id, nodes, relationships):
+        if self.write_error is not None:
+            raise self.write_error
+        return await super().bulk_upsert(tenant_id, nodes, relationships)
+
+    async def run_read_query(self, query, parameters=None, tenant_id=None):
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return await super().run_read_query(query, parameters, tenant_id)
+
+class CircuitBreakerTest(unittest.IsolatedAsyncioTestCase):
+    async def test_opens_fails_fast_and_recovers(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=10, clock=clock)
+        calls = []
+
+        async def failing():
+            calls.append("fail")
+            raise ConnectionError("down")
+
+        async def working():
+            calls.append("ok")
+            return "ok"
+
+        for _ in range(2):
+            with self.assertRaises(ConnectionError):
+                await breaker.call(failing)
+        self.assertEqual(breaker.state, "open")
+
+        # Open: the dependency isn't called at all
+        with self.assertRaises(CircuitOpenError) as raised:
+            await breaker.call(working)
+        self.assertEqual(raised.exception.retry_after, 10)
+        self.assertEqual(calls, ["fail", "fail"])
+
+        # Half-open: a failed probe re-opens the breaker
+        clock.now = 10
+        with self.assertRaises(ConnectionError):
+            await breaker.call(failing)
+        self.assertEqual(breaker.state, "open")
+
+        # A successful probe closes it
+        clock.now = 20
+        self.assertEqual(await breaker.call(working), "ok")
+        self.assertEqual(breaker.state, "closed")
+        self.assertEqual(breaker.stats()["trips"], 2)
+
+    async def test_only_one_probe_while_half_open(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=1, clock=clock)
+        with self.assertRaises(ConnectionError):
+            await breaker.call(self._raise(ConnectionError()))
+        clock.now = 1
+        release = asyncio.Event()
+
+        async def probe():
+            await release.wait()
+            return "ok"
+
+        first = asyncio.ensure_future(breaker.call(probe))
+        await asyncio.sleep(0)
+        with self.assertRaises(CircuitOpenError):
+            await breaker.call(probe)
+        release.set()
+        self.assertEqual(await first, "ok")
+        self.assertEqual(breaker.state, "closed")
+
+    async def test_ignored_errors_dont_count(self):
+        breaker = CircuitBreaker("test", failure_threshold=1, is_failure=lambda e: not isinstance(e, ValueError))
+        for _ in range(3):
+            with self.assertRaises(ValueError):
+                await breaker.call(self._raise(ValueError("bad input")))
+        self.assertEqual(breaker.state, "closed")
+
+    @staticmethod
+    def _raise(error):
+        async def fn():
+            raise error
+        return fn
+
+class HedgePolicyTest(unittest.IsolatedAsyncioTestCase):
+    async def test_no_hedging_before_enough_samples(self):
+        policy = HedgePolicy("test", min_delay=0.01, min_samples=3)
+        self.assertIsNone(policy.delay())
+
+    async def test_slow_request_is_hedged_and_loser_cancelled(self):
+        policy = HedgePolicy("test", percentile=0.5, min_delay=0.01, min_samples=1)
+        policy.latencies.append(0.01)
+        delays = [1.0, 0.0]
+        cancelled = []
+
+        async def attempt():
+            delay = delays.pop(0)
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                cancelled.append(delay)
+                raise
+            return delay
+
+        self.assertEqual(await policy.run(attempt), 0.0)
+        await asyncio.sleep(0)
+        self.assertEqual(cancelled, [1.0])
+        self.assertEqual((policy.hedged, policy.hedge_wins), (1, 1))
+
+    async def test_fast_request_is_not_hedged(self):
+        policy = HedgePolicy("test", min_delay=0.5, min_samples=1)
+        policy.latencies.append(0.5)
+        calls = []
+
+        async def attempt():
+            calls.append(1)
+            return "ok"
+
+        self.assertEqual(await policy.run(attempt), "ok")
+        self.assertEqual((len(calls), policy.hedged), (1, 0))
+
+class DeadlineTest(unittest.IsolatedAsyncioTestCase):
+    async def test_deadline_exceeded(self):
+        with self.assertRaises(DeadlineExceeded):
+            await with_deadline(asyncio.sleep(1), 0.01, "sleep")
+
+    async def test_no_deadline(self):
+        self.assertEqual(await with_deadline(asyncio.sleep(0, "done"), None), "done")
+
+class ChatCompletionTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        llm.llm_breaker.record_success()
+
+    async def asyncTearDown(self):
+        await llm.close_openai_client()
+        llm.llm_breaker.record_success()
+
+    async def test_hanging_api_times_out_then_fails_fast(self):
+        client = FakeOpenAI(delay=1.0)
+        llm.init_openai_client(client)
+        for _ in range(llm.llm_breaker.failure_threshold):
+            with self.assertRaises(DeadlineExceeded):
+                await llm.chat_completion(operation="test", deadline=0.01, model="m")
+        with self.assertRaises(CircuitOpenError):
+            await llm.chat_completion(operation="test", deadline=0.01, model="m")
+        self.assertEqual(client.calls, llm.llm_breaker.failure_threshold)
+
+    async def test_bad_requests_dont_open_the_breaker(self):
+        llm.init_openai_client(FakeOpenAI(error=APIError(400)))
+        for _ in range(llm.llm_breaker.failure_threshold + 1):
+            with self.assertRaises(APIError):
+                await llm.chat_completion(operation="test", model="m")
+        self.assertEqual(llm.llm_breaker.state, "closed")
+
+    async def test_server_errors_open_the_breaker(self):
+        llm.init_openai_client(FakeOpenAI(error=APIError(503)))
+        for _ in range(llm.llm_breaker.failure_threshold):
+            with self.assertRaises(APIError):
+                await llm.chat_completion(operation="test", model="m")
+        self.assertEqual(llm.llm_breaker.state, "open")
+
+class GuardedStorageTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.backend = FaultyStorage()
+        self.storage = storage.GuardedStorage(
+            self.backend,
+            timeout=0.05,
+            breaker=CircuitBreaker("test.graph", failure_threshold=2, reset_timeout=60, is_failure=self.backend.is_outage),
+            write_breaker=CircuitBreaker("test.graph.write", failure_threshold=2, reset_timeout=60, is_failure=self.backend.is_outage)
+        )
+        await self.storage.create_tenant("t1", "Tenant 1")
+        storage._storage = self.storage
+
+    async def asyncTearDown(self):
+        storage._storage = None
+
+    async def test_slow_store_times_out_then_fails_fast(self):
+        self.backend.delay = 1.0
+        for _ in range(2):
+            with self.assertRaises(DeadlineExceeded):
+                await self.storage.run_read_query("MATCH (n) RETURN n")
+        with self.assertRaises(CircuitOpenError):
+            await self.storage.tenant_exists("t1")
+
+    async def test_unsupported_queries_dont_open_the_breaker(self):
+        self.backend.error = UnsupportedQueryError("nope")
+        for _ in range(3):
+            with self.assertRaises(UnsupportedQueryError):
+                await self.storage.run_read_query("MATCH (n) RETURN n")
+        self.assertEqual(self.storage.breaker.state, "closed")
+        self.assertTrue(await self.storage.tenant_exists("t1"))
+        self.assertEqual(self.storage.write_breaker.state, "closed")
+
+    async def test_failing_writes_open_the_breaker(self):
+        self.backend.write_error = ConnectionError("store is down")
+        data = {"nodes": [{"type": "Person", "name": "Ada"}], "relationships": []}
+        for _ in range(2):
+            with self.assertRaises(ConnectionError):
+                await self.storage.insert_graph_data("t1", data)
+        with self.assertRaises(CircuitOpenError):
+            await self.storage.insert_graph_data("t1", data)
+        # Reads kept working throughout
+        self.assertTrue(await self.storage.tenant_exists("t1"))
+
+    async def test_rejected_writes_return_false(self):
+        self.backend.write_error = ValueError("bad data")
+        data = {"nodes": [], "relationships": []}
+        for _ in range(3):
+            self.assertFalse(await self.storage.insert_graph_data("t1", data))
+        self.assertFalse(await self.storage.insert_graph_data("missing", data))
+        self.assertEqual(self.storage.breaker.state, "closed")
+
+    async def collect_export(self):
+        return [record async for record in self.storage.export_tenant("t1")]
+
+    async def test_failing_exports_open_the_breaker(self):
+        self.backend.error = ConnectionError("store is down")
+        for _ in range(2):
+            with self.assertRaises(ConnectionError):
+                await self.collect_export()
+        with self.assertRaises(CircuitOpenError):
+            self.storage.export_tenant("t1")
+
+    async def test_export_probe_closes_or_releases_the_breaker(self):
+        clock = FakeClock()
+        self.storage.breaker = CircuitBreaker("test.export", failure_threshold=1, reset_timeout=10, clock=clock)
+        self.storage.breaker.record_failure()
+        clock.now = 11
+
+        # An abandoned stream gives the probe back instead of holding it forever
+        stream = self.storage.export_tenant("t1")
+        self.assertEqual((await stream.__anext__())["kind"], "tenant")
+        await stream.aclose()
+        self.assertEqual(self.storage.breaker.state, "half_open")
+
+        # A stream that finishes closes the breaker
+        self.assertEqual(len(await self.collect_export()), 1)
+        self.assertEqual(self.storage.breaker.state, "closed")
+
+    async def test_query_errors_reach_the_caller(self):
+        self.backend.error = ConnectionError("store is down")
+        with self.assertRaises(ConnectionError):
+            await execute_cypher_query("MATCH (n) RETURN n", tenant_id="t1")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,175 @@
+import asyncio
+import unittest
+
+from src.services.scheduler import FairScheduler, TenantOverloadedError, current_tenant, parse_weights
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+def make_scheduler(**kwargs) -> FairScheduler:
+    options = dict(
+        concurrency=1,
+        tenant_max_concurrency=0,
+        tenant_max_queued=0,
+        rate_per_second=0,
+        tokens_per_minute=0,
+        weights={}
+    )
+    options.update(kwargs)
+    return FairScheduler(**options)
+
+class FairSchedulerTest(unittest.IsolatedAsyncioTestCase):
+    async def run_requests(self, scheduler: FairScheduler, tenants, order):
+        """Queue all requests behind a blocked one, then let them run one at a time"""
+        release = asyncio.Event()
+
+        async def request(tenant_id):
+            async with scheduler.slot(tenant_id):
+                await release.wait()
+                order.append(tenant_id)
+
+        tasks = []
+        for tenant_id in tenants:
+            tasks.append(asyncio.ensure_future(request(tenant_id)))
+            await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(*tasks)
+
+    async def test_small_tenant_is_not_stuck_behind_a_backlog(self):
+        scheduler = make_scheduler()
+        order = []
+        await self.run_requests(scheduler, ["big"] * 10 + ["small"], order)
+        # The small tenant's request runs right after the one that was already running
+        self.assertLessEqual(order.index("small"), 2)
+
+    async def test_weights_share_slots(self):
+        scheduler = make_scheduler(weights={"heavy": 2})
+        order = []
+        await self.run_requests(scheduler, ["heavy"] * 6 + ["light"] * 6, order)
+        self.assertEqual(order[:9].count("heavy"), 6)
+
+    async def test_tenant_concurrency_limit_keeps_slots_free(self):
+        scheduler = make_scheduler(concurrency=4, tenant_max_concurrency=2)
+        release = asyncio.Event()
+
+        async def request(tenant_id):
+            async with scheduler.slot(tenant_id):
+                await release.wait()
+
+        tasks = [asyncio.ensure_future(request("big")) for _ in range(5)]
+        await asyncio.sleep(0)
+        async with scheduler.slot("small"):
+            self.assertEqual(scheduler.stats()["tenants"]["big"]["running"], 2)
+        release.set()
+        await asyncio.gather(*tasks)
+        self.assertEqual(scheduler.running, 0)
+
+    async def test_cancelled_waiter_leaves_the_queue(self):
+        scheduler = make_scheduler()
+        release = asyncio.Event()
+
+        async def request():
+            async with scheduler.slot("t1"):
+                await release.wait()
+
+        running = asyncio.ensure_future(request())
+        waiting = asyncio.ensure_future(request())
+        await asyncio.sleep(0)
+        waiting.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await waiting
+        release.set()
+        await running
+        self.assertEqual((scheduler.running, scheduler.stats()["tenants"]["t1"]["queued"]), (0, 0))
+
+    async def test_rate_limit(self):
+        clock = FakeClock()
+        scheduler = make_scheduler(rate_per_second=1, rate_burst=2, clock=clock)
+        for _ in range(2):
+            async with scheduler.slot("t1"):
+                pass
+        with self.assertRaises(TenantOverloadedError) as raised:
+            async with scheduler.slot("t1"):
+                pass
+        self.assertEqual(raised.exception.reason, "request rate")
+        self.assertAlmostEqual(raised.exception.retry_after, 1.0)
+        # Other tenants are unaffected, and the tenant recovers once the bucket refills
+        async with scheduler.slot("t2"):
+            pass
+        clock.now = 1
+        async with scheduler.slot("t1"):
+            pass
+
+    async def test_costly_requests_take_more_of_the_rate(self):
+        clock = FakeClock()
+        scheduler = make_scheduler(rate_per_second=1, rate_burst=5, clock=clock)
+        async with scheduler.slot("t1", cost=3):
+            pass
+        with self.assertRaises(TenantOverloadedError) as raised:
+            async with scheduler.slot("t1", cost=3):
+                pass
+        self.assertAlmostEqual(raised.exception.retry_after, 1.0)
+        async with scheduler.slot("t1", cost=2):
+            pass
+
+        # More than the burst is admitted on a full bucket and leaves it overdrawn
+        clock.now = 5
+        async with scheduler.slot("t1", cost=8):
+            pass
+        clock.now = 8
+        with self.assertRaises(TenantOverloadedError):
+            async with scheduler.slot("t1"):
+                pass
+        clock.now = 9
+        async with scheduler.slot("t1"):
+            pass
+
+    async def test_token_budget_from_usage(self):
+        clock = FakeClock()
+        scheduler = make_scheduler(tokens_per_minute=600, clock=clock)
+        async with scheduler.slot("t1"):
+            self.assertEqual(current_tenant.get(), "t1")
+            scheduler.record_usage("t1", 700)
+        self.assertIsNone(current_tenant.get())
+        with self.assertRaises(TenantOverloadedError) as raised:
+            async with scheduler.slot("t1"):
+                pass
+        self.assertEqual(raised.exception.reason, "LLM token budget")
+        # 100 tokens overdrawn at 10 tokens per second
+        self.assertAlmostEqual(raised.exception.retry_after, 10.1)
+        clock.now = 11
+        async with scheduler.slot("t1"):
+            pass
+
+    async def test_queue_limit(self):
+        scheduler = make_scheduler(tenant_max_queued=1)
+        release = asyncio.Event()
+
+        async def request():
+            async with scheduler.slot("t1"):
+                await release.wait()
+
+        tasks = [asyncio.ensure_future(request()) for _ in range(2)]
+        await asyncio.sleep(0)
+        with self.assertRaises(TenantOverloadedError):
+            async with scheduler.slot("t1"):
+                pass
+        release.set()
+        await asyncio.gather(*tasks)
+
+class ParseWeightsTest(unittest.TestCase):
+    def test_parses_weights(self):
+        self.assertEqual(parse_weights("a=2, b = 0.5,,"), {"a": 2.0, "b": 0.5})
+        self.assertEqual(parse_weights(""), {})
+
+    def test_rejects_non_positive_weights(self):
+        for value in ("a=0", "a=-1", "a=nan"):
+            with self.assertRaises(ValueError, msg=value):
+                parse_weights(value)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import asyncio
+import unittest
+
+from src.utils.singleflight import SingleFlight, normalize_text, singleflight_stats
+
+class SingleFlightTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.flight = SingleFlight(self.id())
+        self.release = asyncio.Event()
+        self.started = 0
+
+    async def compute(self, value="result"):
+        self.started += 1
+        await self.release.wait()
+        if isinstance(value, Exception):
+            raise value
+        return value
+
+    async def test_concurrent_calls_share_one_execution(self):
+        callers = [asyncio.create_task(self.flight.do("k", self.compute)) for _ in range(3)]
+        other = asyncio.create_task(self.flight.do("other", lambda: self.compute("other")))
+        await asyncio.sleep(0)
+        self.release.set()
+        self.assertEqual(await asyncio.gather(*callers), ["result"] * 3)
+        self.assertEqual(await other, "other")
+        self.assertEqual(self.started, 2)
+
+    async def test_exception_reaches_every_waiter(self):
+        callers = [asyncio.create_task(self.flight.do("k", lambda: self.compute(ValueError("boom")))) for _ in range(2)]
+        await asyncio.sleep(0)
+        self.release.set()
+        for result in await asyncio.gather(*callers, return_exceptions=True):
+            self.assertIsInstance(result, ValueError)
+        self.assertEqual(self.started, 1)
+
+    async def test_cancelled_caller_doesnt_cancel_the_others(self):
+        first = asyncio.create_task(self.flight.do("k", self.compute))
+        second = asyncio.create_task(self.flight.do("k", self.compute))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        self.release.set()
+        self.assertEqual(await second, "result")
+        self.assertTrue(first.cancelled())
+        self.assertEqual(self.started, 1)
+
+    async def test_every_caller_cancelled_leaves_no_unretrieved_exception(self):
+        loop = asyncio.get_running_loop()
+        errors = []
+        loop.set_exception_handler(lambda loop, context: errors.append(context))
+        caller = asyncio.create_task(self.flight.do("k", lambda: self.compute(ValueError("boom"))))
+        await asyncio.sleep(0)
+        caller.cancel()
+        self.release.set()
+        for _ in range(3):
+            await asyncio.sleep(0)
+        self.assertEqual(self.flight.stats()["in_flight"], 0)
+        self.assertEqual(errors, [])
+
+    async def test_key_is_forgotten_once_done(self):
+        self.release.set()
+        self.assertEqual(await self.flight.do("k", self.compute), "result")
+        self.assertEqual(self.flight.stats()["in_flight"], 0)
+        # Not a cache: the next call runs again, even after a failure
+        await self.flight.do("k", self.compute)
+        with self.assertRaises(ValueError):
+            await self.flight.do("k", lambda: self.compute(ValueError("boom")))
+        self.assertEqual(await self.flight.do("k", self.compute), "result")
+        self.assertEqual(self.started, 4)
+
+    async def test_counters(self):
+        callers = [asyncio.create_task(self.flight.do("k", self.compute)) for _ in range(3)]
+        await asyncio.sleep(0)
+        self.assertEqual(self.flight.stats(), {"calls": 3, "executions": 1, "collapsed": 2, "in_flight": 1})
+        self.release.set()
+        await asyncio.gather(*callers)
+        self.assertEqual(self.flight.stats(), {"calls": 3, "executions": 1, "collapsed": 2, "in_flight": 0})
+        self.assertEqual(singleflight_stats()[self.id()], self.flight.stats())
+
+class NormalizeTextTest(unittest.TestCase):
+    def test_whitespace_and_trailing_punctuation(self):
+        self.assertEqual(normalize_text("  Who knows   Ada? "), "Who knows Ada")
+        self.assertEqual(normalize_text("Who knows Ada!!"), "Who knows Ada")
+        self.assertNotEqual(normalize_text("who knows ada"), normalize_text("Who knows Ada"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,174 @@
+import re
+import unittest
+
+from src.services import database, overview, query, storage
+from src.services.memory_graph import MemoryStorage
+from src.services.overview import answer_from_stats
+
+NODES = [
+    {"type": "Person", "name": "Ada"},
+    {"type": "Person", "name": "Grace"},
+    {"type": "Person", "name": "Linus"},
+    {"type": "Company", "name": "AE"},
+    {"type": "ProgrammingLanguage", "name": "Python"}
+]
+
+RELATIONSHIPS = [
+    {"from_id": "Ada", "to_id": "AE", "type": "WORKS_AT"},
+    {"from_id": "Grace", "to_id": "AE", "type": "WORKS_AT"},
+    {"from_id": "Ada", "to_id": "Python", "type": "USES"},
+    {"from_id": "Grace", "to_id": "Python", "type": "USES"},
+    {"from_id": "Linus", "to_id": "Python", "type": "USES"},
+    {"from_id": "Ada", "to_id": "Grace", "type": "KNOWS"}
+]
+
+class StatsTestCase(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.backend = MemoryStorage()
+        await self.backend.create_tenant("t1", "Tenant 1")
+        await self.backend.bulk_upsert("t1", NODES, RELATIONSHIPS)
+
+class MemoryStatsTest(StatsTestCase):
+    async def test_writes_maintain_counts_and_hubs(self):
+        stats = await self.backend.get_stats("t1", top_k=3)
+        self.assertEqual((stats["node_count"], stats["relationship_count"]), (5, 6))
+        self.assertEqual(stats["node_type_counts"], {"Person": 3, "Company": 1, "ProgrammingLanguage": 1})
+        self.assertEqual(stats["relationship_type_counts"], {"USES": 3, "WORKS_AT": 2, "KNOWS": 1})
+        self.assertEqual([(hub["name"], hub["degree"]) for hub in stats["top_hubs"]], [("Ada", 3), ("Grace", 3), ("Python", 3)])
+
+        # A merge that creates nothing changes nothing
+        await self.backend.bulk_upsert("t1", NODES, RELATIONSHIPS)
+        self.assertEqual(await self.backend.get_stats("t1", top_k=3), stats)
+
+    async def test_deletes_rebuild_hubs(self):
+        graph = self.backend.graph
+        tenant = graph.tenants["t1"]
+        python = graph.node_keys[(tenant.node_id, graph.strings.lookup("ProgrammingLanguage"), graph.strings.lookup("Python"))]
+        graph.delete_node(python)
+
+        stats = await self.backend.get_stats("t1")
+        self.assertEqual(stats["relationship_type_counts"], {"WORKS_AT": 2, "KNOWS": 1})
+        self.assertEqual([(hub["name"], hub["degree"]) for hub in stats["top_hubs"]], [("AE", 2), ("Ada", 2), ("Grace", 2)])
+
+        await self.backend.delete_tenant_data("t1")
+        stats = await self.backend.get_stats("t1")
+        self.assertEqual((stats["node_count"], stats["relationship_count"], stats["top_hubs"]), (0, 0, []))
+
+    async def test_reconcile_corrects_drift(self):
+        graph = self.backend.graph
+        tenant = graph.tenants["t1"]
+        tenant.label_counts[graph.strings.lookup("Person")] = 7
+        ada = tenant.by_name[graph.strings.lookup("Ada")][0]
+        graph.node_degree[ada] = 0
+        tenant.hubs_valid = False
+
+        drift = await self.backend.reconcile_stats("t1")
+        self.assertEqual(drift, {"node_counts_corrected": 1, "relationship_counts_corrected": 0, "degrees_corrected": 1})
+        stats = await self.backend.get_stats("t1", top_k=1)
+        self.assertEqual(stats["node_type_counts"]["Person"], 3)
+        self.assertEqual(stats["top_hubs"], [{"type": "Person", "name": "Ada", "degree": 3}])
+        self.assertIsNotNone(stats["reconciled_at"])
+
+class SchemaQueryTest(StatsTestCase):
+    async def test_neo4j_schema_queries_match_memory_schema(self):
+        # Another tenant sharing nodes must not leak into the counts
+        await self.backend.create_tenant("t2", "Tenant 2")
+        await self.backend.bulk_upsert("t2", NODES[:2] + [{"type": "City", "name": "London"}], [
+            {"from_id": "Ada", "to_id": "London", "type": "LIVES_IN"},
+            {"from_id": "Ada", "to_id": "Grace", "type": "KNOWS"}
+        ])
+        schema = await self.backend.get_schema("t1")
+        params = {"tenant_id": "t1"}
+
+        rows = await self.backend.run_read_query(database._TENANT_NODE_COUNTS, params, tenant_id="t1")
+        self.assertEqual([(row["type"], row["count"]) for row in rows], list(schema["node_type_counts"].items()))
+        rows = await self.backend.run_read_query(database._TENANT_RELATIONSHIP_COUNTS, params, tenant_id="t1")
+        self.assertEqual([(row["type"], row["count"]) for row in rows], list(schema["relationship_type_counts"].items()))
+
+    def test_neo4j_schema_queries_use_match_patterns(self):
+        for query_text in (database._TENANT_NODE_COUNTS, database._TENANT_RELATIONSHIP_COUNTS):
+            # Neo4j 5 removed exists() on patterns
+            self.assertIsNone(re.search(r"EXISTS\s*\(\s*\(", query_text, re.IGNORECASE))
+            self.assertIn("-[:BELONGS_TO]->", query_text)
+            self.assertNotIn("<-[:BELONGS_TO]-", query_text)
+
+class OverviewQuestionTest(StatsTestCase):
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        storage._storage = self.backend
+
+    async def asyncTearDown(self):
+        storage._storage = None
+
+    async def test_counts(self):
+        answer = await answer_from_stats("t1", "How many people are there?")
+        self.assertEqual(answer["rows"], [{"type": "Person", "count": 3}])
+        self.assertIsNone(answer["query"])
+        answer = await answer_from_stats("t1", "How many nodes and relationships are in the graph?")
+        self.assertEqual(answer["rows"], [{"node_count": 5, "relationship_count": 6}])
+        answer = await answer_from_stats("t1", "How many works at relationships?")
+        self.assertEqual(answer["rows"], [{"type": "WORKS_AT", "count": 2}])
+
+    async def test_hubs(self):
+        answer = await answer_from_stats("t1", "Who has the most connections?")
+        self.assertEqual([hub["name"] for hub in answer["rows"]], ["Ada", "Grace", "Python", "AE", "Linus"])
+        answer = await answer_from_stats("t1", "Top 1 most connected companies")
+        self.assertEqual(answer["rows"], [{"type": "Company", "name": "AE", "degree": 2}])
+
+    async def test_hubs_outside_the_stored_list_are_left_to_the_llm(self):
+        # Only Ada, Grace and Python (3 relationships each) are stored
+        overview.STATS_TOP_HUBS, top_hubs = 3, overview.STATS_TOP_HUBS
+        try:
+            answer = await answer_from_stats("t1", "Top 2 most connected people")
+            self.assertEqual([hub["name"] for hub in answer["rows"]], ["Ada", "Grace"])
+            for question in ["Top 1 most connected companies", "Top 3 most connected people", "Who has the most connections?"]:
+                self.assertIsNone(await answer_from_stats("t1", question), question)
+        finally:
+            overview.STATS_TOP_HUBS = top_hubs
+
+        # With every hub stored, a type with fewer hubs than asked for is answered in full
+        answer = await answer_from_stats("t1", "Top 5 most connected companies")
+        self.assertEqual(answer["rows"], [{"type": "Company", "name": "AE", "degree": 2}])
+
+    async def test_listing_runs_a_templated_query(self):
+        answer = await answer_from_stats("t1", "What people are mentioned?")
+        self.assertEqual(answer["rows"], [{"name": "Ada"}, {"name": "Grace"}, {"name": "Linus"}])
+        self.assertIn("`Person`", answer["query"])
+
+    async def test_overview(self):
+        answer = await answer_from_stats("t1", "Give me an overview")
+        self.assertIn({"kind": "node", "type": "Person", "count": 3}, answer["rows"])
+        self.assertIn("5 nodes of 3 types", answer["summary"])
+
+    async def test_uncomputed_stats_are_left_to_the_llm(self):
+        # A tenant created before statistics were kept has none until they are reconciled
+        async def unknown_stats(tenant_id, top_k=10):
+            return {key: None for key in ["node_count", "relationship_count", "node_type_counts", "relationship_type_counts", "top_hubs"]}
+
+        self.backend.get_stats = unknown_stats
+        for question in ["How many people are there?", "Who has the most connections?", "Give me an overview"]:
+            self.assertIsNone(await answer_from_stats("t1", question), question)
+
+    async def test_other_questions_are_left_to_the_llm(self):
+        for question in [
+            "How many people work at AE?",
+            "How many relationships does a Person have?",
+            "Which companies does Ada know?",
+            "Who is Ada?",
+            "How many robots are there?",
+            "How many companies are connected?",
+            "Which companies are mentioned most?"
+        ]:
+            self.assertIsNone(await answer_from_stats("t1", question), question)
+
+    async def test_single_and_batch_queries_use_the_shortcut(self):
+        result = await query.natural_language_to_cypher("t1", "how many companies?")
+        self.assertEqual(result["source"], "stats")
+        self.assertEqual(result["results"]["formatted_response"]["summary"], "There are 1 Company nodes.")
+
+        result = await query.natural_language_batch("t1", ["How many people?", "Which people have the most relationships?"])
+        self.assertEqual([answer["source"] for answer in result["answers"]], ["stats", "stats"])
+        self.assertEqual(result["answers"][1]["results"][0]["name"], "Ada")
+
+if __name__ == "__main__":
+    unittest.main()
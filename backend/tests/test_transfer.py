@@ -0,0 +1,97 @@
+import os
+import tempfile
+import unittest
+
+from src.services import storage
+from src.services.memory_graph import MemoryStorage
+from src.services.transfer import (
+    ImportFormatError, decode_ndjson, decode_parquet, encode_ndjson, encode_parquet, import_tenant
+)
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+async def collect(chunks):
+    return [chunk async for chunk in chunks]
+
+async def replay(chunks):
+    for chunk in chunks:
+        yield chunk
+
+class TransferTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.backend = MemoryStorage()
+        await self.backend.create_tenant("t1", "Tenant 1")
+        await self.backend.bulk_upsert("t1", [
+            {"type": "Person", "name": "Ada"},
+            {"type": "Person", "name": "Grace"},
+            {"type": "Company", "name": "AE"}
+        ], [
+            {"from_id": "Ada", "to_id": "AE", "type": "WORKS_AT"},
+            {"from_id": "Ada", "to_id": "Grace", "type": "KNOWS"}
+        ])
+        storage._storage = self.backend
+
+    async def asyncTearDown(self):
+        storage._storage = None
+
+    async def assert_copied(self, counts):
+        self.assertEqual(counts, {"nodes": 3, "relationships": 2, "nodes_created": 3, "relationships_created": 2})
+        original = await collect(self.backend.export_tenant("t1"))
+        copy = await collect(self.backend.export_tenant("t2"))
+        self.assertEqual(copy[0], {"kind": "tenant", "id": "t2", "name": "Tenant 1"})
+        self.assertEqual(copy[1:], original[1:])
+
+    async def test_ndjson_round_trip(self):
+        chunks = await collect(encode_ndjson(self.backend.export_tenant("t1")))
+        # Split inside a line, as a network stream would
+        data = b"".join(chunks)
+        counts = await import_tenant("t2", decode_ndjson(replay([data[:10], data[10:]])))
+        await self.assert_copied(counts)
+
+    @unittest.skipIf(pyarrow is None, "pyarrow is not installed")
+    async def test_parquet_round_trip(self):
+        chunks = await collect(encode_parquet(self.backend.export_tenant("t1")))
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "t1.parquet")
+            with open(path, "wb") as f:
+                f.write(b"".join(chunks))
+            counts = await import_tenant("t2", decode_parquet(path))
+        await self.assert_copied(counts)
+
+    async def test_import_into_missing_tenant_needs_a_tenant_record(self):
+        records = decode_ndjson(replay([b'{"kind": "node", "type": "Person", "name": "Ada"}\n']))
+        with self.assertRaises(ImportFormatError):
+            await import_tenant("t3", records)
+
+    async def test_malformed_records_are_rejected(self):
+        for line in [b"not json\n", b'{"kind": "node", "type": "Person"}\n', b'{"kind": "edge"}\n']:
+            with self.assertRaises(ImportFormatError, msg=line):
+                await import_tenant("t1", decode_ndjson(replay([line])))
+
+    async def test_reserved_types_are_rejected(self):
+        for line in [
+            b'{"kind": "node", "type": "Tenant", "name": "Tenant 2"}\n',
+            b'{"kind": "node", "type": "tenant", "name": "Tenant 2"}\n',
+            b'{"kind": "relationship", "type": "BELONGS_TO", "from_id": "Ada", "to_id": "Tenant 2"}\n',
+            b'{"kind": "relationship", "type": "KNOWS", "from_id": "Ada", "to_id": "Tenant 2", "to_type": "Tenant"}\n'
+        ]:
+            with self.assertRaises(ImportFormatError, msg=line):
+                await import_tenant("t1", decode_ndjson(replay([line])))
+        self.assertEqual((await self.backend.get_schema("t1"))["node_type_counts"], {"Person": 2, "Company": 1})
+
+    async def test_imported_types_are_canonicalized(self):
+        lines = [
+            b'{"kind": "node", "type": "programming language", "name": " Python "}\n',
+            b'{"kind": "relationship", "type": "uses", "from_id": "Ada", "to_id": "Python", "to_type": "programming_language"}\n'
+        ]
+        counts = await import_tenant("t1", decode_ndjson(replay(lines)))
+        self.assertEqual((counts["nodes_created"], counts["relationships_created"]), (1, 1))
+        schema = await self.backend.get_schema("t1")
+        self.assertEqual(schema["node_type_counts"]["ProgrammingLanguage"], 1)
+        self.assertEqual(schema["relationship_type_counts"]["USES"], 1)
+
+if __name__ == "__main__":
+    unittest.main()